@@ -2,6 +2,9 @@ import streamlit as st
 from datetime import datetime, timedelta
 import pandas as pd
 
+from services.data_service import DataService
+from src.db import create_tables
+
 st.set_page_config(
     page_title="Stock Portfolio Manager",
     page_icon="📈",
@@ -14,6 +17,11 @@ st.set_page_config(
     }
 )
 
+@st.cache_resource
+def initialize_database():
+    # create missing tables once per server process, so a fresh checkout renders empty pages
+    create_tables()
+
 def initialize_session_state():
     if 'selected_tickers' not in st.session_state:
         st.session_state.selected_tickers = ['AAPL', 'MSFT']
@@ -27,9 +35,11 @@ def create_sidebar():
         st.write("• MSFT - Microsoft Corp.")
         
         if st.button("🔄 Refresh", use_container_width=True):
+            DataService.clear_cache()
             st.rerun()
 
 def main():
+    initialize_database()
     initialize_session_state()
     create_sidebar()
     
@@ -0,0 +1,126 @@
+"""aho-corasick automaton for matching many dictionary terms in one pass over text
+
+kept as the reference for the character-level dictionary matcher TickerTagger
+used before tokenizer.PhraseIndex replaced it
+"""
+
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from src.ingest.news.tokenizer import fold_case
+
+def _is_word_char(ch: str) -> bool:
+    """same notion of a word character as regex \\w"""
+    return ch.isalnum() or ch == '_'
+
+class AhoCorasick:
+    """case-insensitive multi-pattern matcher with word-boundary checks"""
+    
+    def __init__(self):
+        self._goto: List[Optional[Dict[str, int]]] = [None]  # state -> {char: next state}
+        self._fail: List[int] = [0]
+        self._out: List[Optional[List[Tuple[int, Any]]]] = [None]  # state -> [(pattern length, value)]
+        self._built = False
+        self.pattern_count = 0
+    
+    def add(self, pattern: str, value: Any):
+        """add a pattern, matched case-insensitively, reporting value on a hit"""
+        pattern = fold_case(pattern)
+        if not pattern:
+            return
+        
+        state = 0
+        for ch in pattern:
+            children = self._goto[state]
+            if children is None:
+                children = self._goto[state] = {}
+            next_state = children.get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                children[ch] = next_state
+                self._goto.append(None)
+                self._fail.append(0)
+                self._out.append(None)
+            state = next_state
+        
+        if self._out[state] is None:
+            self._out[state] = []
+        self._out[state].append((len(pattern), value))
+        self.pattern_count += 1
+        self._built = False
+    
+    def build(self):
+        """compute failure links breadth-first and merge outputs along them"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = []
+        for next_state in (goto[0] or {}).values():
+            fail[next_state] = 0
+            queue.append(next_state)
+        
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, next_state in (goto[state] or {}).items():
+                queue.append(next_state)
+                
+                # longest proper suffix of this path that is also a trie path
+                fallback = fail[state]
+                while fallback and (goto[fallback] is None or ch not in goto[fallback]):
+                    fallback = fail[fallback]
+                fail[next_state] = (goto[fallback] or {}).get(ch, 0)
+                
+                inherited = out[fail[next_state]]
+                if inherited:
+                    out[next_state] = (out[next_state] or []) + inherited
+        
+        self._built = True
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """yield (start, end, value) for every pattern occurrence bounded by non-word characters"""
+        if not self._built:
+            self.build()
+        
+        goto, fail, out = self._goto, self._fail, self._out
+        folded = fold_case(text)
+        text_len = len(folded)
+        state = 0
+        
+        for i, ch in enumerate(folded):
+            while True:
+                children = goto[state]
+                if children is not None and ch in children:
+                    state = children[ch]
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            
+            outputs = out[state]
+            if not outputs:
+                continue
+            
+            end = i + 1
+            for length, value in outputs:
+                start = end - length
+                # a pattern edge made of a word character must not touch another one
+                if _is_word_char(folded[start]) and start > 0 and _is_word_char(folded[start - 1]):
+                    continue
+                if _is_word_char(ch) and end < text_len and _is_word_char(folded[end]):
+                    continue
+                yield start, end, value
+    
+    def find_all(self, text: str, group: Optional[Callable[[Any], Hashable]] = None) -> List[Tuple[int, int, Any]]:
+        """non-overlapping matches, preferring the leftmost and then the longest, like a sorted regex alternation
+        
+        with a group function, overlaps are only resolved between values of the same group
+        """
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], m[0] - m[1]))
+        
+        selected = []
+        last_end: Dict[Hashable, int] = {}
+        for start, end, value in matches:
+            key = group(value) if group else None
+            if start >= last_end.get(key, -1):
+                selected.append((start, end, value))
+                last_end[key] = end
+        return selected
@@ -0,0 +1,72 @@
+"""solve times of the portfolio optimizer at several universe sizes
+
+times the shrunk covariance, minimum variance, risk parity and the efficient
+frontier, walked with warm starts and, for comparison, with every target solved
+from scratch. run from the repo root:
+    python -m benchmarks.bench_optimizer --sizes 50 500 2000
+"""
+
+import argparse
+import time
+from typing import Dict
+
+import numpy as np
+
+from src.portfolio.metrics import TRADING_DAYS
+from src.portfolio.optimizer import (
+    ledoit_wolf, min_variance, mean_variance, efficient_frontier, risk_parity, risk_contributions
+)
+from benchmarks.synthetic import make_factor_returns
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def run(assets: int, periods: int, points: int, cold: bool) -> Dict:
+    returns = make_factor_returns(periods, assets)
+    (cov, shrinkage), covariance_s = timed(ledoit_wolf, returns)
+    cov *= TRADING_DAYS
+    mu = returns.mean(axis=0) * TRADING_DAYS
+    
+    lowest, min_variance_s = timed(min_variance, cov)
+    parity, risk_parity_s = timed(risk_parity, cov)
+    frontier, frontier_s = timed(efficient_frontier, mu, cov, points)
+    
+    result = {
+        'assets': assets,
+        'shrinkage': shrinkage,
+        'covariance_s': covariance_s,
+        'min_variance_s': min_variance_s,
+        'risk_parity_s': risk_parity_s,
+        'frontier_s': frontier_s,
+        'held': int((lowest > 0).sum()),
+        'parity_error': float(np.abs(risk_contributions(parity, cov) * assets - 1).max()),
+        'cold_s': None,
+        'max_weight_diff': None,
+    }
+    if cold:
+        started = time.perf_counter()
+        weights = np.array([mean_variance(mu, cov, target_return=r) for r in frontier['returns']])
+        result['cold_s'] = time.perf_counter() - started
+        result['max_weight_diff'] = float(np.abs(weights - frontier['weights']).max())
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the portfolio optimizer")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 2000], help="assets per universe")
+    parser.add_argument('--periods', type=int, default=5 * TRADING_DAYS, help="days of returns")
+    parser.add_argument('--points', type=int, default=50, help="target returns on the frontier")
+    parser.add_argument('--no-cold', action='store_true', help="skip solving each frontier target from scratch")
+    args = parser.parse_args()
+    
+    print(f"{'assets':>6} {'shrink':>7} {'cov s':>7} {'minvar s':>9} {'held':>5} {'parity s':>9} "
+          f"{'parity err':>11} {'frontier s':>11} {'cold s':>8} {'max diff':>9}")
+    for size in args.sizes:
+        r = run(size, args.periods, args.points, not args.no_cold)
+        cold = f"{r['cold_s']:>8.3f} {r['max_weight_diff']:>9.1e}" if r['cold_s'] is not None else f"{'-':>8} {'-':>9}"
+        print(f"{r['assets']:>6} {r['shrinkage']:>7.3f} {r['covariance_s']:>7.3f} {r['min_variance_s']:>9.3f} "
+              f"{r['held']:>5} {r['risk_parity_s']:>9.3f} {r['parity_error']:>11.1e} {r['frontier_s']:>11.3f} {cold}")
+
+if __name__ == '__main__':
+    main()
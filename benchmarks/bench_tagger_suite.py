@@ -0,0 +1,200 @@
+"""throughput, memory and per-method accuracy of TickerTagger on labelled corpora
+
+runs the labelled synthetic corpus at several dictionary sizes and the hand-labelled
+fixture in benchmarks/fixtures/ticker_articles.json. run from the repo root:
+    python -m benchmarks.bench_tagger_suite --sizes 500 5000 50000
+    python -m benchmarks.bench_tagger_suite --output before.json
+    python -m benchmarks.bench_tagger_suite --baseline before.json   # exits 1 if any recall dropped
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from src.ingest.news.ticker_tagger import TickerTagger
+from benchmarks.synthetic import MATCH_METHODS, make_ticker_records, make_labelled_articles
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "ticker_articles.json"
+
+# accuracy of the deduplicated output, against every labelled ticker
+FINAL = 'final'
+
+# recall may move by less than this between runs without counting as a drop
+RECALL_TOLERANCE = 1e-9
+
+def load_fixture(path: Path = FIXTURE_PATH) -> Tuple[List[Dict], List[Dict]]:
+    """(ticker records, labelled articles) from a fixture file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        fixture = json.load(f)
+    
+    records = [{'id': i + 1, 'sector': None, **t} for i, t in enumerate(fixture['tickers'])]
+    corpus = [
+        {'title': a['title'], 'text': a['text'],
+         'labels': {method: set(a['expected'].get(method, [])) for method in MATCH_METHODS}}
+        for a in fixture['articles']
+    ]
+    return records, corpus
+
+def synthetic_corpus(size: int, articles: int, words: int) -> Tuple[List[Dict], List[Dict]]:
+    """(ticker records, labelled articles) for a synthetic dictionary of size symbols"""
+    records = make_ticker_records(size)
+    corpus = [
+        {'title': '', 'text': text, 'labels': labels}
+        for text, labels in make_labelled_articles(records, articles, words=words)
+    ]
+    return records, corpus
+
+def _full_text(article: Dict) -> str:
+    return f"{article['title']} {article['text']}" if article['title'] else article['text']
+
+def evaluate(tagger: TickerTagger, corpus: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """micro-averaged precision and recall per match method and for the final output
+    
+    per-method scores use the raw matches before deduplication, since deduplication
+    keeps only the strongest method for each symbol
+    """
+    counts = {method: {'tp': 0, 'fp': 0, 'fn': 0} for method in MATCH_METHODS + (FINAL,)}
+    
+    for article in corpus:
+        labels = article['labels']
+        raw = tagger._collect_matches(_full_text(article))
+        final = tagger.tag_article_text(article['title'], article['text'])
+        
+        predicted: Dict[str, Set[str]] = {method: set() for method in MATCH_METHODS}
+        for match in raw:
+            predicted.setdefault(match.match_method, set()).add(match.symbol)
+        predicted[FINAL] = {match.symbol for match in final}
+        expected = dict(labels)
+        expected[FINAL] = set().union(*labels.values())
+        
+        for method, c in counts.items():
+            c['tp'] += len(predicted[method] & expected[method])
+            c['fp'] += len(predicted[method] - expected[method])
+            c['fn'] += len(expected[method] - predicted[method])
+    
+    scores = {}
+    for method, c in counts.items():
+        found, labelled = c['tp'] + c['fp'], c['tp'] + c['fn']
+        scores[method] = {
+            **c,
+            'precision': c['tp'] / found if found else 1.0,
+            'recall': c['tp'] / labelled if labelled else 1.0,
+        }
+    return scores
+
+def measure_throughput(tagger: TickerTagger, corpus: List[Dict], min_seconds: float = 1.0) -> Dict[str, float]:
+    """articles/sec and MB/sec over repeated passes, without tracing overhead"""
+    corpus_bytes = sum(len(_full_text(a).encode('utf-8')) for a in corpus)
+    passes = 0
+    started = time.perf_counter()
+    while True:
+        for article in corpus:
+            tagger.tag_article_text(article['title'], article['text'])
+        passes += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            break
+    
+    return {
+        'articles_per_sec': passes * len(corpus) / elapsed,
+        'mb_per_sec': passes * corpus_bytes / elapsed / 1e6,
+    }
+
+def measure_memory(records: List[Dict], corpus: List[Dict]) -> Tuple[TickerTagger, Dict[str, float]]:
+    """the tagger, plus traced memory held by the dictionary and the peak while tagging the corpus"""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        tagger = TickerTagger(records)
+        build_seconds = time.perf_counter() - started
+        dictionary_bytes, _ = tracemalloc.get_traced_memory()
+        
+        tracemalloc.reset_peak()
+        for article in corpus:
+            tagger.tag_article_text(article['title'], article['text'])
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return tagger, {
+        'build_seconds': build_seconds,
+        'dictionary_mb': dictionary_bytes / 1e6,
+        'tagging_peak_mb': (peak_bytes - dictionary_bytes) / 1e6,
+    }
+
+def run_corpus(name: str, records: List[Dict], corpus: List[Dict], min_seconds: float) -> Dict:
+    tagger, memory = measure_memory(records, corpus)
+    return {
+        'corpus': name,
+        'symbols': len(records),
+        'articles': len(corpus),
+        **memory,
+        **measure_throughput(tagger, corpus, min_seconds),
+        'accuracy': evaluate(tagger, corpus),
+    }
+
+def format_results(results: List[Dict]) -> str:
+    lines = [
+        f"{'corpus':<16} {'symbols':>8} {'build s':>8} {'dict MB':>8} {'peak MB':>8} {'articles/s':>11} {'MB/s':>7}",
+        "-" * 72,
+    ]
+    for r in results:
+        lines.append(
+            f"{r['corpus']:<16} {r['symbols']:>8} {r['build_seconds']:>8.2f} {r['dictionary_mb']:>8.1f} "
+            f"{r['tagging_peak_mb']:>8.2f} {r['articles_per_sec']:>11.0f} {r['mb_per_sec']:>7.2f}"
+        )
+    
+    lines += ["", f"{'corpus':<16} {'method':<17} {'precision':>9} {'recall':>7} {'tp':>6} {'fp':>6} {'fn':>6}", "-" * 72]
+    for r in results:
+        for method, s in r['accuracy'].items():
+            lines.append(
+                f"{r['corpus']:<16} {method:<17} {s['precision']:>9.3f} {s['recall']:>7.3f} "
+                f"{s['tp']:>6} {s['fp']:>6} {s['fn']:>6}"
+            )
+    return '\n'.join(lines)
+
+def recall_drops(results: List[Dict], baseline: List[Dict]) -> List[str]:
+    """corpus/method pairs whose recall is lower than in the baseline run"""
+    previous = {(r['corpus'], m): s['recall'] for r in baseline for m, s in r['accuracy'].items()}
+    drops = []
+    for r in results:
+        for method, s in r['accuracy'].items():
+            before = previous.get((r['corpus'], method))
+            if before is not None and s['recall'] < before - RECALL_TOLERANCE:
+                drops.append(f"{r['corpus']} {method}: recall {before:.3f} -> {s['recall']:.3f}")
+    return drops
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark ticker tagging speed, memory and accuracy")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 50000], help="synthetic dictionary sizes")
+    parser.add_argument('--articles', type=int, default=200, help="synthetic articles per run")
+    parser.add_argument('--words', type=int, default=400, help="words per synthetic article")
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="minimum timed seconds per corpus")
+    parser.add_argument('--output', help="write results as json")
+    parser.add_argument('--baseline', help="json results of an earlier run to compare recall against")
+    args = parser.parse_args()
+    
+    results = [run_corpus('fixture', *load_fixture(), args.min_seconds)]
+    for size in args.sizes:
+        results.append(run_corpus(f'synthetic-{size}', *synthetic_corpus(size, args.articles, args.words), args.min_seconds))
+    
+    print(format_results(results))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            drops = recall_drops(results, json.load(f))
+        if drops:
+            print("\nrecall dropped against the baseline:\n  " + "\n  ".join(drops))
+            sys.exit(1)
+        print("\nno recall drops against the baseline")
+
+if __name__ == '__main__':
+    main()
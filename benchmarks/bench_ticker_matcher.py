@@ -0,0 +1,116 @@
+"""compare the tagger's token phrase index with the old alternation regexes and the aho-corasick automaton
+
+run from the repo root:
+    python -m benchmarks.bench_ticker_matcher --sizes 500 5000 50000
+"""
+
+import argparse
+import re
+import time
+from typing import Dict, List, Set, Tuple
+
+from src.ingest.news.ticker_tagger import SYMBOL_TERM, COMPANY_TERM
+from src.ingest.news.tokenizer import PhraseIndex, TokenStream
+from benchmarks.aho_corasick import AhoCorasick
+from benchmarks.synthetic import make_ticker_records, make_articles
+
+def build_regexes(records: List[Dict]):
+    """the symbol and company name patterns as TickerTagger._compile_patterns used to build them"""
+    escaped_symbols = sorted((re.escape(r['symbol']) for r in records), key=len, reverse=True)
+    symbols_pattern = re.compile(r'\b(' + '|'.join(escaped_symbols) + r')\b', re.IGNORECASE)
+    
+    names = [r['company_name'].lower() for r in records if len(r['company_name']) > 3]
+    escaped_names = sorted((re.escape(n) for n in names), key=len, reverse=True)
+    names_pattern = re.compile(r'\b(' + '|'.join(escaped_names) + r')\b', re.IGNORECASE)
+    return symbols_pattern, names_pattern
+
+def build_index(records: List[Dict]) -> PhraseIndex:
+    """the phrase index TickerTagger._compile_patterns builds, without aliases"""
+    index = PhraseIndex()
+    for r in records:
+        index.add(r['symbol'], (SYMBOL_TERM, r['symbol']))
+        if len(r['company_name']) > 3:
+            index.add(r['company_name'].lower(), (COMPANY_TERM, r['company_name'].lower()))
+    return index
+
+def build_automaton(records: List[Dict]) -> AhoCorasick:
+    """the character-level automaton TickerTagger used before the token index, without aliases"""
+    matcher = AhoCorasick()
+    for r in records:
+        matcher.add(r['symbol'], (SYMBOL_TERM, r['symbol']))
+        if len(r['company_name']) > 3:
+            matcher.add(r['company_name'].lower(), (COMPANY_TERM, r['company_name'].lower()))
+    matcher.build()
+    return matcher
+
+def regex_spans(patterns, text: str) -> Set[Tuple[str, int, int]]:
+    spans = set()
+    for kind, pattern in zip((SYMBOL_TERM, COMPANY_TERM), patterns):
+        spans.update((kind, m.start(), m.end()) for m in pattern.finditer(text))
+    return spans
+
+def index_spans(index: PhraseIndex, text: str) -> Set[Tuple[str, int, int]]:
+    """spans found the way the tagger finds them, tokenization included"""
+    tokens = TokenStream(text)
+    return {(value[0], start, end) for start, end, value in index.find_all(tokens, group=lambda v: v[0])}
+
+def automaton_spans(matcher: AhoCorasick, text: str) -> Set[Tuple[str, int, int]]:
+    return {(value[0], start, end) for start, end, value in matcher.find_all(text, group=lambda v: v[0])}
+
+def run(size: int, articles: int, words: int) -> Dict:
+    records = make_ticker_records(size)
+    corpus = make_articles(records, articles, words=words)
+    
+    started = time.perf_counter()
+    patterns = build_regexes(records)
+    regex_build = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    index = build_index(records)
+    index_build = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    matcher = build_automaton(records)
+    automaton_build = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    regex_results = [regex_spans(patterns, text) for text in corpus]
+    regex_scan = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    index_results = [index_spans(index, text) for text in corpus]
+    index_scan = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    automaton_results = [automaton_spans(matcher, text) for text in corpus]
+    automaton_scan = time.perf_counter() - started
+    
+    agree = sum(a == b for a, b in zip(regex_results, index_results))
+    return {
+        'patterns': size * 2,
+        'regex_build_s': regex_build,
+        'index_build_s': index_build,
+        'automaton_build_s': automaton_build,
+        'regex_ms_per_article': regex_scan * 1000 / articles,
+        'index_ms_per_article': index_scan * 1000 / articles,
+        'automaton_ms_per_article': automaton_scan * 1000 / articles,
+        'agreement': agree / articles,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark dictionary matching strategies")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 50000], help="symbols per dictionary (patterns = 2x)")
+    parser.add_argument('--articles', type=int, default=50, help="articles per run")
+    parser.add_argument('--words', type=int, default=400, help="words per article")
+    args = parser.parse_args()
+    
+    print(f"{'patterns':>9} {'regex build s':>14} {'index build s':>14} {'ac build s':>11} "
+          f"{'regex ms/art':>13} {'index ms/art':>13} {'ac ms/art':>10} {'agree':>6}")
+    for size in args.sizes:
+        r = run(size, args.articles, args.words)
+        print(f"{r['patterns']:>9} {r['regex_build_s']:>14.3f} {r['index_build_s']:>14.3f} "
+              f"{r['automaton_build_s']:>11.3f} {r['regex_ms_per_article']:>13.2f} {r['index_ms_per_article']:>13.2f} "
+              f"{r['automaton_ms_per_article']:>10.2f} {r['agreement']:>6.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""compare the single-pass tokenized tagger with the previous four-scan tag_article_text
+
+run from the repo root:
+    python -m benchmarks.bench_ticker_tagger --sizes 500 5000 50000
+"""
+
+import argparse
+import re
+import time
+from typing import Dict, List, Set, Tuple
+
+from src.ingest.news.ticker_tagger import (
+    TickerTagger, TickerMatch, RawMatch, TICKER_BLACKLIST, SYMBOL_TERM, COMPANY_TERM, extract_tickers_from_text
+)
+from benchmarks.aho_corasick import AhoCorasick
+from benchmarks.synthetic import make_ticker_records, make_articles
+
+class LegacyTagger(TickerTagger):
+    """the tagger as it was before tokenization: a dictionary automaton over the characters,
+    a regex compiled per candidate ticker and five contextual regexes compiled per call,
+    with a context snippet cut for every raw match"""
+    
+    def _compile_patterns(self):
+        super()._compile_patterns()
+        self.dictionary_matcher = AhoCorasick()
+        for symbol in self.symbol_dict:
+            self.dictionary_matcher.add(symbol, (SYMBOL_TERM, symbol))
+        for name in list(self.company_name_dict) + list(self.alias_dict):
+            if len(name) > 3:
+                self.dictionary_matcher.add(name, (COMPANY_TERM, name))
+        self.dictionary_matcher.build()
+    
+    def tag_article_text(self, title: str, text: str, article_id=None) -> List[TickerMatch]:
+        full_text = f"{title} {text}" if title else text
+        if not full_text.strip():
+            return []
+        
+        symbol_hits, company_hits = [], []
+        for start, end, (kind, key) in self.dictionary_matcher.find_all(full_text, group=lambda value: value[0]):
+            (symbol_hits if kind == SYMBOL_TERM else company_hits).append((start, end, key))
+        
+        matches = self._match_known_symbols(symbol_hits)
+        matches += self._match_company_names(company_hits)
+        for match in matches:
+            self._extract_context(full_text, match.start, match.end)
+        matches += self._legacy_ticker_patterns(full_text)
+        matches += self._legacy_contextual_tickers(full_text)
+        return self._deduplicate_and_score(matches, full_text)
+    
+    def _legacy_ticker_patterns(self, text: str) -> List[RawMatch]:
+        matches = []
+        for ticker in extract_tickers_from_text(text):
+            if ticker in self.symbol_dict:
+                continue
+            pattern = re.compile(r'\b' + re.escape(ticker) + r'\b')
+            for match in pattern.finditer(text):
+                start, end = match.span()
+                context = self._extract_context(text, start, end)
+                confidence = self._calculate_pattern_confidence(
+                    ticker, context, text.count(ticker), f'${ticker}' in text
+                )
+                if confidence > 0.3:
+                    matches.append(RawMatch(ticker, "", start, end, confidence, "pattern_match"))
+        return matches
+    
+    def _legacy_contextual_tickers(self, text: str) -> List[RawMatch]:
+        contextual_patterns = [
+            re.compile(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*\(\s*([A-Z]{1,5})\s*\)'),
+            re.compile(r'\b([A-Z]{1,5})\s+(?:stock|shares|equity)', re.IGNORECASE),
+            re.compile(r'(?:trades|trading|listed)\s+as\s+([A-Z]{1,5})', re.IGNORECASE),
+            re.compile(r'ticker\s+(?:symbol\s+)?([A-Z]{1,5})', re.IGNORECASE),
+            re.compile(r'\$([A-Z]{1,5})\b'),
+        ]
+        matches = []
+        for pattern in contextual_patterns:
+            for match in pattern.finditer(text):
+                groups = match.groups()
+                ticker = groups[-1].upper()
+                start, end = match.span()
+                if ticker in TICKER_BLACKLIST:
+                    continue
+                self._extract_context(text, start, end, window=100)
+                confidence = self._calculate_contextual_confidence(ticker, match.group(0))
+                company_name = groups[0] if len(groups) > 1 and groups[0] else ""
+                if confidence > 0.5:
+                    matches.append(RawMatch(ticker, company_name, start, end, confidence, "contextual_match", 100))
+        return matches
+
+def match_keys(matches: List[TickerMatch]) -> Set[Tuple[str, str, Tuple[Tuple[int, int], ...]]]:
+    """what a tagging result says, independent of ordering"""
+    return {(m.symbol, m.match_method, tuple(sorted(m.positions))) for m in matches}
+
+def time_tagger(tagger: TickerTagger, corpus: List[str]) -> Tuple[float, List[List[TickerMatch]]]:
+    started = time.perf_counter()
+    results = [tagger.tag_article_text('', text) for text in corpus]
+    return time.perf_counter() - started, results
+
+def run(size: int, articles: int, words: int) -> Dict:
+    records = make_ticker_records(size)
+    corpus = make_articles(records, articles, words=words)
+    
+    legacy_seconds, legacy_results = time_tagger(LegacyTagger(records), corpus)
+    tokenized_seconds, tokenized_results = time_tagger(TickerTagger(records), corpus)
+    
+    agree = sum(match_keys(a) == match_keys(b) for a, b in zip(legacy_results, tokenized_results))
+    return {
+        'symbols': size,
+        'legacy_ms_per_article': legacy_seconds * 1000 / articles,
+        'tokenized_ms_per_article': tokenized_seconds * 1000 / articles,
+        'speedup': legacy_seconds / tokenized_seconds if tokenized_seconds else 0.0,
+        'agreement': agree / articles,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark per-article ticker tagging")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 50000], help="symbols per dictionary")
+    parser.add_argument('--articles', type=int, default=200, help="articles per run")
+    parser.add_argument('--words', type=int, default=400, help="words per article")
+    args = parser.parse_args()
+    
+    print(f"{'symbols':>8} {'legacy ms/art':>14} {'tokenized ms/art':>17} {'speedup':>8} {'agree':>6}")
+    for size in args.sizes:
+        r = run(size, args.articles, args.words)
+        print(f"{r['symbols']:>8} {r['legacy_ms_per_article']:>14.2f} {r['tokenized_ms_per_article']:>17.2f} "
+              f"{r['speedup']:>7.1f}x {r['agreement']:>6.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""deterministic synthetic ticker dictionaries, article text and returns for benchmarks"""
+
+import random
+import string
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+FILLER_WORDS = [
+    'the', 'market', 'shares', 'analysts', 'said', 'quarter', 'revenue', 'growth', 'investors',
+    'company', 'reported', 'expected', 'guidance', 'outlook', 'higher', 'lower', 'week', 'trading',
+    'earnings', 'results', 'sales', 'demand', 'supply', 'prices', 'rates', 'inflation', 'central',
+    'bank', 'policy', 'strong', 'weak', 'said', 'on', 'in', 'of', 'and', 'for', 'with', 'after',
+]
+
+NAME_WORDS = [
+    'Global', 'United', 'American', 'Pacific', 'Northern', 'Digital', 'Advanced', 'General',
+    'First', 'National', 'Summit', 'Pioneer', 'Quantum', 'Atlas', 'Vertex', 'Harbor', 'Silver',
+    'Golden', 'Blue', 'Red', 'Green', 'Bright', 'Core', 'Prime', 'Apex', 'Nova', 'Delta', 'Sigma',
+]
+
+NAME_SUFFIXES = ['Corp', 'Holdings', 'Group', 'Systems', 'Industries', 'Partners', 'Energy', 'Labs']
+
+def make_ticker_records(count: int, seed: int = 7) -> List[Dict]:
+    """unique symbols with company names and one alias each, in TickerTagger's record format"""
+    rng = random.Random(seed)
+    symbols = set()
+    names = set()
+    records = []
+    
+    while len(records) < count:
+        symbol = ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 5)))
+        if symbol in symbols:
+            continue
+        
+        # names get a numeric tag once the word combinations run out
+        words = [rng.choice(NAME_WORDS) for _ in range(rng.randint(1, 2))]
+        name = ' '.join(words + [rng.choice(NAME_SUFFIXES)])
+        if name in names:
+            name = f"{' '.join(words)} {len(records)} {rng.choice(NAME_SUFFIXES)}"
+        
+        symbols.add(symbol)
+        names.add(name)
+        records.append({
+            'id': len(records) + 1,
+            'symbol': symbol,
+            'company_name': name,
+            'aliases': [f"{words[0]} {symbol.title()}"],
+            'sector': None,
+        })
+    
+    return records
+
+# uppercase words that look like tickers but must never be tagged
+TRICKY_WORDS = ['THE', 'CEO', 'CFO', 'USA', 'SEC', 'FDA', 'IPO', 'AND', 'FOR', 'SAID']
+
+MATCH_METHODS = ('known_symbol', 'company_name', 'pattern_match', 'contextual_match')
+
+def make_unknown_symbol(symbols: Set[str], rng: random.Random) -> str:
+    """an uppercase run that is neither in the dictionary nor a tricky word"""
+    while True:
+        symbol = ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 5)))
+        if symbol not in symbols and symbol not in TRICKY_WORDS:
+            return symbol
+
+def make_labelled_article(records: List[Dict], rng: random.Random, words: int = 400, mentions: int = 8,
+                          symbols: Optional[Set[str]] = None) -> Tuple[str, Dict[str, Set[str]]]:
+    """filler text with ticker mentions mixed in, and the symbols each match method should find
+    
+    known tickers appear as SYM, Name, $SYM, "Name (SYM)", "SYM shares" and "trades as SYM",
+    unknown tickers as UNK, $UNK and "UNK stock", and tricky uppercase words as negatives
+    """
+    symbols = symbols if symbols is not None else {r['symbol'] for r in records}
+    tokens = [rng.choice(FILLER_WORDS) for _ in range(words)]
+    labels = {method: set() for method in MATCH_METHODS}
+    
+    for position in rng.sample(range(words), min(mentions, words)):
+        record = rng.choice(records)
+        symbol = record['symbol']
+        form = rng.randrange(10)
+        if form == 0:
+            mention, methods = symbol, ['known_symbol']
+        elif form == 1:
+            mention, methods = record['company_name'], ['company_name']
+        elif form == 2:
+            mention, methods = f"${symbol}", ['known_symbol', 'contextual_match']
+        elif form == 3:
+            mention, methods = f"{record['company_name']} ({symbol})", ['known_symbol', 'company_name', 'contextual_match']
+        elif form == 4:
+            mention, methods = f"{symbol} shares", ['known_symbol', 'contextual_match']
+        elif form == 5:
+            mention, methods = f"trades as {symbol}", ['known_symbol', 'contextual_match']
+        elif form == 6:
+            symbol = make_unknown_symbol(symbols, rng)
+            mention, methods = symbol, ['pattern_match']
+        elif form == 7:
+            symbol = make_unknown_symbol(symbols, rng)
+            mention, methods = f"${symbol}", ['pattern_match', 'contextual_match']
+        elif form == 8:
+            symbol = make_unknown_symbol(symbols, rng)
+            mention, methods = f"{symbol} stock", ['pattern_match', 'contextual_match']
+        else:
+            mention, methods = rng.choice([w for w in TRICKY_WORDS if w not in symbols]), []
+        
+        tokens[position] = mention
+        for method in methods:
+            labels[method].add(symbol)
+    
+    return ' '.join(tokens) + '.', labels
+
+def make_labelled_articles(records: List[Dict], count: int, seed: int = 11,
+                           words: int = 400) -> List[Tuple[str, Dict[str, Set[str]]]]:
+    """a reproducible corpus of (text, labels) pairs"""
+    rng = random.Random(seed)
+    symbols = {r['symbol'] for r in records}
+    return [make_labelled_article(records, rng, words, symbols=symbols) for _ in range(count)]
+
+def make_articles(records: List[Dict], count: int, seed: int = 11, words: int = 400) -> List[str]:
+    """a reproducible corpus of synthetic articles"""
+    return [text for text, _ in make_labelled_articles(records, count, seed, words)]
+
+def make_factor_returns(periods: int, assets: int, factors: int = 5, seed: int = 3) -> np.ndarray:
+    """a periods x assets matrix of daily returns driven by a few common factors plus noise"""
+    rng = np.random.default_rng(seed)
+    factor_returns = rng.normal(0.0, 0.01, (periods, factors))
+    loadings = rng.normal(0.8, 0.4, (assets, factors)) / np.sqrt(factors)
+    noise = rng.normal(0.0, 0.015, (periods, assets)) * rng.uniform(0.5, 2.0, assets)
+    drift = rng.normal(0.0004, 0.0003, assets)
+    return factor_returns @ loadings.T + noise + drift
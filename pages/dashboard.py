@@ -1,44 +1,40 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+from datetime import date, timedelta
 from services.data_service import DataService
+from src.portfolio.streaming import StreamingMetrics
 
 def render():
     tickers = ['AAPL', 'MSFT']
     
-    price_data = DataService.get_stock_data(tickers, None, None)
+    cube = DataService.get_price_cube(tickers, None, None)
     
-    if not price_data:
+    if not cube.tickers:
         st.error("No data available.")
         return
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if 'AAPL' in price_data:
-            current_price = price_data['AAPL']['Close'].iloc[-1]
-            st.metric("AAPL Price", f"${current_price:.2f}")
-    
-    with col2:
-        if 'MSFT' in price_data:
-            current_price = price_data['MSFT']['Close'].iloc[-1]
-            st.metric("MSFT Price", f"${current_price:.2f}")
+    # latest close of every ticker in one pass over the cube
+    for col, ticker, current_price in zip(st.columns(len(cube.tickers)), cube.tickers, cube.last('close')):
+        with col:
+            st.metric(f"{ticker} Price", f"${current_price:.2f}")
     
     st.subheader("Stock Prices")
     
     fig = go.Figure()
     
-    # add both stocks to chart
-    for ticker in tickers:
-        if ticker in price_data:
-            df = price_data[ticker]
-            fig.add_trace(go.Scatter(
-                x=df.index,
-                y=df['Close'],
-                mode='lines',
-                name=ticker,
-                line=dict(width=2)
-            ))
+    # one trace per stock, all on the cube's shared calendar
+    closes = cube.frame('close')
+    for ticker in closes.columns:
+        fig.add_trace(go.Scatter(
+            x=closes.index,
+            y=closes[ticker],
+            mode='lines',
+            name=ticker,
+            connectgaps=True,
+            line=dict(width=2)
+        ))
     
     fig.update_layout(
         title="Stock Price Chart",
@@ -49,10 +45,120 @@ def render():
     
     st.plotly_chart(fig, use_container_width=True)
     
+    render_portfolio(tickers)
+    render_rolling(tickers)
+    render_frontier(tickers)
+    render_risk(tickers)
+    
     st.subheader("Stock Data")
     
     # show data tables for each stok
-    for ticker in tickers:
-        if ticker in price_data:
-            st.write(f"**{ticker}**")
-            st.dataframe(price_data[ticker], use_container_width=True)
\ No newline at end of file
+    for ticker, frame in cube.to_frames().items():
+        st.write(f"**{ticker}**")
+        st.dataframe(frame, use_container_width=True)
+
+def render_portfolio(tickers):
+    # equal-weight portfolio tracked incrementally: each rerun only feeds the bars
+    # that arrived since the last one into the metrics kept in session state.
+    # the returns themselves are memoized by DataService until the price store changes
+    returns = DataService.get_returns(tickers, None, None)
+    returns = returns[[t for t in tickers if t in returns.columns]].dropna(how='all')
+    if returns.empty:
+        return
+    
+    state = st.session_state.get('portfolio_stream')
+    if state is None or state['tickers'] != list(returns.columns) or (
+            state['tracker'].last_index is not None and state['tracker'].last_index not in returns.index):
+        state = st.session_state['portfolio_stream'] = {
+            'tickers': list(returns.columns),
+            'tracker': StreamingMetrics(),
+            'curve': pd.Series(dtype=float),
+        }
+    tracker = state['tracker']
+    new = returns if tracker.last_index is None else returns[returns.index > tracker.last_index]
+    if not new.empty:
+        weights = pd.Series(1.0 / len(returns.columns), index=returns.columns)
+        equity = tracker.extend(new.fillna(0.0).to_numpy() @ weights.to_numpy(), index=new.index[-1])
+        state['curve'] = pd.concat([state['curve'], pd.Series(equity[:, 0], index=new.index)])
+    
+    metrics = {name: values[0] for name, values in tracker.metrics().items()}
+    st.subheader("Equal-Weight Portfolio")
+    cols = st.columns(5)
+    cols[0].metric("Total Return", f"{metrics['total_return']:.2%}")
+    cols[1].metric("CAGR", f"{metrics['annualized_return']:.2%}")
+    cols[2].metric("Volatility", f"{metrics['volatility']:.2%}")
+    cols[3].metric("Sharpe", f"{metrics['sharpe_ratio']:.2f}")
+    cols[4].metric("Max Drawdown", f"{metrics['max_drawdown']:.2%}", f"{metrics['drawdown']:.2%} now")
+    
+    fig = go.Figure(go.Scatter(x=state['curve'].index, y=state['curve'].values, mode='lines', name='Equity'))
+    fig.update_layout(title="Equity Curve", xaxis_title="Date", yaxis_title="Growth of $1", height=300)
+    st.plotly_chart(fig, use_container_width=True)
+
+ROLLING_LABELS = {
+    'volatility': ("Volatility", ".0%"),
+    'sharpe_ratio': ("Sharpe Ratio", ".2f"),
+    'beta': ("Beta vs Equal Weight", ".2f"),
+    'correlation': ("Correlation vs Equal Weight", ".2f"),
+    'drawdown': ("Drawdown from Window Peak", ".0%"),
+}
+
+def render_rolling(tickers):
+    # rolling risk of each ticker, three years of bars so the longest window has history
+    st.subheader("Rolling Risk")
+    col1, col2 = st.columns(2)
+    window = col1.selectbox("Window", [21, 63, 252], index=1, format_func=lambda w: f"{w} days")
+    metric = col2.selectbox("Metric", list(ROLLING_LABELS), format_func=lambda m: ROLLING_LABELS[m][0])
+    
+    rolling = DataService.get_rolling_metrics(tickers, date.today() - timedelta(days=3 * 365), None)
+    if not rolling:
+        return
+    frame = rolling[window][metric].dropna(how='all')
+    title, tick_format = ROLLING_LABELS[metric]
+    fig = go.Figure()
+    for ticker in frame.columns:
+        fig.add_trace(go.Scatter(x=frame.index, y=frame[ticker], mode='lines', name=ticker))
+    fig.update_layout(title=f"{window}-Day {title}", xaxis_title="Date", yaxis_tickformat=tick_format, height=300)
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_frontier(tickers):
+    # long-only efficient frontier over three years of bars, with the stocks and the
+    # minimum-variance, risk-parity and best-sharpe portfolios marked on it
+    start = date.today() - timedelta(days=3 * 365)
+    frontier = DataService.get_efficient_frontier(tickers, start, None)
+    if not frontier:
+        return
+    columns, mu, cov = DataService.get_return_moments(tickers, start, None)
+    
+    st.subheader("Efficient Frontier")
+    fig = go.Figure(go.Scatter(x=frontier['volatility'], y=frontier['returns'], mode='lines', name='Frontier'))
+    fig.add_trace(go.Scatter(x=np.sqrt(np.diag(cov)), y=mu, mode='markers+text', text=columns,
+                             textposition='top center', name='Stocks'))
+    best = int(np.argmax(frontier['sharpe_ratio']))
+    portfolios = {
+        'Minimum Variance': frontier['weights'].iloc[0],
+        'Risk Parity': DataService.optimize_portfolio(tickers, start, None, 'risk_parity'),
+        'Best Sharpe': frontier['weights'].iloc[best],
+    }
+    for name, weights in portfolios.items():
+        w = weights[columns].to_numpy()
+        fig.add_trace(go.Scatter(x=[np.sqrt(w @ cov @ w)], y=[w @ mu], mode='markers', name=name,
+                                 marker=dict(size=10)))
+    fig.update_layout(xaxis_title="Volatility", yaxis_title="Expected Return", xaxis_tickformat=".0%",
+                      yaxis_tickformat=".0%", height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(pd.DataFrame(portfolios).T.style.format("{:.1%}"), use_container_width=True)
+
+def render_risk(tickers):
+    # monte carlo loss estimates of the equal-weight portfolio from resampled days of
+    # the last three years, seeded so reruns show the same numbers
+    risk = DataService.get_portfolio_risk(tickers, date.today() - timedelta(days=3 * 365), None)
+    if risk.empty:
+        return
+    st.subheader("Value at Risk")
+    table = risk.assign(
+        horizon=risk['horizon'].map(lambda h: f"{h} day" + ("s" if h > 1 else "")),
+        level=risk['level'].map(lambda level: f"{level:.0%}"),
+    ).rename(columns={'horizon': 'Horizon', 'level': 'Confidence', 'var': 'VaR', 'cvar': 'CVaR',
+                      'expected_return': 'Expected Return'})
+    st.dataframe(table.style.format({'VaR': "{:.2%}", 'CVaR': "{:.2%}", 'Expected Return': "{:.2%}"}),
+                 use_container_width=True, hide_index=True)
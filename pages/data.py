@@ -6,9 +6,9 @@ def render():
     st.write("Available stocks: AAPL and MSFT")
     
     tickers = ['AAPL', 'MSFT']
-    data = DataService.get_stock_data(tickers, None, None)
+    cube = DataService.get_price_cube(tickers, None, None)
     
-    if data:
+    if cube.tickers:
         st.write("### Stock Information")
         
         # show info for each stok
@@ -17,23 +17,13 @@ def render():
             st.write(f"**{ticker}** - {info['longName']} ({info['sector']})")
         
         st.write("### Current Data Status")
-        status_data = []
-        
-        for ticker in tickers:
-            if ticker in data:
-                df = data[ticker]
-                latest_price = df['Close'].iloc[-1]
-                data_points = len(df)
-                
-                status_data.append({
-                    'Ticker': ticker,
-                    'Latest Price': f"${latest_price:.2f}",
-                    'Data Points': data_points,
-                    'Status': '✅ OK'
-                })
-        
-        if status_data:
-            status_df = pd.DataFrame(status_data)
-            st.dataframe(status_df, use_container_width=True)
+        # latest prices and bar counts of every ticker come straight off the cube
+        status_df = pd.DataFrame({
+            'Ticker': cube.tickers,
+            'Latest Price': [f"${price:.2f}" for price in cube.last('close')],
+            'Data Points': cube.counts(),
+            'Status': '✅ OK'
+        })
+        st.dataframe(status_df, use_container_width=True)
     else:
         st.error("No data available")
\ No newline at end of file
@@ -1,4 +1,6 @@
 import streamlit as st
+import plotly.graph_objects as go
+from datetime import date, timedelta
 from services.news_service import NewsService
 
 def render():
@@ -23,4 +25,57 @@ def render():
                 sentiment_label = "Positive" if row['sentiment'] > 0.6 else "Negative" if row['sentiment'] < 0.4 else "Neutral"
                 st.write(f"**Sentiment:** {sentiment_label}")
             
-            st.write(row['summary'])
\ No newline at end of file
+            st.write(row['summary'])
+    
+    render_sentiment_trends()
+
+def render_sentiment_trends():
+    st.subheader("Sentiment Trends")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        days = st.selectbox("Period", [30, 90, 180, 365], index=1, format_func=lambda d: f"{d} days")
+    with col2:
+        halflife = st.slider("EWMA half-life (days)", 1, 30, 7)
+    start_date = date.today() - timedelta(days=days)
+    
+    # one row per ticker, so hundreds of tickers stay cheap to show
+    latest = NewsService.get_sentiment_trend(start_date=start_date, halflife=halflife, latest=True)
+    if latest.empty:
+        st.info("No daily sentiment aggregates yet.")
+        return
+    
+    # biggest moves against each ticker's own recent history first
+    movers = latest.loc[latest['zscore'].abs().sort_values(ascending=False, na_position='last').index]
+    st.dataframe(
+        movers[['symbol', 'date', 'article_count', 'sentiment', 'rolling_mean', 'ewma', 'zscore']],
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    symbols = movers['symbol'].tolist()
+    default = [t for t in st.session_state.get('selected_tickers', []) if t in symbols] or symbols[:5]
+    selected = st.multiselect("Tickers to chart", symbols, default=default)
+    if not selected:
+        return
+    
+    trend = NewsService.get_sentiment_trend(selected, start_date=start_date, halflife=halflife)
+    
+    fig = go.Figure()
+    for symbol, series in trend.groupby('symbol'):
+        fig.add_trace(go.Scatter(
+            x=series['date'],
+            y=series['ewma'],
+            mode='lines',
+            name=symbol,
+            line=dict(width=2)
+        ))
+    
+    fig.update_layout(
+        title="EWMA Sentiment",
+        xaxis_title="Date",
+        yaxis_title="Sentiment",
+        height=400
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
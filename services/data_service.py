@@ -1,32 +1,200 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timedelta
 
+from src.db.price_cube import PriceCube, open_price_cube
+from src.db.prices import get_price_bars, resolve_range
+from src.portfolio.metrics import TRADING_DAYS, batch_metrics, portfolio_returns as portfolio_returns_matrix
+from src.portfolio.montecarlo import DEFAULT_HORIZONS, DEFAULT_LEVELS, monte_carlo_risk
+from src.portfolio.optimizer import ledoit_wolf, min_variance, mean_variance, risk_parity, efficient_frontier
+from src.portfolio.rolling import rolling_metrics
+from services.result_cache import result_cache, selection_key
+
+PERIODS_PER_YEAR = {'1d': TRADING_DAYS, '1wk': 52, '1mo': 12}
+
+OPTIMIZERS = ['min_variance', 'mean_variance', 'risk_parity']
+
 class DataService:
+    @staticmethod
+    def get_price_cube(tickers, start_date, end_date, interval='1d'):
+        # PriceCube of the selection, tickers in sorted order on one shared calendar; daily bars
+        # are sliced from the memory-mapped store cube when it is current, other intervals are
+        # resampled in duckdb. tickers without bars in the range are left out, memoized
+        tickers = sorted({str(t).upper() for t in tickers})
+        
+        def compute():
+            store = open_price_cube() if interval == '1d' else None
+            if store is not None:
+                return store.select(tickers, *resolve_range(start_date, end_date)).compact()
+            return PriceCube.from_bars(get_price_bars(tickers, start_date, end_date, interval))
+        
+        return result_cache.get_or_compute('price_cube', selection_key(tickers, start_date, end_date, interval),
+                                           compute)
+    
     @staticmethod
     def get_stock_data(tickers, start_date, end_date, interval='1d'):
-        data = {}
+        # {ticker: ohlcv frame indexed by date}, per-ticker frames of get_price_cube
+        return DataService.get_price_cube(tickers, start_date, end_date, interval).to_frames()
+    
+    @staticmethod
+    def get_returns(tickers, start_date, end_date, interval='1d'):
+        # dates x tickers close-to-close returns of the selection, nan where a ticker has no bar
+        return result_cache.get_or_compute(
+            'returns', selection_key(tickers, start_date, end_date, interval),
+            lambda: DataService.get_price_cube(tickers, start_date, end_date, interval).returns_frame()
+        )
+    
+    @staticmethod
+    def get_portfolio_metrics(tickers, start_date, end_date, interval='1d', weights=None):
+        # calculate_portfolio_metrics of the selection, weights following the order of tickers;
+        # memoized per selection and weights, so reruns with unchanged inputs skip the math
+        tickers = [str(t).upper() for t in tickers]
+        if weights is not None:
+            weights = pd.Series(np.asarray(weights, dtype=float), index=tickers).sort_index()
         
-        # hardcoded data for aple
-        aapl_data = {
-            'Close': [180.0, 182.5, 179.8, 185.2, 183.7],
-            'Volume': [50000000, 45000000, 52000000, 48000000, 51000000]
-        }
+        def compute():
+            returns = DataService.get_returns(tickers, start_date, end_date, interval)
+            columns = [t for t in sorted(tickers) if t in returns.columns]
+            if not columns:
+                return {}
+            returns_df = returns[columns].dropna(how='all')
+            return DataService.calculate_portfolio_metrics(
+                returns_df, None if weights is None else weights[columns].to_numpy()
+            )
         
-        msft_data = {
-            'Close': [350.0, 355.3, 348.9, 360.1, 358.4],
-            'Volume': [30000000, 28000000, 32000000, 29000000, 31000000]
+        return result_cache.get_or_compute(
+            'portfolio_metrics', selection_key(tickers, start_date, end_date, interval, weights), compute
+        )
+    
+    @staticmethod
+    def calculate_rolling_metrics(returns, windows=(21, 63, 252), benchmark=None):
+        # {window: {metric: dates x tickers frame}} of rolling volatility, sharpe, beta, correlation
+        # and drawdown for every ticker at once; the benchmark defaults to the tickers' equal-weight mean
+        returns_df = pd.DataFrame(returns) if isinstance(returns, dict) else returns
+        if benchmark is None:
+            benchmark = returns_df.mean(axis=1)
+        elif isinstance(benchmark, pd.Series):
+            benchmark = benchmark.reindex(returns_df.index)
+        results = rolling_metrics(returns_df.to_numpy(), windows, np.asarray(benchmark, dtype=float))
+        return {
+            window: {
+                name: pd.DataFrame(values, index=returns_df.index, columns=returns_df.columns)
+                for name, values in metrics.items()
+            }
+            for window, metrics in results.items()
         }
+    
+    @staticmethod
+    def get_rolling_metrics(tickers, start_date, end_date, interval='1d', windows=(21, 63, 252), benchmark=None):
+        # calculate_rolling_metrics of the selection against a benchmark ticker, memoized per selection
+        tickers = [str(t).upper() for t in tickers]
+        windows = tuple(sorted({int(w) for w in windows}))
+        benchmark = str(benchmark).upper() if benchmark else None
         
-        dates = pd.date_range(end=datetime.now(), periods=5, freq='D')
+        def compute():
+            returns = DataService.get_returns(tickers + ([benchmark] if benchmark else []), start_date, end_date,
+                                              interval)
+            columns = [t for t in tickers if t in returns.columns]
+            if not columns:
+                return {}
+            returns_df = returns[columns].dropna(how='all')
+            bench = returns.get(benchmark) if benchmark else None
+            if benchmark and bench is None:
+                raise ValueError(f"no bars for benchmark {benchmark}")
+            return DataService.calculate_rolling_metrics(returns_df, windows, bench)
         
-        if 'AAPL' in tickers:
-            data['AAPL'] = pd.DataFrame(aapl_data, index=dates)
+        key = selection_key(tickers, start_date, end_date, interval) + (windows, benchmark)
+        return result_cache.get_or_compute('rolling_metrics', key, compute)
+    
+    @staticmethod
+    def get_return_moments(tickers, start_date, end_date, interval='1d'):
+        # (tickers, annualized mean returns, annualized ledoit-wolf covariance) of the selection, memoized
+        tickers = [str(t).upper() for t in tickers]
         
-        if 'MSFT' in tickers:
-            data['MSFT'] = pd.DataFrame(msft_data, index=dates)
+        def compute():
+            returns = DataService.get_returns(tickers, start_date, end_date, interval)
+            returns_df = returns[[t for t in sorted(tickers) if t in returns.columns]].dropna(how='all')
+            if returns_df.empty or len(returns_df) < 2:
+                return [], np.empty(0), np.empty((0, 0))
+            cov, _ = ledoit_wolf(returns_df.to_numpy())
+            periods = PERIODS_PER_YEAR[interval]
+            return list(returns_df.columns), returns_df.mean().to_numpy() * periods, cov * periods
         
-        return data
+        return result_cache.get_or_compute('return_moments', selection_key(tickers, start_date, end_date, interval),
+                                           compute)
+    
+    @staticmethod
+    def optimize_portfolio(tickers, start_date, end_date, method='min_variance', interval='1d',
+                           target_return=None, risk_aversion=None):
+        # long-only weights by ticker from one of OPTIMIZERS; mean_variance takes an annual
+        # target_return or a risk_aversion
+        if method not in OPTIMIZERS:
+            raise ValueError(f"unknown optimizer {method!r}, expected one of {', '.join(OPTIMIZERS)}")
+        columns, mu, cov = DataService.get_return_moments(tickers, start_date, end_date, interval)
+        if not columns:
+            return pd.Series(dtype=float)
+        if method == 'min_variance':
+            weights = min_variance(cov)
+        elif method == 'risk_parity':
+            weights = risk_parity(cov)
+        else:
+            weights = mean_variance(mu, cov, target_return=target_return, risk_aversion=risk_aversion)
+        return pd.Series(weights, index=columns)
+    
+    @staticmethod
+    def get_efficient_frontier(tickers, start_date, end_date, interval='1d', points=50, risk_free=0.0):
+        # annualized long-only frontier of the selection: 'returns', 'volatility' and 'sharpe_ratio'
+        # arrays and a points x tickers 'weights' frame, memoized per selection
+        tickers = [str(t).upper() for t in tickers]
+        
+        def compute():
+            columns, mu, cov = DataService.get_return_moments(tickers, start_date, end_date, interval)
+            if not columns:
+                return {}
+            frontier = efficient_frontier(mu, cov, points, risk_free)
+            frontier['weights'] = pd.DataFrame(frontier['weights'], columns=columns)
+            return frontier
+        
+        key = selection_key(tickers, start_date, end_date, interval) + (int(points), float(risk_free))
+        return result_cache.get_or_compute('efficient_frontier', key, compute)
+    
+    @staticmethod
+    def get_portfolio_risk(tickers, start_date, end_date, weights=None, method='bootstrap', paths=100_000,
+                           horizons=DEFAULT_HORIZONS, levels=DEFAULT_LEVELS, seed=0, interval='1d'):
+        # monte carlo var and cvar of the portfolio as positive loss fractions, one row per
+        # (horizon in periods, confidence level); paths come from a normal fitted to the selection's
+        # returns or from resampled days of them. seeded runs are reproducible and memoized
+        tickers = [str(t).upper() for t in tickers]
+        if weights is not None:
+            weights = pd.Series(np.asarray(weights, dtype=float), index=tickers).sort_index()
+        
+        def compute():
+            returns = DataService.get_returns(tickers, start_date, end_date, interval)
+            columns = [t for t in sorted(tickers) if t in returns.columns]
+            if not columns:
+                return pd.DataFrame(columns=['horizon', 'level', 'var', 'cvar', 'expected_return'])
+            returns_df = returns[columns].dropna(how='all')
+            w = np.full(len(columns), 1.0 / len(columns)) if weights is None else weights[columns].to_numpy()
+            risk = monte_carlo_risk(w, paths, horizons, levels, method, returns=returns_df.to_numpy(), seed=seed)
+            return pd.DataFrame([
+                {'horizon': horizon, 'level': level, 'var': risk['var'][i, j, 0], 'cvar': risk['cvar'][i, j, 0],
+                 'expected_return': risk['expected_return'][i, 0]}
+                for i, horizon in enumerate(risk['horizons'])
+                for j, level in enumerate(risk['levels'])
+            ])
+        
+        if seed is None:
+            return compute()
+        key = selection_key(tickers, start_date, end_date, interval, weights) + (
+            method, int(paths), tuple(horizons), tuple(levels), seed
+        )
+        return result_cache.get_or_compute('portfolio_risk', key, compute)
+    
+    @staticmethod
+    def clear_cache():
+        # forget memoized results, e.g. after bars were edited outside the loaders
+        result_cache.clear()
     
     @staticmethod
     def get_stock_info(ticker):
@@ -39,6 +207,8 @@ class DataService:
     
     @staticmethod
     def calculate_returns(price_data):
+        if isinstance(price_data, PriceCube):
+            return price_data.returns_frame()
         if isinstance(price_data, dict):
             returns = {}
             for ticker, df in price_data.items():
@@ -57,37 +227,35 @@ class DataService:
         else:
             returns_df = returns
         
-        if returns_df.empty:
+        if len(returns_df) < 2:
             return {}
         
         if weights is None:
             weights = np.ones(len(returns_df.columns)) / len(returns_df.columns)
+        weights = np.asarray(weights, dtype=float)
         
-        portfolio_returns = (returns_df * weights).sum(axis=1)
+        metrics = {name: values[0] for name, values in batch_metrics(returns_df.to_numpy(), weights).items()}
         
+        portfolio_returns = pd.Series(portfolio_returns_matrix(returns_df.to_numpy(), weights)[:, 0],
+                                      index=returns_df.index)
         cumulative_returns = (1 + portfolio_returns).cumprod()
-        total_return = cumulative_returns.iloc[-1] - 1
-        
-        annualized_return = (1 + total_return) ** (252 / len(portfolio_returns)) - 1
-        volatility = portfolio_returns.std() * np.sqrt(252)
-        sharpe_ratio = annualized_return / volatility if volatility > 0 else 0
-        
         running_max = cumulative_returns.expanding().max()
         drawdown = (cumulative_returns - running_max) / running_max
-        max_drawdown = drawdown.min()
-        
-        downside_returns = portfolio_returns[portfolio_returns < 0]
-        downside_std = downside_returns.std() * np.sqrt(252)
-        sortino_ratio = annualized_return / downside_std if downside_std > 0 else 0
         
         return {
-            'total_return': total_return,
-            'annualized_return': annualized_return,
-            'volatility': volatility,
-            'sharpe_ratio': sharpe_ratio,
-            'sortino_ratio': sortino_ratio,
-            'max_drawdown': max_drawdown,
+            **metrics,
             'portfolio_returns': portfolio_returns,
             'cumulative_returns': cumulative_returns,
             'drawdown': drawdown
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    def calculate_portfolio_metrics_batch(returns, weights):
+        # metrics of every row of a K x N weights matrix in one pass, one row per portfolio
+        returns_df = pd.DataFrame(returns) if isinstance(returns, dict) else returns
+        if isinstance(weights, pd.DataFrame):
+            index = weights.index
+            weights = weights[returns_df.columns].to_numpy()
+        else:
+            index = None
+        return pd.DataFrame(batch_metrics(returns_df.to_numpy(), weights), index=index)
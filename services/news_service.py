@@ -1,6 +1,47 @@
+import os
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from src.db.sentiment_trends import get_sentiment_trends
+from src.ingest.news.sentiment import LexiconSentiment
+from src.ingest.news.topic_worker import load_detector, TOPIC_STATE_PATH
+from src.ingest.news.topics import TopicTrendDetector
+from src.ingest.news.embedding_worker import open_store, similar_articles, store_directory
+from src.ingest.news.vector_store import IVFIndex, IDS_FILE, INDEX_FILE
+
+@lru_cache(maxsize=1)
+def _sentiment_engine():
+    return LexiconSentiment()
+
+_topic_state = {'mtime': None, 'detector': None}
+
+def _topic_detector():
+    # reload the saved detector only after topic_worker rewrote it
+    try:
+        mtime = os.stat(TOPIC_STATE_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if mtime != _topic_state['mtime']:
+        _topic_state['detector'] = load_detector()
+        _topic_state['mtime'] = mtime
+    return _topic_state['detector']
+
+_vector_state = {'version': None, 'store': None, 'index': None}
+
+def _vector_search():
+    # reopen the memory maps only after embedding_worker appended vectors or rebuilt the index
+    directory = store_directory()
+    try:
+        version = (os.stat(directory / IDS_FILE).st_size,
+                   os.stat(directory / INDEX_FILE).st_mtime_ns if (directory / INDEX_FILE).exists() else None)
+    except FileNotFoundError:
+        return None, None
+    if version != _vector_state['version']:
+        store = open_store(directory)[0]
+        _vector_state.update(version=version, store=store, index=IVFIndex.load(store))
+    return _vector_state['store'], _vector_state['index']
 
 class NewsService:
     @staticmethod
@@ -31,47 +72,46 @@ class NewsService:
     
     @staticmethod
     def _analyze_sentiment_simple(text):
-        positive_words = ['gain', 'up', 'rise', 'bull', 'positive', 'growth', 'profit', 'strong', 'beat', 'outperform']
-        negative_words = ['loss', 'down', 'fall', 'bear', 'negative', 'decline', 'drop', 'weak', 'miss', 'underperform']
-        
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        
-        if positive_count > negative_count:
-            return 0.7
-        elif negative_count > positive_count:
-            return 0.3
-        else:
-            return 0.5
+        # lexicon compound score in -1..1, mapped to the 0..1 scale of the sentiment column
+        compound = _sentiment_engine().score_text(text or '')['compound']
+        return (compound + 1) / 2
     
     @staticmethod
-    def get_sentiment_trend(news_df, ticker=None):
-        if news_df.empty:
-            return pd.DataFrame()
-        
-        df = news_df.copy()
-        if ticker:
-            df = df[df['ticker'] == ticker]
-        
-        df['date'] = pd.to_datetime(df['published']).dt.date
-        sentiment_trend = df.groupby(['ticker', 'date'])['sentiment'].mean().reset_index()
-        
-        return sentiment_trend
+    def get_sentiment_trend(tickers=None, start_date=None, end_date=None, window=7, halflife=7.0, latest=False):
+        # rolling mean, ewma and z-score per ticker, computed in duckdb from the daily aggregates
+        return get_sentiment_trends(tickers, start_date, end_date, window=window, halflife=halflife, latest=latest)
     
     @staticmethod
-    def extract_topics(news_df, n_topics=5):
+    def extract_topics(news_df, n_topics=5, ticker=None):
         if news_df.empty:
             return []
         
-        all_titles = ' '.join(news_df['title'].astype(str))
-        
-        common_topics = ['earnings', 'acquisition', 'partnership', 'regulation', 'product', 'market', 'revenue', 'growth']
-        
-        topics = []
-        for topic in common_topics:
-            if topic in all_titles.lower():
-                count = all_titles.lower().count(topic)
-                topics.append({'topic': topic, 'frequency': count})
+        # one window spanning the whole frame so every article counts toward it, and a
+        # single mention is enough in a frame this small
+        df = news_df
+        span = timedelta(0)
+        if 'published' in df:
+            df = df.assign(published=pd.to_datetime(df['published'])).sort_values('published')
+            if df['published'].notna().any():
+                span = df['published'].max() - df['published'].min()
+        detector = TopicTrendDetector(window=span + timedelta(seconds=1), min_count=1)
+        for row in df.to_dict('records'):
+            tickers = [row['ticker']] if row.get('ticker') else []
+            published = row.get('published')
+            detector.add((row.get('title'), row.get('summary')), tickers, None if pd.isna(published) else published)
         
-        return sorted(topics, key=lambda x: x['frequency'], reverse=True)[:n_topics]
\ No newline at end of file
+        return detector.trending(ticker, n_topics)
+    
+    @staticmethod
+    def get_trending_topics(ticker=None, n_topics=10):
+        # terms trending in the latest window of the detector kept up to date by topic_worker
+        detector = _topic_detector()
+        return detector.trending(ticker, n_topics) if detector else []
+    
+    @staticmethod
+    def get_similar_articles(article_id, k=10):
+        # nearest articles by embedding, from the local vector store and ivf index
+        store, index = _vector_search()
+        if store is None:
+            return pd.DataFrame(columns=['id', 'title', 'url', 'ts_published', 'similarity'])
+        return similar_articles(article_id, k, store=store, index=index)
@@ -0,0 +1,185 @@
+"""memoized service results keyed by selection, dropped when the price store changes
+
+results live in an in-process lru bounded by bytes, and optionally in pickles on
+disk so they survive restarts and are shared between processes
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.db import db_manager, BASE_DIR
+from src.db.prices import price_store_version
+from src.db.query_cache import QueryCache
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_MB = int(os.environ.get("STOCK_PORT_RESULT_CACHE_MB", "64"))
+# 0 keeps results in memory only
+RESULT_CACHE_DISK_MB = int(os.environ.get("STOCK_PORT_RESULT_CACHE_DISK_MB", "0"))
+RESULT_CACHE_DIR = BASE_DIR / "data" / "cache" / "results"
+
+# writes to price_bars made in this process, and loads made by any process
+PRICE_TABLE = 'price_bars'
+PRICE_STAMP = '__price_store__'
+
+# returned by the lookups on a miss, since None is a valid result
+_MISSING = object()
+
+def weights_hash(weights) -> str:
+    """stable digest of a weight vector or matrix, 'default' for None"""
+    if weights is None:
+        return 'default'
+    if isinstance(weights, (pd.Series, pd.DataFrame)):
+        labels = repr(list(weights.index) + list(getattr(weights, 'columns', [])))
+        weights = weights.to_numpy()
+    else:
+        labels = ''
+    weights = np.ascontiguousarray(weights, dtype=np.float64)
+    return hashlib.sha1(labels.encode() + repr(weights.shape).encode() + weights.tobytes()).hexdigest()
+
+def selection_key(tickers, start_date, end_date, interval: str = '1d', weights=None) -> tuple:
+    """(tickers, start, end, interval, weights hash) with the defaults resolved, so equal selections share entries"""
+    end_date = end_date or date.today()
+    return (
+        tuple(sorted(str(t).upper() for t in tickers)),
+        str(pd.Timestamp(start_date).date()) if start_date else None,
+        str(pd.Timestamp(end_date).date()),
+        interval,
+        weights_hash(weights),
+    )
+
+def _copy(value: Any) -> Any:
+    """a copy callers can modify without touching the cached value
+    
+    read-only values such as price cubes are shared as they are
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+class ResultCache:
+    """memoizes computations whose inputs are price bars"""
+    
+    def __init__(self, max_bytes: int = RESULT_CACHE_MB * 1024 * 1024, disk_dir: Optional[Path] = None,
+                 disk_max_bytes: int = 0):
+        self.memory = QueryCache(max_bytes) if max_bytes else None
+        self.disk_dir = Path(disk_dir) if disk_dir and disk_max_bytes else None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_hits = 0
+        self.computations = 0
+    
+    @staticmethod
+    def versions() -> Dict[str, int]:
+        """the price_bars write version in this process and the store version shared by all processes"""
+        return {PRICE_TABLE: db_manager.table_versions.get(PRICE_TABLE, 0), PRICE_STAMP: price_store_version()}
+    
+    def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """the cached result for key, or compute() stored under it"""
+        # the database is part of the key, since every database counts its own versions
+        full_key = (db_manager.db_path, namespace, key)
+        versions = self.versions()
+        if self.memory is not None:
+            cached = self.memory.get(full_key, versions, default=_MISSING)
+            if cached is not _MISSING:
+                return _copy(cached)
+        
+        value = self._disk_get(full_key, versions[PRICE_STAMP])
+        if value is _MISSING:
+            value = compute()
+            self.computations += 1
+            self._disk_put(full_key, versions[PRICE_STAMP], value)
+        else:
+            self.disk_hits += 1
+        if self.memory is not None:
+            self.memory.put(full_key, value, versions, versions)
+        return _copy(value)
+    
+    def _disk_path(self, full_key) -> Path:
+        return self.disk_dir / (hashlib.sha1(repr(full_key).encode()).hexdigest() + '.pkl')
+    
+    def _disk_get(self, full_key, stamp: int) -> Any:
+        """the result stored on disk under full_key for this stamp, _MISSING when there is none
+        
+        other processes only see loads through the store version, so it alone versions disk entries
+        """
+        if self.disk_dir is None:
+            return _MISSING
+        path = self._disk_path(full_key)
+        try:
+            with open(path, 'rb') as f:
+                stored_key, stored_stamp, value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except Exception as e:
+            logger.warning(f"dropping unreadable cached result {path}: {e}")
+            path.unlink(missing_ok=True)
+            return _MISSING
+        if stored_key != full_key or stored_stamp != stamp:
+            path.unlink(missing_ok=True)
+            return _MISSING
+        os.utime(path)  # recently used, for eviction
+        return value
+    
+    def _disk_put(self, full_key, stamp: int, value: Any):
+        """pickle a result under full_key, then evict old files over the disk budget"""
+        if self.disk_dir is None:
+            return
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((full_key, stamp, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(full_key))
+        except Exception as e:
+            os.unlink(tmp_path)
+            logger.warning(f"could not cache result on disk: {e}")
+            return
+        self._evict_disk()
+    
+    def _evict_disk(self):
+        """delete least recently used files until the directory fits its budget"""
+        files = []
+        for path in self.disk_dir.glob('*.pkl'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda item: item[0]):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+    
+    def clear(self):
+        """drop every cached result, in memory and on disk"""
+        if self.memory is not None:
+            self.memory.clear()
+        if self.disk_dir is not None:
+            for path in self.disk_dir.glob('*.pkl'):
+                path.unlink(missing_ok=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """computation and hit counters, with the memory and disk use"""
+        stats = {'computations': self.computations, 'disk_hits': self.disk_hits}
+        if self.memory is not None:
+            stats.update(self.memory.stats())
+        if self.disk_dir is not None and self.disk_dir.exists():
+            stats['disk_bytes'] = sum(path.stat().st_size for path in self.disk_dir.glob('*.pkl'))
+        return stats
+
+result_cache = ResultCache(disk_dir=RESULT_CACHE_DIR, disk_max_bytes=RESULT_CACHE_DISK_MB * 1024 * 1024)
@@ -2,17 +2,36 @@
 
 import duckdb
 import pandas as pd
+import pyarrow as pa
 from pathlib import Path
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 import json
+import logging
+import time
 from datetime import datetime
 
+from .query_cache import (
+    QueryCache, make_key, normalize_sql, is_read_query, is_ddl, referenced_identifiers, written_tables
+)
+from .query_log import QueryLog
+
+logger = logging.getLogger(__name__)
+
 # database configuration
 BASE_DIR = Path(__file__).parent.parent.parent
 DATABASE_PATH = BASE_DIR / "data" / "stock_port.db"
 PARQUET_DIR = BASE_DIR / "data" / "parquet"
 
+# opt-in query result cache size, 0 disables it
+QUERY_CACHE_MB = int(os.environ.get("STOCK_PORT_QUERY_CACHE_MB", "0"))
+
+# statements slower than this are logged and appended to the query log
+SLOW_QUERY_MS = float(os.environ.get("STOCK_PORT_SLOW_QUERY_MS", "500"))
+QUERY_LOG_PATH = BASE_DIR / "data" / "query_log.jsonl"
+QUERY_STATS_PATH = BASE_DIR / "data" / "query_stats.json"
+PROFILE_DIR = BASE_DIR / "data" / "profiles"
+
 # ensure data directories exist
 DATABASE_PATH.parent.mkdir(exist_ok=True)
 PARQUET_DIR.mkdir(parents=True, exist_ok=True)
@@ -20,28 +39,156 @@ PARQUET_DIR.mkdir(parents=True, exist_ok=True)
 class DuckDBManager:
     """duckdb connection and operations manager"""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, cache_max_bytes: Optional[int] = None,
+                 slow_query_ms: float = SLOW_QUERY_MS, query_log_path: Optional[Path] = None,
+                 query_stats_path: Optional[Path] = None):
         self.db_path = db_path or str(DATABASE_PATH)
         self.parquet_dir = PARQUET_DIR
+        self.query_log = QueryLog(slow_query_ms, query_log_path, stats_path=query_stats_path)
+        
+        # per-table write counters, bumped by every write made through this manager
+        self.table_versions: Dict[str, int] = {}
+        self.query_cache: Optional[QueryCache] = None
+        if cache_max_bytes:
+            self.enable_cache(cache_max_bytes)
     
     def get_connection(self) -> duckdb.DuckDBPyConnection:
         """get duckdb connection"""
         return duckdb.connect(self.db_path)
     
-    def execute_query(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
+    def enable_cache(self, max_bytes: int = 64 * 1024 * 1024):
+        """cache read query results in memory until a table they read is written"""
+        self.query_cache = QueryCache(max_bytes)
+    
+    def disable_cache(self):
+        """stop caching and drop cached results"""
+        self.query_cache = None
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """hit/miss statistics of the query cache"""
+        if self.query_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.query_cache.stats()}
+    
+    def mark_tables_written(self, tables):
+        """bump version counters so cached results reading these tables are dropped"""
+        for table in tables:
+            table = table.lower()
+            self.table_versions[table] = self.table_versions.get(table, 0) + 1
+    
+    def _track_write(self, query: str):
+        """record the tables a statement writes to"""
+        if is_ddl(query) and self.query_cache is not None:
+            # schema changes can affect any query, including catalog lookups
+            self.query_cache.clear()
+        self.mark_tables_written(written_tables(query))
+    
+    def execute_query(self, query: str, params: Optional[Dict] = None, use_cache: bool = True) -> pd.DataFrame:
         """execute query and return results as dataframe"""
+        cacheable = use_cache and self.query_cache is not None and is_read_query(query)
+        started = time.perf_counter()
+        if cacheable:
+            key = make_key(query, params)
+            # snapshot before running so a concurrent write can't be cached as current
+            versions = dict(self.table_versions)
+            cached = self.query_cache.get(key, versions)
+            if cached is not None:
+                self._record('query', query, started, len(cached), cached=True)
+                return cached.copy()
+        
+        with self.get_connection() as conn:
+            result = self._execute(conn, query, params).df()
+        self._record('query', query, started, len(result))
+        
+        if cacheable:
+            self.query_cache.put(key, result, referenced_identifiers(query), versions)
+            return result.copy()
+        
+        if not is_read_query(query):
+            self._track_write(query)
+        return result
+    
+    def execute_arrow(self, query: str, params: Optional[Dict] = None) -> pa.Table:
+        """execute query and return results as an arrow table, skipping pandas"""
+        started = time.perf_counter()
+        with self.get_connection() as conn:
+            result = self._execute(conn, query, params).fetch_arrow_table()
+        self._record('arrow', query, started, result.num_rows)
+        
+        if not is_read_query(query):
+            self._track_write(query)
+        return result
+    
+    def iter_batches(self, query: str, params: Optional[Dict] = None,
+                     batch_size: int = 100_000) -> Iterator[pa.RecordBatch]:
+        """stream query results as arrow record batches of at most batch_size rows"""
+        started = time.perf_counter()
+        rows = 0
         with self.get_connection() as conn:
-            if params:
-                # convert dict params to list for duckdb
-                if isinstance(params, dict):
-                    # for simple named parameters, extract values in order
-                    param_values = list(params.values())
-                    return conn.execute(query, param_values).df()
-                return conn.execute(query, params).df()
-            return conn.execute(query).df()
+            batches = iter(self._execute(conn, query, params).to_arrow_reader(batch_size))
+            # only the query and the fetches are timed, not the consumer's work between batches
+            elapsed = time.perf_counter() - started
+            while True:
+                fetched = time.perf_counter()
+                batch = next(batches, None)
+                elapsed += time.perf_counter() - fetched
+                if batch is None:
+                    break
+                if batch.num_rows:
+                    rows += batch.num_rows
+                    yield batch
+        self.query_log.record('stream', query, elapsed * 1000, rows)
+    
+    def profile_query(self, query: str, params: Optional[Dict] = None,
+                      output_path: Optional[Path] = None) -> Path:
+        """run EXPLAIN ANALYZE and save duckdb's json profile of the statement"""
+        if output_path is None:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            output_path = PROFILE_DIR / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json"
+        output_path = Path(output_path)
+        
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA enable_profiling = 'json'")
+            try:
+                rows = self._execute(conn, f"EXPLAIN ANALYZE {query}", params).fetchall()
+            finally:
+                conn.execute("PRAGMA disable_profiling")
+        
+        # the analyzed plan is the second column of the single result row
+        plan = rows[0][1] if rows else ''
+        try:
+            profile = json.loads(plan)
+        except ValueError:
+            profile = {'plan': plan}
+        profile['sql'] = normalize_sql(query)
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+        logger.info(f"saved query profile to {output_path}")
+        return output_path
+    
+    def query_report(self, top: int = 20) -> List[Dict[str, Any]]:
+        """statements run by this manager, ranked by total time"""
+        return self.query_log.report(top)
+    
+    def _record(self, kind: str, query: str, started: float, rows: Optional[int] = None, cached: bool = False):
+        """pass a statement's timing to the query log"""
+        self.query_log.record(kind, query, (time.perf_counter() - started) * 1000, rows, cached)
+    
+    @staticmethod
+    def _execute(conn: duckdb.DuckDBPyConnection, query: str, params: Optional[Dict] = None):
+        """run a statement on a connection with dict or list params"""
+        if params:
+            # convert dict params to list for duckdb
+            if isinstance(params, dict):
+                # for simple named parameters, extract values in order
+                return conn.execute(query, list(params.values()))
+            return conn.execute(query, params)
+        return conn.execute(query)
     
     def insert_dataframe(self, df: pd.DataFrame, table_name: str, mode: str = 'append'):
         """insert dataframe to table"""
+        started = time.perf_counter()
         with self.get_connection() as conn:
             if mode == 'replace':
                 conn.execute(f"DELETE FROM {table_name}")
@@ -50,12 +197,73 @@ class DuckDBManager:
             conn.register('temp_df', df)
             conn.execute(f"INSERT INTO {table_name} SELECT * FROM temp_df")
             conn.unregister('temp_df')
+        self._record('insert', f"INSERT INTO {table_name} SELECT * FROM temp_df", started, len(df))
+        
+        self.mark_tables_written([table_name])
+    
+    def execute_bulk(self, statements: List[str],
+                     frames: Optional[Dict[str, pd.DataFrame]] = None) -> List[Optional[int]]:
+        """run write statements against registered dataframes in one transaction, returning their changed row counts"""
+        frames = frames or {}
+        counts = []
+        with self.get_connection() as conn:
+            for name, df in frames.items():
+                conn.register(name, df)
+            try:
+                conn.execute("BEGIN TRANSACTION")
+                for statement in statements:
+                    started = time.perf_counter()
+                    changed = conn.execute(statement).fetchone()
+                    counts.append(changed[0] if changed else None)
+                    self._record('bulk', statement, started, counts[-1])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                for name in frames:
+                    conn.unregister(name)
+                for statement in statements:
+                    self._track_write(statement)
+        return counts
+    
+    def ensure_sequence(self, table_name: str, column: str = 'id') -> str:
+        """make sure the id sequence for a table exists and return its name"""
+        with self.get_connection() as conn:
+            return create_id_sequence(conn, table_name, column)
+
+def create_id_sequence(conn: duckdb.DuckDBPyConnection, table_name: str, column: str = 'id') -> str:
+    """create an id sequence starting after the table's current max id"""
+    sequence_name = f"{table_name}_{column}_seq"
+    exists = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_sequences() WHERE sequence_name = ?",
+        [sequence_name]
+    ).fetchone()[0]
+    if exists:
+        return sequence_name
+    
+    # existing tables may already hold manually assigned ids
+    table_exists = conn.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?",
+        [table_name]
+    ).fetchone()[0]
+    start = 1
+    if table_exists:
+        start = conn.execute(
+            f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table_name}"
+        ).fetchone()[0]
+    conn.execute(f"CREATE SEQUENCE {sequence_name} START WITH {int(start)}")
+    return sequence_name
 
 # global database manager instance
-db_manager = DuckDBManager()
+db_manager = DuckDBManager(cache_max_bytes=QUERY_CACHE_MB * 1024 * 1024, query_log_path=QUERY_LOG_PATH,
+                           query_stats_path=QUERY_STATS_PATH)
 
 def create_tables():
     """create all database tables and schemas"""
+    if db_manager.query_cache is not None:
+        db_manager.query_cache.clear()
+    
     with db_manager.get_connection() as conn:
         # news articles table
         conn.execute("""
@@ -83,9 +291,10 @@ def create_tables():
         """)
         
         # ticker symbols table
+        create_id_sequence(conn, 'ticker_symbols')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS ticker_symbols (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('ticker_symbols_id_seq'),
                 symbol TEXT UNIQUE NOT NULL,
                 company_name TEXT,
                 aliases TEXT,
@@ -97,22 +306,28 @@ def create_tables():
         """)
         
         # article-ticker associations
+        create_id_sequence(conn, 'article_ticker_associations')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS article_ticker_associations (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('article_ticker_associations_id_seq'),
                 article_id INTEGER,
                 ticker_id INTEGER,
                 confidence FLOAT,
                 match_method TEXT,
                 context_snippet TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                mention_count INTEGER DEFAULT 1
             )
         """)
+        conn.execute(
+            "ALTER TABLE article_ticker_associations ADD COLUMN IF NOT EXISTS mention_count INTEGER DEFAULT 1"
+        )
         
         # news embeddings
+        create_id_sequence(conn, 'news_embeddings')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS news_embeddings (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('news_embeddings_id_seq'),
                 article_id INTEGER,
                 model_name TEXT,
                 embedding_type TEXT,
@@ -123,9 +338,10 @@ def create_tables():
         """)
         
         # article sentiments
+        create_id_sequence(conn, 'article_sentiments')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS article_sentiments (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('article_sentiments_id_seq'),
                 article_id INTEGER,
                 ticker_id INTEGER,
                 sentiment_type TEXT,
@@ -136,11 +352,13 @@ def create_tables():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        conn.execute("ALTER TABLE article_sentiments ADD COLUMN IF NOT EXISTS model_name TEXT")
         
         # crawl jobs tracking
+        create_id_sequence(conn, 'crawl_jobs')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS crawl_jobs (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('crawl_jobs_id_seq'),
                 job_type TEXT,
                 status TEXT,
                 ts_started TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -153,9 +371,10 @@ def create_tables():
         """)
         
         # daily ticker sentiment aggregates
+        create_id_sequence(conn, 'daily_ticker_sentiment')
         conn.execute("""
             CREATE TABLE IF NOT EXISTS daily_ticker_sentiment (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('daily_ticker_sentiment_id_seq'),
                 ticker_id INTEGER,
                 date DATE,
                 article_count INTEGER,
@@ -164,9 +383,47 @@ def create_tables():
                 positive_articles INTEGER,
                 negative_articles INTEGER,
                 neutral_articles INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                weighted_sentiment FLOAT,
+                total_mentions INTEGER DEFAULT 0,
+                unique_sources INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        for column_ddl in ("weighted_sentiment FLOAT", "total_mentions INTEGER DEFAULT 0",
+                           "unique_sources INTEGER DEFAULT 0", "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"):
+            conn.execute(f"ALTER TABLE daily_ticker_sentiment ADD COLUMN IF NOT EXISTS {column_ddl}")
+        
+        # (ticker, date) groups waiting for the daily_ticker_sentiment refresh
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_ticker_sentiment_dirty (
+                ticker_id INTEGER,
+                date DATE,
+                marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (ticker_id, date)
+            )
+        """)
+        
+        # daily ohlcv bars, loaded by src.db.prices
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_bars (
+                ticker TEXT NOT NULL,
+                date DATE NOT NULL,
+                open DOUBLE,
+                high DOUBLE,
+                low DOUBLE,
+                close DOUBLE,
+                adj_close DOUBLE,
+                volume BIGINT,
+                PRIMARY KEY (ticker, date)
+            )
+        """)
+        
+        # indexes, unique constraints and sequences declared by the models,
+        # also applied to databases created before they existed
+        from .schema import sync_schema_with_models
+        summary = sync_schema_with_models(conn)
+        logger.debug(f"schema sync: {summary}")
 
 def get_db():
     """get database connection context manager"""
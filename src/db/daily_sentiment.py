@@ -0,0 +1,163 @@
+"""incremental materialization of the daily_ticker_sentiment aggregate table"""
+
+import argparse
+import logging
+from typing import Iterable
+
+import pandas as pd
+
+from . import db_manager, create_tables
+
+logger = logging.getLogger(__name__)
+
+# vader convention for labelling a compound score
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+def mark_dirty_sql(frame_name: str) -> str:
+    """queue the (ticker, date) groups of the articles in a registered frame with an article_id column"""
+    return f"""
+        INSERT INTO daily_ticker_sentiment_dirty (ticker_id, date, marked_at)
+        SELECT DISTINCT a.ticker_id, CAST(n.ts_published AS DATE), CURRENT_TIMESTAMP
+        FROM (SELECT DISTINCT article_id FROM {frame_name}) f
+        JOIN article_ticker_associations a ON a.article_id = f.article_id
+        JOIN news_articles n ON n.id = a.article_id
+        WHERE n.ts_published IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """
+
+MARK_ALL_DIRTY_SQL = """
+    INSERT INTO daily_ticker_sentiment_dirty (ticker_id, date, marked_at)
+    SELECT DISTINCT a.ticker_id, CAST(n.ts_published AS DATE), CURRENT_TIMESTAMP
+    FROM article_ticker_associations a
+    JOIN news_articles n ON n.id = a.article_id
+    WHERE n.ts_published IS NOT NULL
+    ON CONFLICT DO NOTHING
+"""
+
+# one row per (article, ticker) in a dirty group, using ticker-scoped sentiment
+# where it exists and the article's overall sentiment otherwise
+_DIRTY_MENTIONS_CTE = """
+    WITH dirty AS (
+        SELECT ticker_id, date FROM daily_ticker_sentiment_dirty
+    ),
+    overall AS (
+        SELECT article_id, AVG(compound) AS compound
+        FROM article_sentiments
+        WHERE ticker_id IS NULL
+        GROUP BY article_id
+    ),
+    scoped AS (
+        SELECT article_id, ticker_id, AVG(compound) AS compound
+        FROM article_sentiments
+        WHERE ticker_id IS NOT NULL
+        GROUP BY article_id, ticker_id
+    ),
+    mentions AS (
+        SELECT a.ticker_id,
+               d.date,
+               a.article_id,
+               n.source,
+               COALESCE(a.mention_count, 1) AS mention_count,
+               COALESCE(s.compound, o.compound) AS sentiment
+        FROM article_ticker_associations a
+        JOIN news_articles n ON n.id = a.article_id
+        JOIN dirty d ON d.ticker_id = a.ticker_id AND d.date = CAST(n.ts_published AS DATE)
+        LEFT JOIN scoped s ON s.article_id = a.article_id AND s.ticker_id = a.ticker_id
+        LEFT JOIN overall o ON o.article_id = a.article_id
+    )
+"""
+
+REFRESH_SQL = _DIRTY_MENTIONS_CTE + f"""
+    INSERT INTO daily_ticker_sentiment (
+        ticker_id, date, article_count, avg_sentiment, sentiment_std, weighted_sentiment,
+        positive_articles, negative_articles, neutral_articles,
+        total_mentions, unique_sources, created_at, updated_at
+    )
+    SELECT ticker_id,
+           date,
+           COUNT(DISTINCT article_id),
+           AVG(sentiment),
+           STDDEV_SAMP(sentiment),
+           SUM(sentiment * mention_count) / NULLIF(SUM(mention_count) FILTER (WHERE sentiment IS NOT NULL), 0),
+           COUNT(DISTINCT article_id) FILTER (WHERE sentiment >= {POSITIVE_THRESHOLD}),
+           COUNT(DISTINCT article_id) FILTER (WHERE sentiment <= {NEGATIVE_THRESHOLD}),
+           COUNT(DISTINCT article_id) FILTER (WHERE sentiment > {NEGATIVE_THRESHOLD} AND sentiment < {POSITIVE_THRESHOLD}),
+           SUM(mention_count),
+           COUNT(DISTINCT source),
+           CURRENT_TIMESTAMP,
+           CURRENT_TIMESTAMP
+    FROM mentions
+    GROUP BY ticker_id, date
+    ON CONFLICT (ticker_id, date) DO UPDATE SET
+        article_count = EXCLUDED.article_count,
+        avg_sentiment = EXCLUDED.avg_sentiment,
+        sentiment_std = EXCLUDED.sentiment_std,
+        weighted_sentiment = EXCLUDED.weighted_sentiment,
+        positive_articles = EXCLUDED.positive_articles,
+        negative_articles = EXCLUDED.negative_articles,
+        neutral_articles = EXCLUDED.neutral_articles,
+        total_mentions = EXCLUDED.total_mentions,
+        unique_sources = EXCLUDED.unique_sources,
+        updated_at = EXCLUDED.updated_at
+"""
+
+# dirty groups with no remaining mentions, e.g. after associations were removed
+DELETE_EMPTY_SQL = """
+    DELETE FROM daily_ticker_sentiment t
+    WHERE EXISTS (
+        SELECT 1 FROM daily_ticker_sentiment_dirty d
+        WHERE d.ticker_id = t.ticker_id AND d.date = t.date
+    )
+    AND NOT EXISTS (
+        SELECT 1
+        FROM article_ticker_associations a
+        JOIN news_articles n ON n.id = a.article_id
+        WHERE a.ticker_id = t.ticker_id AND CAST(n.ts_published AS DATE) = t.date
+    )
+"""
+
+CLEAR_DIRTY_SQL = "DELETE FROM daily_ticker_sentiment_dirty"
+
+def mark_articles_dirty(article_ids: Iterable[int]):
+    """queue the groups touched by these articles for the next refresh"""
+    ids_df = pd.DataFrame({'article_id': [int(i) for i in article_ids]})
+    if ids_df.empty:
+        return
+    db_manager.execute_bulk([mark_dirty_sql('dirty_articles')], {'dirty_articles': ids_df})
+
+def mark_all_dirty():
+    """queue every (ticker, date) group, for backfills and schema changes"""
+    db_manager.execute_bulk([MARK_ALL_DIRTY_SQL])
+
+def pending_groups() -> int:
+    """number of (ticker, date) groups waiting to be refreshed"""
+    return int(db_manager.execute_query(
+        "SELECT COUNT(*) AS n FROM daily_ticker_sentiment_dirty", use_cache=False
+    ).iloc[0]['n'])
+
+def refresh_daily_ticker_sentiment() -> int:
+    """recompute only the dirty groups with one upsert aggregate, then clear the queue"""
+    pending = pending_groups()
+    if not pending:
+        return 0
+    
+    # the queue is cleared in the same transaction; keys committed by another
+    # writer after it started aren't visible to the delete and stay queued
+    db_manager.execute_bulk([REFRESH_SQL, DELETE_EMPTY_SQL, CLEAR_DIRTY_SQL])
+    logger.info(f"refreshed {pending} daily ticker sentiment groups")
+    return pending
+
+def main():
+    parser = argparse.ArgumentParser(description="refresh the daily_ticker_sentiment aggregates")
+    parser.add_argument('--full', action='store_true', help="recompute every group, not just the dirty ones")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    if args.full:
+        mark_all_dirty()
+    refresh_daily_ticker_sentiment()
+
+if __name__ == '__main__':
+    main()
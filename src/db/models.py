@@ -71,8 +71,8 @@ class NewsEmbedding(Base):
     model_name = Column(String(100), nullable=False, index=True)
     embedding_type = Column(String(50), nullable=False, index=True)  # title, text, combined
     
-    # vector data (stored as json array for compatibility)
-    embedding_vector = Column(JSONB, nullable=False)
+    # vector data; null when the float32 vector lives in the embedding store on disk
+    embedding_vector = Column(JSONB, nullable=True)
     vector_dim = Column(Integer, nullable=False)
     
     # processing metadata
@@ -0,0 +1,291 @@
+"""price bars as one aligned [field x date x ticker] array, in memory or memory-mapped from disk
+
+every ticker shares one calendar, with a [date x ticker] mask marking the bars
+that exist, so cross-sectional work (returns, last prices, bar counts) is a
+single array operation instead of a loop over per-ticker frames. the arrays are
+read-only: slices are views, and cached cubes can be handed out without copies.
+
+a cube of the whole price store can be written to data/cache/price_cube/ and
+opened with np.memmap, which costs nothing up front. run from the repo root:
+    python -m src.db.price_cube
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from . import db_manager, create_tables, BASE_DIR
+from .prices import PRICE_COLUMNS, price_store_version
+
+logger = logging.getLogger(__name__)
+
+PRICE_CUBE_DIR = BASE_DIR / "data" / "cache" / "price_cube"
+
+VALUES_FILE = 'values.npy'
+MASK_FILE = 'mask.npy'
+DATES_FILE = 'dates.npy'
+META_FILE = 'meta.json'
+
+# yfinance column names, as price_frames returns them
+FRAME_COLUMNS = {
+    'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'adj_close': 'Adj Close', 'volume': 'Volume',
+}
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+class PriceCube:
+    """values[field, date, ticker] with mask[date, ticker] true where a bar exists
+    
+    missing bars, and missing fields of a bar such as an unknown volume, are nan
+    in values; dates are datetime64[D] in ascending order
+    """
+    
+    def __init__(self, values: np.ndarray, mask: np.ndarray, dates: np.ndarray, tickers: Sequence[str],
+                 fields: Sequence[str] = PRICE_COLUMNS):
+        self.values = values
+        self.mask = mask
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.fields = list(fields)
+        self._columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        if values.shape != (len(self.fields), len(dates), len(self.tickers)) or mask.shape != values.shape[1:]:
+            raise ValueError(f"cube arrays {values.shape} and {mask.shape} do not match "
+                             f"{len(self.fields)} fields, {len(dates)} dates and {len(self.tickers)} tickers")
+    
+    @classmethod
+    def from_bars(cls, bars: pd.DataFrame, fields: Sequence[str] = PRICE_COLUMNS) -> 'PriceCube':
+        """a cube of long-format bars, as get_price_bars returns them"""
+        # hashed rather than sorted: bars are already ordered, so the uniques sort cheaply
+        columns, tickers = pd.factorize(bars['ticker'], sort=True)
+        rows, dates = pd.factorize(pd.to_datetime(bars['date']).to_numpy().astype('datetime64[D]'), sort=True)
+        values = np.full((len(fields), len(dates), len(tickers)), np.nan)
+        for i, field in enumerate(fields):
+            values[i, rows, columns] = pd.to_numeric(bars[field], errors='coerce').to_numpy(dtype=np.float64,
+                                                                                            na_value=np.nan)
+        mask = np.zeros((len(dates), len(tickers)), dtype=bool)
+        mask[rows, columns] = True
+        return cls(_readonly(values), _readonly(mask), _readonly(np.asarray(dates, dtype='datetime64[D]')),
+                   [str(t) for t in tickers], fields)
+    
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.mask.nbytes + self.dates.nbytes)
+    
+    def __len__(self) -> int:
+        return len(self.dates)
+    
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._columns
+    
+    def __repr__(self) -> str:
+        span = f"{self.dates[0]} to {self.dates[-1]}" if len(self.dates) else "no dates"
+        return f"PriceCube({len(self.tickers)} tickers, {len(self.dates)} dates, {span})"
+    
+    def field(self, name: str) -> np.ndarray:
+        """the [date x ticker] view of one field"""
+        return self.values[self.fields.index(name)]
+    
+    def select(self, tickers: Optional[Union[Sequence[str], slice]] = None, start_date: Optional[date] = None,
+               end_date: Optional[date] = None) -> 'PriceCube':
+        """the cube restricted to some tickers and an inclusive date range
+        
+        date ranges, ticker slices (by label or position) and tickers that form
+        a run in cube order are views of this cube; other ticker lists copy.
+        unknown tickers are left out
+        """
+        first = 0 if start_date is None else int(np.searchsorted(self.dates, np.datetime64(start_date, 'D')))
+        last = len(self.dates) if end_date is None else int(
+            np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right'))
+        rows = slice(first, last)
+        
+        if tickers is None:
+            columns = slice(None)
+        elif isinstance(tickers, slice):
+            start = self._columns[tickers.start] if isinstance(tickers.start, str) else tickers.start
+            stop = self._columns[tickers.stop] + 1 if isinstance(tickers.stop, str) else tickers.stop
+            columns = slice(start, stop, tickers.step)
+        else:
+            positions = [self._columns[t] for t in tickers if t in self._columns]
+            run = len(positions) and positions == list(range(positions[0], positions[0] + len(positions)))
+            columns = slice(positions[0], positions[-1] + 1) if run else positions
+        
+        values = self.values[:, rows][:, :, columns]
+        mask = self.mask[rows][:, columns]
+        names = self.tickers[columns] if isinstance(columns, slice) else [self.tickers[i] for i in columns]
+        if not isinstance(columns, slice):
+            values, mask = _readonly(values), _readonly(mask)
+        return PriceCube(values, mask, self.dates[rows], names, self.fields)
+    
+    def compact(self) -> 'PriceCube':
+        """the cube without dates or tickers that have no bars, itself when there are none"""
+        rows = self.mask.any(axis=1)
+        columns = self.mask.any(axis=0)
+        if rows.all() and columns.all():
+            return self
+        return PriceCube(_readonly(self.values[:, rows][:, :, columns]), _readonly(self.mask[rows][:, columns]),
+                         _readonly(self.dates[rows]), [t for t, keep in zip(self.tickers, columns) if keep], self.fields)
+    
+    def _last_rows(self) -> np.ndarray:
+        """[date x ticker] row of each ticker's latest bar up to each date, -1 before its first"""
+        rows = np.where(self.mask, np.arange(len(self.dates))[:, None], -1)
+        return np.maximum.accumulate(rows, axis=0) if len(rows) else rows
+    
+    def returns(self, field: str = 'close') -> np.ndarray:
+        """[date x ticker] simple returns from each ticker's previous bar, nan where there is no bar or none before"""
+        prices = self.field(field)
+        previous = np.full(self.mask.shape, -1)
+        previous[1:] = self._last_rows()[:-1]
+        before = np.take_along_axis(prices, np.maximum(previous, 0), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = prices / before - 1
+        returns[~self.mask | (previous < 0)] = np.nan
+        return returns
+    
+    def last(self, field: str = 'close') -> np.ndarray:
+        """each ticker's latest value of a field, nan for tickers without bars"""
+        if not len(self.dates):
+            return np.full(len(self.tickers), np.nan)
+        latest = len(self.dates) - 1 - np.argmax(self.mask[::-1], axis=0)
+        values = self.field(field)[latest, np.arange(len(self.tickers))]
+        return np.where(self.mask.any(axis=0), values, np.nan)
+    
+    def counts(self) -> np.ndarray:
+        """bars per ticker"""
+        return self.mask.sum(axis=0)
+    
+    def frame(self, field: str = 'close') -> pd.DataFrame:
+        """a [date x ticker] frame of one field, without copying it"""
+        return pd.DataFrame(self.field(field), index=pd.DatetimeIndex(self.dates, name='Date'),
+                            columns=self.tickers, copy=False)
+    
+    def returns_frame(self, field: str = 'close') -> pd.DataFrame:
+        """returns() as a [date x ticker] frame, without dates on which no ticker has one"""
+        returns = self.returns(field)
+        keep = ~np.isnan(returns).all(axis=1)
+        return pd.DataFrame(returns[keep], index=pd.DatetimeIndex(self.dates[keep], name='Date'),
+                            columns=self.tickers)
+    
+    def to_frames(self) -> Dict[str, pd.DataFrame]:
+        """{ticker: date-indexed frame of its own bars} with yfinance column names, as price_frames returns"""
+        frames = {}
+        for i, ticker in enumerate(self.tickers):
+            rows = self.mask[:, i]
+            if not rows.any():
+                continue
+            frame = pd.DataFrame(self.values[:, rows, i].T, index=pd.DatetimeIndex(self.dates[rows], name='Date'),
+                                 columns=[FRAME_COLUMNS.get(f, f) for f in self.fields])
+            if 'Volume' in frame.columns and frame['Volume'].notna().all():
+                frame['Volume'] = frame['Volume'].astype(np.int64)
+            frames[ticker] = frame
+        return frames
+    
+    def save(self, directory: Path, version: int = 0):
+        """write the cube as .npy files that load() can memory-map"""
+        directory = Path(directory)
+        staging = _staging(directory)
+        np.save(staging / VALUES_FILE, self.values)
+        np.save(staging / MASK_FILE, self.mask)
+        np.save(staging / DATES_FILE, self.dates)
+        _swap_in(staging, directory, self.tickers, self.fields, version)
+    
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> 'PriceCube':
+        """a saved cube, memory-mapped read-only unless mmap is false"""
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        mode = 'r' if mmap else None
+        values = np.load(directory / VALUES_FILE, mmap_mode=mode)
+        mask = np.load(directory / MASK_FILE, mmap_mode=mode)
+        dates = np.load(directory / DATES_FILE)
+        if not mmap:
+            values, mask = _readonly(values), _readonly(mask)
+        return cls(values, mask, _readonly(dates), meta['tickers'], meta['fields'])
+
+def _staging(directory: Path) -> Path:
+    """an empty sibling directory to write cube files into"""
+    staging = directory.with_name(directory.name + '.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    return staging
+
+def _swap_in(staging: Path, directory: Path, tickers: List[str], fields: List[str], version: int,
+             database: Optional[str] = None):
+    """write the metadata and replace the cube directory with the staged one"""
+    meta = {'tickers': tickers, 'fields': fields, 'version': version, 'database': database}
+    (staging / META_FILE).write_text(json.dumps(meta))
+    # readers holding maps of the old files keep them until they close
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    _open_cached.cache_clear()
+
+def build_price_cube(directory: Path = PRICE_CUBE_DIR, batch_size: int = 1_000_000) -> PriceCube:
+    """write every bar in price_bars to a memory-mappable cube, streaming the table in batches"""
+    directory = Path(directory)
+    version = price_store_version()
+    tickers = db_manager.execute_query("SELECT DISTINCT ticker FROM price_bars ORDER BY ticker",
+                                       use_cache=False)['ticker'].tolist()
+    dates = db_manager.execute_query("SELECT DISTINCT date FROM price_bars ORDER BY date",
+                                     use_cache=False)['date']
+    dates = pd.to_datetime(dates).to_numpy().astype('datetime64[D]')
+    
+    staging = _staging(directory)
+    # filled in place on disk, so the cube never has to fit in memory
+    values = np.lib.format.open_memmap(staging / VALUES_FILE, mode='w+', dtype=np.float64,
+                                       shape=(len(PRICE_COLUMNS), len(dates), len(tickers)))
+    mask = np.lib.format.open_memmap(staging / MASK_FILE, mode='w+', dtype=bool, shape=(len(dates), len(tickers)))
+    values[:] = np.nan
+    positions = pd.Index(tickers)
+    query = f"SELECT ticker, date, {', '.join(PRICE_COLUMNS)} FROM price_bars"
+    for batch in db_manager.iter_batches(query, batch_size=batch_size):
+        frame = batch.to_pandas()
+        rows = np.searchsorted(dates, pd.to_datetime(frame['date']).to_numpy().astype('datetime64[D]'))
+        columns = positions.get_indexer(frame['ticker'])
+        for i, field in enumerate(PRICE_COLUMNS):
+            values[i, rows, columns] = frame[field].to_numpy(dtype=np.float64, na_value=np.nan)
+        mask[rows, columns] = True
+    values.flush()
+    mask.flush()
+    del values, mask
+    np.save(staging / DATES_FILE, dates)
+    _swap_in(staging, directory, tickers, PRICE_COLUMNS, version, str(db_manager.db_path))
+    logger.info(f"wrote a cube of {len(tickers)} tickers x {len(dates)} dates to {directory}")
+    return PriceCube.load(directory)
+
+@lru_cache(maxsize=4)
+def _open_cached(directory: str, version: int) -> PriceCube:
+    return PriceCube.load(Path(directory))
+
+def open_price_cube(directory: Path = PRICE_CUBE_DIR) -> Optional[PriceCube]:
+    """the memory-mapped store cube, or None when it was never built or bars were loaded since"""
+    try:
+        meta = json.loads((Path(directory) / META_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # versions count loads per database, so the cube must come from this one
+    version = price_store_version()
+    if meta.get('version') != version or meta.get('database') != str(db_manager.db_path):
+        return None
+    return _open_cached(str(directory), version)
+
+def main():
+    parser = argparse.ArgumentParser(description="write the price store as a memory-mappable price cube")
+    parser.add_argument('--batch-size', type=int, default=1_000_000, help="bars read per batch")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    logger.info(repr(build_price_cube(batch_size=args.batch_size)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""daily ohlcv bars in the price_bars table, with a bulk csv loader and parquet partitions
+
+bars are kept sorted by (ticker, date) as they are loaded, so duckdb's row group
+min/max statistics skip everything outside the requested tickers and dates.
+partitions under data/parquet/prices/ticker=X/year=Y/ hold the same bars for
+other tools, and can rebuild the table. run from the repo root:
+    python -m src.db.prices load data/csv/*.csv --export-parquet
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import duckdb
+import pandas as pd
+
+from . import db_manager, create_tables, PARQUET_DIR
+
+logger = logging.getLogger(__name__)
+
+PRICE_PARQUET_DIR = PARQUET_DIR / "prices"
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+# interval -> date_trunc part, bars of longer intervals are labelled with the period start
+INTERVALS = {'1d': None, '1wk': 'week', '1mo': 'month'}
+
+# accepted csv headers after duckdb normalizes them, the first match wins
+CSV_ALIASES = {
+    'ticker': ('ticker', 'symbol'),
+    'date': ('date', 'datetime', 'timestamp'),
+    'open': ('open',),
+    'high': ('high',),
+    'low': ('low',),
+    'close': ('close',),
+    'adj_close': ('adj_close', 'adjclose', 'adjusted_close'),
+    'volume': ('volume',),
+}
+
+# ticker for files without a ticker column: the file name without its extension
+_FILE_TICKER = r"regexp_extract(filename, '([^/\\]+?)(\.[^./\\]*)?$', 1)"
+
+def _sql_list(values: Iterable[str]) -> str:
+    return ", ".join("'" + str(value).replace("'", "''") + "'" for value in values)
+
+def _csv_source(paths: Sequence[Union[str, Path]]) -> str:
+    return (f"read_csv([{_sql_list(paths)}], union_by_name = true, filename = true, "
+            f"normalize_names = true, header = true)")
+
+def _staging_sql(source: str, columns: List[str]) -> str:
+    """statement filling price_bars_staging from csv files with the given normalized header columns"""
+    def pick(name: str) -> Optional[str]:
+        # normalize_names prefixes sql keywords such as close with an underscore
+        candidates = [c for alias in CSV_ALIASES[name] for c in (alias, '_' + alias)]
+        return next((c for c in candidates if c in columns), None)
+    
+    missing = [name for name in ('date', 'close') if pick(name) is None]
+    if missing:
+        raise ValueError(f"price csv files need {' and '.join(missing)} columns, got {columns}")
+    ticker = _FILE_TICKER
+    if pick('ticker'):
+        ticker = f"COALESCE(NULLIF(TRIM(CAST({pick('ticker')} AS TEXT)), ''), {_FILE_TICKER})"
+    close = f"CAST({pick('close')} AS DOUBLE)"
+    
+    def price(name: str) -> str:
+        # missing open/high/low fall back to the close, a missing adjusted close to the close
+        return f"COALESCE(CAST({pick(name)} AS DOUBLE), {close})" if pick(name) else close
+    
+    volume = f"CAST({pick('volume')} AS BIGINT)" if pick('volume') else "NULL"
+    return f"""
+        CREATE OR REPLACE TABLE price_bars_staging AS
+        SELECT UPPER({ticker}) AS ticker,
+               CAST({pick('date')} AS DATE) AS date,
+               {price('open')} AS open, {price('high')} AS high, {price('low')} AS low, {close} AS close,
+               {price('adj_close')} AS adj_close, {volume} AS volume
+        FROM {source}
+        WHERE {pick('date')} IS NOT NULL AND {pick('close')} IS NOT NULL
+        -- a (ticker, date) repeated across files keeps the row from the last file
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY UPPER({ticker}), CAST({pick('date')} AS DATE)
+                                   ORDER BY filename DESC) = 1
+    """
+
+def load_price_csv(paths: Sequence[Union[str, Path]]) -> Dict:
+    """upsert daily bars from csv files, returning the bars and tickers read
+    
+    files either have a ticker (or symbol) column or hold one ticker named by the
+    file, as in AAPL.csv; yahoo-style headers (Date, Open, High, Low, Close,
+    Adj Close, Volume) are recognised
+    """
+    paths = [str(path) for path in paths]
+    if not paths:
+        return {'bars': 0, 'tickers': []}
+    source = _csv_source(paths)
+    columns = db_manager.execute_query(f"DESCRIBE SELECT * FROM {source}", use_cache=False)['column_name'].tolist()
+    # staged in its own statement: filled inside the upsert's transaction, the staged
+    # rows come back out of (ticker, date) order and the table's zone maps stop pruning
+    db_manager.execute_query(_staging_sql(source, columns), use_cache=False)
+    try:
+        db_manager.execute_bulk([f"""
+            INSERT OR REPLACE INTO price_bars (ticker, date, {', '.join(PRICE_COLUMNS)})
+            SELECT ticker, date, {', '.join(PRICE_COLUMNS)}
+            FROM price_bars_staging
+            ORDER BY ticker, date
+        """])
+        loaded = db_manager.execute_query(
+            "SELECT ticker, COUNT(*) AS bars FROM price_bars_staging GROUP BY ticker ORDER BY ticker",
+            use_cache=False
+        )
+    finally:
+        db_manager.execute_query("DROP TABLE IF EXISTS price_bars_staging", use_cache=False)
+    mark_price_store_updated()
+    stats = {'bars': int(loaded['bars'].sum()), 'tickers': loaded['ticker'].tolist()}
+    logger.info(f"loaded {stats['bars']} bars for {len(stats['tickers'])} tickers")
+    return stats
+
+def _price_version_path(db_path: Optional[str] = None) -> Path:
+    """file holding the price store version of a database, kept next to it"""
+    return Path(f"{db_path or db_manager.db_path}.prices.version")
+
+def mark_price_store_updated(db_path: Optional[str] = None) -> int:
+    """advance the price store version seen by price_store_version(), returning the new version
+    
+    the version is a counter rather than a file time, so loads closer together than
+    the filesystem's timestamp resolution still get distinct versions
+    """
+    path = _price_version_path(db_path)
+    version = price_store_version(db_path) + 1
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # replaced atomically, so readers in other processes never see a partial number
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return version
+
+def price_store_version(db_path: Optional[str] = None) -> int:
+    """number of loads into a database's price bars, in this process or another; 0 before the first"""
+    try:
+        return int(_price_version_path(db_path).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return 0
+
+def _count_bars() -> int:
+    return int(db_manager.execute_query("SELECT COUNT(*) AS n FROM price_bars", use_cache=False)['n'][0])
+
+def export_price_partitions(tickers: Optional[Sequence[str]] = None, directory: Path = PRICE_PARQUET_DIR) -> int:
+    """write the bars of some or all tickers to parquet partitions by ticker and year
+    
+    the tickers' existing partitions are replaced, other tickers' are left alone
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    if tickers is None:
+        tickers = db_manager.execute_query(
+            "SELECT DISTINCT ticker FROM price_bars", use_cache=False
+        )['ticker'].tolist()
+    tickers = [str(t).upper() for t in tickers]
+    if not tickers:
+        return 0
+    for ticker in tickers:
+        shutil.rmtree(directory / f"ticker={ticker}", ignore_errors=True)
+    
+    target = str(directory).replace("'", "''")
+    db_manager.execute_bulk([f"""
+        COPY (
+            SELECT ticker, YEAR(date) AS year, date, {', '.join(PRICE_COLUMNS)}
+            FROM price_bars
+            WHERE ticker IN ({_sql_list(tickers)})
+            ORDER BY ticker, date
+        ) TO '{target}' (FORMAT PARQUET, PARTITION_BY (ticker, year), OVERWRITE_OR_IGNORE true)
+    """])
+    logger.info(f"exported price partitions of {len(tickers)} tickers to {directory}")
+    return len(tickers)
+
+def import_price_partitions(directory: Path = PRICE_PARQUET_DIR) -> int:
+    """upsert every bar from the parquet partitions, e.g. into a new database"""
+    pattern = str(directory / "**" / "*.parquet").replace("'", "''")
+    before = _count_bars()
+    db_manager.execute_bulk([f"""
+        INSERT OR REPLACE INTO price_bars (ticker, date, {', '.join(PRICE_COLUMNS)})
+        SELECT ticker, date, {', '.join(PRICE_COLUMNS)}
+        FROM read_parquet('{pattern}', hive_partitioning = true)
+        ORDER BY ticker, date
+    """])
+    mark_price_store_updated()
+    return _count_bars() - before
+
+def _bars_sql(tickers: Sequence[str], interval: str) -> str:
+    part = INTERVALS[interval]
+    # a literal ticker list, unlike a subquery, is pushed down into the scan
+    filters = f"""
+        WHERE ticker IN ({_sql_list(tickers)})
+          AND date BETWEEN ? AND ?
+    """
+    if part is None:
+        return f"""
+            SELECT ticker, date, {', '.join(PRICE_COLUMNS)}
+            FROM price_bars
+            {filters}
+            ORDER BY ticker, date
+        """
+    return f"""
+        SELECT ticker,
+               CAST(date_trunc('{part}', date) AS DATE) AS date,
+               arg_min(open, date) AS open,
+               MAX(high) AS high,
+               MIN(low) AS low,
+               arg_max(close, date) AS close,
+               arg_max(adj_close, date) AS adj_close,
+               CAST(SUM(volume) AS BIGINT) AS volume
+        FROM price_bars
+        {filters}
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """
+
+def resolve_range(start_date: Optional[date] = None, end_date: Optional[date] = None) -> Tuple[date, date]:
+    """the date range get_price_bars reads: end defaults to today, start to a year before the end"""
+    end_date = pd.Timestamp(end_date or date.today()).date()
+    start_date = pd.Timestamp(start_date).date() if start_date else end_date - timedelta(days=365)
+    return start_date, end_date
+
+def get_price_bars(tickers: Sequence[str], start_date: Optional[date] = None, end_date: Optional[date] = None,
+                   interval: str = '1d') -> pd.DataFrame:
+    """bars of the tickers between two dates, long format, resampled to 1d, 1wk or 1mo
+    
+    end_date defaults to today and start_date to a year before it; weekly and
+    monthly bars only aggregate the days inside the range
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"unsupported interval {interval!r}, expected one of {', '.join(INTERVALS)}")
+    start_date, end_date = resolve_range(start_date, end_date)
+    tickers = [str(t).upper() for t in tickers]
+    if not tickers:
+        return _empty_bars()
+    try:
+        bars = db_manager.execute_query(_bars_sql(tickers, interval), [start_date, end_date])
+    except duckdb.CatalogException:
+        # price_bars is created on first load
+        return _empty_bars()
+    return bars if len(bars) else _empty_bars()
+
+def _empty_bars() -> pd.DataFrame:
+    """long-format bars without rows, typed as get_price_bars returns them"""
+    bars = pd.DataFrame({'ticker': pd.Series(dtype=object), 'date': pd.Series(dtype='datetime64[ns]')})
+    for column in PRICE_COLUMNS:
+        bars[column] = pd.Series(dtype='float64')
+    return bars
+
+def price_frames(bars: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """split long-format bars into one date-indexed frame per ticker, with yfinance column names"""
+    renamed = bars.rename(columns={
+        'date': 'Date', 'open': 'Open', 'high': 'High', 'low': 'Low',
+        'close': 'Close', 'adj_close': 'Adj Close', 'volume': 'Volume',
+    })
+    renamed['Date'] = pd.to_datetime(renamed['Date'])
+    return {
+        ticker: frame.drop(columns='ticker').set_index('Date')
+        for ticker, frame in renamed.groupby('ticker', sort=False)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="load daily ohlcv bars into price_bars")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    load = subparsers.add_parser('load', help="upsert bars from csv files")
+    load.add_argument('paths', nargs='+', help="csv files, with a ticker column or named after their ticker")
+    load.add_argument('--export-parquet', action='store_true', help="rewrite the loaded tickers' parquet partitions")
+    export = subparsers.add_parser('export', help="write parquet partitions")
+    export.add_argument('--tickers', nargs='*', help="only these tickers")
+    subparsers.add_parser('import', help="upsert bars from the parquet partitions")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    
+    if args.command == 'load':
+        stats = load_price_csv(args.paths)
+        if args.export_parquet:
+            export_price_partitions(stats['tickers'])
+    elif args.command == 'export':
+        export_price_partitions(args.tickers or None)
+    else:
+        logger.info(f"imported {import_price_partitions()} new bars")
+
+if __name__ == '__main__':
+    main()
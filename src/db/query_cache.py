@@ -0,0 +1,159 @@
+"""in-process query result cache invalidated by per-table write versions"""
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+_IDENTIFIER_RE = re.compile(r'[a-z_][a-z0-9_]*')
+_READ_PREFIXES = ('select', 'with', 'from', 'values')
+_WRITE_TARGET_RE = re.compile(
+    r'\b(?:insert\s+(?:or\s+\w+\s+)?into'
+    r'|update'
+    r'|delete\s+from'
+    r'|truncate(?:\s+table)?'
+    r'|copy'
+    r'|(?:create|drop|alter)(?:\s+or\s+replace)?(?:\s+temp(?:orary)?)?\s+table(?:\s+if(?:\s+not)?\s+exists)?'
+    r')\s+"?([a-z_][\w.]*)"?'
+)
+_DDL_RE = re.compile(r'^\s*(?:create|drop|alter)\b')
+# functions and keywords whose value changes between runs of the same statement
+_VOLATILE_RE = re.compile(
+    r'\b(?:nextval|currval|setseed|random|gen_random_uuid|uuid|now|today|get_current_time(?:stamp)?'
+    r'|transaction_timestamp|statement_timestamp)\s*\('
+    r'|\b(?:current_date|current_time|current_timestamp|localtime|localtimestamp)\b'
+)
+
+def normalize_sql(query: str) -> str:
+    """collapse whitespace and trailing semicolons so equivalent sql shares a key"""
+    return ' '.join(query.split()).rstrip(';').strip()
+
+def is_read_query(query: str) -> bool:
+    """true for statements whose results are safe to cache: reads that call no volatile function"""
+    statement = normalize_sql(query).lower()
+    return statement.startswith(_READ_PREFIXES) and not written_tables(query) and not is_volatile(statement)
+
+def is_volatile(query: str) -> bool:
+    """true for statements calling sequences, random or the clock, whose results differ between runs"""
+    return bool(_VOLATILE_RE.search(query.lower()))
+
+def referenced_identifiers(query: str) -> Set[str]:
+    """every identifier in the statement, a superset of the tables it reads"""
+    return set(_IDENTIFIER_RE.findall(query.lower()))
+
+def written_tables(query: str) -> Set[str]:
+    """tables a statement writes to, without schema prefix"""
+    return {name.split('.')[-1] for name in _WRITE_TARGET_RE.findall(query.lower())}
+
+def is_ddl(query: str) -> bool:
+    """true for create/drop/alter statements"""
+    return bool(_DDL_RE.match(query.lower()))
+
+def make_key(query: str, params: Any = None) -> Tuple[str, str]:
+    """cache key from normalized sql and parameter values"""
+    if isinstance(params, dict):
+        params = list(params.values())
+    return normalize_sql(query), repr(params)
+
+def dataframe_nbytes(df: pd.DataFrame) -> int:
+    """approximate in-memory size of a dataframe"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def value_nbytes(value: Any) -> int:
+    """approximate in-memory size of a cached result: frames, series, arrays, objects with nbytes and containers of them"""
+    if isinstance(value, pd.DataFrame):
+        return dataframe_nbytes(value)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray) or hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_nbytes(k) + value_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+class QueryCache:
+    """lru cache of query results, bounded by bytes and checked against table versions
+    
+    results are usually dataframes, but any value value_nbytes can size is accepted
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (df, nbytes, {identifier: version})
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: Hashable, versions: Dict[str, int], default: Any = None) -> Optional[Any]:
+        """return the cached result if none of its tables changed since it was stored, else default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            df, nbytes, snapshot = entry
+            if any(versions.get(name, 0) != version for name, version in snapshot.items()):
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return df
+    
+    def put(self, key: Hashable, df: Any, identifiers: Iterable[str], versions: Dict[str, int]):
+        """store a result with the versions of the tables it read"""
+        nbytes = value_nbytes(df)
+        if nbytes > self.max_bytes:
+            return
+        
+        snapshot = {name: versions.get(name, 0) for name in identifiers}
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df, nbytes, snapshot)
+            self._bytes += nbytes
+            
+            # evict least recently used entries until we're under budget
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+    
+    def clear(self):
+        """drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """hit/miss counters and current memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+    
+    def _drop(self, key: Hashable):
+        """remove an entry, caller holds the lock"""
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
@@ -0,0 +1,212 @@
+"""slow query log for DuckDBManager and a report ranking statements by total time
+
+every statement's totals are added to a json file next to the slow log every
+flush_seconds and at exit, so statements that are cheap but run often are
+ranked along with the slow ones. the slow log keeps the detail of each slow run
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .query_cache import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+# distinct statements whose totals are kept, least recently run dropped first
+MAX_STATEMENTS = 1000
+
+# seconds between writes of the totals to the stats file
+FLUSH_SECONDS = 60.0
+
+def _new_totals(kind: str) -> Dict[str, Any]:
+    return {'kind': kind, 'calls': 0, 'cached': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+
+def _merge(totals: Dict[str, Any], other: Dict[str, Any]):
+    """add other's counts to totals"""
+    for name in ('calls', 'cached', 'total_ms', 'rows'):
+        totals[name] += other.get(name) or 0
+    totals['max_ms'] = max(totals['max_ms'], other.get('max_ms') or 0.0)
+
+class QueryLog:
+    """times statements, keeps per-statement totals and appends slow ones to a jsonl file
+    
+    totals are kept for the max_statements most recently run statements, so
+    statements with inlined literals can't grow them without bound. with a
+    stats_path, totals gathered since the last flush are added to that file
+    """
+    
+    def __init__(self, slow_ms: float = 500.0, log_path: Optional[Path] = None,
+                 max_statements: int = MAX_STATEMENTS, stats_path: Optional[Path] = None,
+                 flush_seconds: float = FLUSH_SECONDS):
+        self.slow_ms = slow_ms
+        self.log_path = Path(log_path) if log_path else None
+        self.stats_path = Path(stats_path) if stats_path else None
+        self.max_statements = max_statements
+        self.flush_seconds = flush_seconds
+        self._stats: OrderedDict = OrderedDict()  # statement -> totals
+        self._unsaved: OrderedDict = OrderedDict()  # statement -> totals since the last flush
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+        if self.stats_path:
+            atexit.register(self.flush)
+    
+    def record(self, kind: str, query: str, elapsed_ms: float, rows: Optional[int] = None, cached: bool = False):
+        """add one timed statement, logging it if it crossed the slow threshold
+        
+        cached marks a result served from the query cache without running the statement
+        """
+        statement = normalize_sql(query)
+        run = {'calls': 1, 'cached': int(cached), 'total_ms': elapsed_ms, 'max_ms': elapsed_ms, 'rows': rows or 0}
+        totals = [self._stats, self._unsaved] if self.stats_path else [self._stats]
+        with self._lock:
+            for table in totals:
+                _merge(table.setdefault(statement, _new_totals(kind)), run)
+                table.move_to_end(statement)
+                while len(table) > self.max_statements:
+                    table.popitem(last=False)
+            due = self.stats_path and time.monotonic() - self._flushed >= self.flush_seconds
+        if due:
+            self.flush()
+        
+        if elapsed_ms < self.slow_ms:
+            return
+        
+        logger.warning(f"slow {kind} ({elapsed_ms:.0f} ms, {rows} rows): {statement[:200]}")
+        if self.log_path:
+            entry = {
+                'ts': datetime.now().isoformat(timespec='seconds'),
+                'kind': kind,
+                'elapsed_ms': round(elapsed_ms, 3),
+                'rows': rows,
+                'cached': cached,
+                'sql': statement
+            }
+            with self._lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+    
+    def report(self, top: int = 20) -> List[Dict[str, Any]]:
+        """statements timed in this process, ranked by total time"""
+        with self._lock:
+            rows = [{'sql': sql, **stats} for sql, stats in self._stats.items()]
+        return _rank(rows, top)
+    
+    def reset(self):
+        """forget the in-process totals"""
+        with self._lock:
+            self._stats.clear()
+    
+    def flush(self):
+        """add the totals gathered since the last flush to the stats file"""
+        with self._lock:
+            unsaved = self._unsaved
+            self._unsaved = OrderedDict()
+            self._flushed = time.monotonic()
+        if not unsaved or not self.stats_path:
+            return
+        
+        try:
+            saved = load_stats(self.stats_path)
+        except FileNotFoundError:
+            saved = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"starting over from unreadable query stats {self.stats_path}: {e}")
+            saved = {}
+        for statement, totals in unsaved.items():
+            _merge(saved.setdefault(statement, _new_totals(totals['kind'])), totals)
+        # the file keeps the statements with the most total time
+        kept = sorted(saved.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:self.max_statements]
+        
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.stats_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(dict(kept), f)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            os.unlink(tmp_path)
+            logger.warning(f"could not save query stats: {e}")
+
+def _rank(rows: List[Dict[str, Any]], top: int) -> List[Dict[str, Any]]:
+    """sort statement totals by total time and add the mean"""
+    for row in rows:
+        row['mean_ms'] = row['total_ms'] / row['calls'] if row['calls'] else 0.0
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows[:top]
+
+def load_stats(stats_path: Path) -> Dict[str, Dict[str, Any]]:
+    """statement -> totals saved by QueryLog.flush"""
+    with open(stats_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_log(log_path: Path) -> List[Dict[str, Any]]:
+    """aggregate a slow query jsonl file into per-statement totals"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            stats = totals.setdefault(entry['sql'], {
+                'kind': entry.get('kind'), 'calls': 0, 'cached': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0
+            })
+            stats['calls'] += 1
+            stats['cached'] += bool(entry.get('cached'))
+            stats['total_ms'] += entry['elapsed_ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['elapsed_ms'])
+            stats['rows'] += entry.get('rows') or 0
+    return [{'sql': sql, **stats} for sql, stats in totals.items()]
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    """fixed-width table of ranked statements"""
+    lines = [f"{'total ms':>12} {'calls':>7} {'cached':>7} {'slow':>6} "
+             f"{'mean ms':>10} {'max ms':>10} {'rows':>10}  statement"]
+    lines.append("-" * 107)
+    for row in rows:
+        lines.append(
+            f"{row['total_ms']:>12.1f} {row['calls']:>7} {row['cached']:>7} {row.get('slow', 0):>6} "
+            f"{row['mean_ms']:>10.1f} {row['max_ms']:>10.1f} {row['rows']:>10}  {row['sql'][:120]}"
+        )
+    return '\n'.join(lines)
+
+def combine(stats: Dict[str, Dict[str, Any]], slow: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """saved totals with each statement's slow runs counted and their worst time folded into max_ms"""
+    rows = {sql: {'sql': sql, **totals, 'slow': 0} for sql, totals in stats.items()}
+    for entry in slow:
+        row = rows.get(entry['sql'])
+        if row is None:
+            # totals not flushed yet, or dropped from the file: the slow runs are all we know
+            row = rows[entry['sql']] = {**entry, 'slow': 0}
+        row['slow'] += entry['calls']
+        row['max_ms'] = max(row['max_ms'], entry['max_ms'])
+    return list(rows.values())
+
+def main():
+    from . import QUERY_LOG_PATH, QUERY_STATS_PATH
+    
+    parser = argparse.ArgumentParser(description="rank logged statements by total time")
+    parser.add_argument('log_path', nargs='?', default=str(QUERY_LOG_PATH), help="slow query jsonl file")
+    parser.add_argument('--stats', default=str(QUERY_STATS_PATH), help="per-statement totals json file")
+    parser.add_argument('--top', type=int, default=20, help="number of statements to show")
+    args = parser.parse_args()
+    
+    stats_path, log_path = Path(args.stats), Path(args.log_path)
+    stats = load_stats(stats_path) if stats_path.exists() else {}
+    slow = load_log(log_path) if log_path.exists() else []
+    if not stats and not slow:
+        print(f"no query stats at {stats_path} and no slow query log at {log_path}")
+        return
+    
+    print(format_report(_rank(combine(stats, slow), args.top)))
+
+if __name__ == '__main__':
+    main()
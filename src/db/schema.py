@@ -0,0 +1,159 @@
+"""keep the duckdb schema's indexes, constraints and sequences in line with the sqlalchemy models"""
+
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import duckdb
+from sqlalchemy import Boolean, Integer, UniqueConstraint
+
+from . import create_id_sequence
+from .models import Base
+
+logger = logging.getLogger(__name__)
+
+# model column -> duckdb column, where the duckdb tables use a different name
+MODEL_COLUMN_ALIASES = {
+    'news_embeddings': {
+        'embedding_vector': 'vector',
+        'vector_dim': 'dimension',
+        'ts_created': 'created_at',
+    },
+    'ticker_symbols': {
+        'market_cap_tier': 'market_cap',
+        'company_aliases': 'aliases',
+        'ts_created': 'created_at',
+    },
+    'article_ticker_associations': {
+        'confidence_score': 'confidence',
+        'tagging_method': 'match_method',
+        'mention_context': 'context_snippet',
+        'ts_created': 'created_at',
+    },
+    'article_sentiments': {
+        'associated_ticker_id': 'ticker_id',
+        'vader_compound': 'compound',
+        'vader_positive': 'positive',
+        'vader_neutral': 'neutral',
+        'vader_negative': 'negative',
+        'final_sentiment_score': 'compound',
+        'ts_created': 'created_at',
+    },
+    'daily_ticker_sentiment': {
+        'avg_sentiment_score': 'avg_sentiment',
+        'positive_count': 'positive_articles',
+        'negative_count': 'negative_articles',
+        'neutral_count': 'neutral_articles',
+        'weighted_sentiment_score': 'weighted_sentiment',
+        'ts_created': 'created_at',
+        'ts_updated': 'updated_at',
+    },
+}
+
+def _is_flag_index(index) -> bool:
+    """a plain index over boolean columns only, which can't narrow a lookup"""
+    return not index.unique and all(isinstance(c.type, Boolean) for c in index.columns)
+
+def flag_index_names() -> Set[str]:
+    """the models' indexes on boolean flags, which are not mirrored in duckdb"""
+    return {index.name for table in Base.metadata.sorted_tables for index in table.indexes if _is_flag_index(index)}
+
+def model_index_specs() -> List[Tuple[str, str, List[str], bool]]:
+    """(index name, table, model columns, unique) for every index and unique constraint in the models
+    
+    indexes on boolean flags such as is_processed are left out: they can't make a
+    lookup selective, and every batch that rewrites the flags would pay to maintain them
+    """
+    specs = []
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if _is_flag_index(index):
+                continue
+            specs.append((index.name, table.name, [c.name for c in index.columns], bool(index.unique)))
+        
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                columns = [c.name for c in constraint.columns]
+                name = constraint.name or f"uq_{table.name}_{'_'.join(columns)}"
+                specs.append((name, table.name, columns, True))
+    return specs
+
+def model_sequence_tables() -> List[str]:
+    """tables whose integer primary key autoincrements in the models"""
+    tables = []
+    for table in Base.metadata.sorted_tables:
+        primary_key = list(table.primary_key.columns)
+        if len(primary_key) == 1 and isinstance(primary_key[0].type, Integer) and primary_key[0].autoincrement:
+            tables.append(table.name)
+    return tables
+
+def _duckdb_columns(conn: duckdb.DuckDBPyConnection) -> Dict[str, Dict[str, Optional[str]]]:
+    """table -> {column: default expression} for the main schema"""
+    rows = conn.execute("""
+        SELECT table_name, column_name, column_default
+        FROM duckdb_columns()
+        WHERE schema_name = 'main'
+    """).fetchall()
+    columns = {}
+    for table_name, column_name, column_default in rows:
+        columns.setdefault(table_name, {})[column_name] = column_default
+    return columns
+
+def _existing_unique_column_sets(conn: duckdb.DuckDBPyConnection) -> Set[Tuple[str, Tuple[str, ...]]]:
+    """(table, columns) already covered by a primary key or unique constraint"""
+    rows = conn.execute("""
+        SELECT table_name, constraint_column_names
+        FROM duckdb_constraints()
+        WHERE constraint_type IN ('PRIMARY KEY', 'UNIQUE')
+    """).fetchall()
+    return {(table_name, tuple(columns)) for table_name, columns in rows}
+
+def sync_schema_with_models(conn: duckdb.DuckDBPyConnection) -> Dict[str, int]:
+    """create the models' sequences, ART indexes and unique constraints on an existing duckdb schema"""
+    columns = _duckdb_columns(conn)
+    covered = _existing_unique_column_sets(conn)
+    existing_indexes = {row[0] for row in conn.execute("SELECT index_name FROM duckdb_indexes()").fetchall()}
+    summary = {'sequences': 0, 'indexes': 0, 'skipped': 0, 'dropped': 0}
+    
+    # flag indexes created by earlier versions of this sync
+    for index_name in sorted(flag_index_names() & existing_indexes):
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+        summary['dropped'] += 1
+    
+    # id sequences and defaults for tables created before they had one
+    for table_name in model_sequence_tables():
+        table_columns = columns.get(table_name)
+        if not table_columns or 'id' not in table_columns:
+            continue
+        sequence_name = create_id_sequence(conn, table_name)
+        if not table_columns['id']:
+            conn.execute(f"ALTER TABLE {table_name} ALTER COLUMN id SET DEFAULT nextval('{sequence_name}')")
+            summary['sequences'] += 1
+    
+    for index_name, table_name, model_columns, unique in model_index_specs():
+        table_columns = columns.get(table_name)
+        if not table_columns or index_name in existing_indexes:
+            continue
+        
+        aliases = MODEL_COLUMN_ALIASES.get(table_name, {})
+        duck_columns = [aliases.get(c, c) for c in model_columns]
+        if any(c not in table_columns for c in duck_columns):
+            logger.debug(f"skipping {index_name}: {table_name} has no column for {model_columns}")
+            summary['skipped'] += 1
+            continue
+        
+        # the duckdb ddl already declares some of these as column constraints
+        if (table_name, tuple(duck_columns)) in covered:
+            continue
+        
+        unique_sql = "UNIQUE " if unique else ""
+        try:
+            conn.execute(
+                f"CREATE {unique_sql}INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(duck_columns)})"
+            )
+            summary['indexes'] += 1
+        except duckdb.ConstraintException as e:
+            # existing rows violate the constraint, leave it for manual cleanup
+            logger.warning(f"could not create {index_name} on {table_name}: {e}")
+            summary['skipped'] += 1
+    
+    return summary
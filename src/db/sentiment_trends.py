@@ -0,0 +1,154 @@
+"""rolling, ewma and z-score sentiment trends per ticker, computed in duckdb from daily_ticker_sentiment"""
+
+import math
+import os
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional, Sequence
+
+import duckdb
+import pandas as pd
+
+from . import db_manager
+from .query_cache import QueryCache, make_key, referenced_identifiers
+
+# trend results cached in this process; writes made here invalidate them at once,
+# refreshes run by another process show up within the ttl
+TREND_CACHE_MB = int(os.environ.get("STOCK_PORT_TREND_CACHE_MB", "16"))
+TREND_CACHE_TTL = float(os.environ.get("STOCK_PORT_TREND_CACHE_TTL", "60"))
+
+# ewma era length; weights from two eras back, below 2 ** -40, are dropped
+EWMA_ERA_HALFLIVES = 40
+
+TREND_COLUMNS = ['symbol', 'ticker_id', 'date', 'article_count', 'sentiment', 'rolling_mean', 'ewma', 'zscore']
+
+# pseudo-table whose version advances every ttl seconds
+_CLOCK = '__trend_clock__'
+
+_trend_cache = QueryCache(TREND_CACHE_MB * 1024 * 1024) if TREND_CACHE_MB else None
+
+def _trend_sql(window: int, zscore_window: int, halflife: float, tickers: bool, latest: bool) -> str:
+    """one statement computing every trend column with window functions
+    
+    the ewma decays by calendar days rather than rows, and weights each day by its
+    article count. days are grouped into eras of EWMA_ERA_HALFLIVES half-lives;
+    within an era a day s is weighted exp(decay * (s - era start)), so both sums are
+    plain running sums over the era and the factor relating them to a row's own date
+    cancels in the ratio. the era before carries in its totals decayed to the era
+    start, and older eras, weighted below 2 ** -EWMA_ERA_HALFLIVES, are dropped.
+    every exponent stays within the era length, so no weight underflows however
+    long the range
+    """
+    decay = math.log(2) / halflife
+    era = max(1, math.ceil(EWMA_ERA_HALFLIVES * halflife))
+    carry = math.exp(-decay * era)
+    ticker_filter = "AND t.symbol IN (SELECT UNNEST(?))" if tickers else ""
+    latest_filter = "QUALIFY ROW_NUMBER() OVER (PARTITION BY ticker_id ORDER BY date DESC) = 1" if latest else ""
+    return f"""
+        WITH daily AS (
+            SELECT d.ticker_id,
+                   t.symbol,
+                   d.date,
+                   d.article_count,
+                   COALESCE(d.weighted_sentiment, d.avg_sentiment) AS sentiment,
+                   CAST(FLOOR(date_diff('day', DATE '1970-01-01', d.date) / {era}) AS BIGINT) AS era
+            FROM daily_ticker_sentiment d
+            JOIN ticker_symbols t ON t.id = d.ticker_id
+            WHERE d.date BETWEEN ? AND ?
+              AND d.article_count > 0
+              {ticker_filter}
+        ),
+        weighted AS (
+            SELECT *,
+                   article_count * EXP({decay} * (date_diff('day', DATE '1970-01-01', date) - era * {era})) AS decay_weight
+            FROM daily
+        ),
+        carried AS (
+            SELECT ticker_id,
+                   era + 1 AS era,
+                   {carry} * SUM(sentiment * decay_weight) AS carried_sum,
+                   {carry} * SUM(decay_weight) AS carried_weight
+            FROM weighted
+            GROUP BY ticker_id, era
+        ),
+        trends AS (
+            SELECT w.ticker_id,
+                   w.symbol,
+                   w.date,
+                   w.article_count,
+                   w.sentiment,
+                   SUM(w.sentiment * w.article_count) OVER rolling / SUM(w.article_count) OVER rolling AS rolling_mean,
+                   (SUM(w.sentiment * w.decay_weight) OVER history + COALESCE(c.carried_sum, 0))
+                       / (SUM(w.decay_weight) OVER history + COALESCE(c.carried_weight, 0)) AS ewma,
+                   (w.sentiment - AVG(w.sentiment) OVER zscore) / NULLIF(STDDEV_SAMP(w.sentiment) OVER zscore, 0) AS zscore
+            FROM weighted w
+            LEFT JOIN carried c ON c.ticker_id = w.ticker_id AND c.era = w.era
+            WINDOW rolling AS (PARTITION BY w.ticker_id ORDER BY w.date
+                               RANGE BETWEEN INTERVAL {window - 1} DAYS PRECEDING AND CURRENT ROW),
+                   history AS (PARTITION BY w.ticker_id, w.era ORDER BY w.date
+                               ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+                   zscore AS (PARTITION BY w.ticker_id ORDER BY w.date
+                              RANGE BETWEEN INTERVAL {zscore_window - 1} DAYS PRECEDING AND CURRENT ROW)
+        )
+        SELECT symbol, ticker_id, date, article_count, sentiment, rolling_mean, ewma, zscore
+        FROM trends
+        WHERE date >= ?
+        {latest_filter}
+        ORDER BY symbol, date
+    """
+
+def _cache_versions() -> Dict[str, int]:
+    versions = dict(db_manager.table_versions)
+    versions[_CLOCK] = int(time.time() // TREND_CACHE_TTL) if TREND_CACHE_TTL else 0
+    return versions
+
+def get_sentiment_trends(tickers: Optional[Sequence[str]] = None, start_date: Optional[date] = None,
+                         end_date: Optional[date] = None, window: int = 7, zscore_window: int = 30,
+                         halflife: float = 7.0, latest: bool = False, use_cache: bool = True) -> pd.DataFrame:
+    """daily sentiment with its rolling mean, ewma and z-score for each ticker, in one query
+    
+    rolling_mean is the article-weighted mean over the last window days, ewma halves
+    a day's weight every halflife days, and zscore compares a day with the mean and
+    standard deviation of the last zscore_window days. history before start_date is
+    read so the first days of the range are warmed up. with latest, only each
+    ticker's most recent day is returned
+    """
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=90)
+    warmup = max(window, zscore_window, math.ceil(6 * halflife))
+    
+    query = _trend_sql(window, zscore_window, halflife, tickers is not None, latest)
+    params = [start_date - timedelta(days=warmup), end_date]
+    if tickers is not None:
+        params.append([str(t).upper() for t in tickers])
+    params.append(start_date)
+    
+    cacheable = use_cache and _trend_cache is not None
+    if cacheable:
+        key = make_key(query, params)
+        versions = _cache_versions()
+        cached = _trend_cache.get(key, versions)
+        if cached is not None:
+            return cached.copy()
+    
+    try:
+        result = db_manager.execute_query(query, params, use_cache=False)
+    except duckdb.CatalogException:
+        # a fresh database without the aggregate tables has no trends yet
+        return pd.DataFrame(columns=TREND_COLUMNS)
+    
+    if cacheable:
+        _trend_cache.put(key, result, referenced_identifiers(query) | {_CLOCK}, versions)
+        return result.copy()
+    return result
+
+def clear_trend_cache():
+    """drop cached trends, e.g. after a refresh in another process"""
+    if _trend_cache is not None:
+        _trend_cache.clear()
+
+def trend_cache_stats() -> Dict:
+    """hit/miss statistics of the trend cache"""
+    if _trend_cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **_trend_cache.stats()}
@@ -0,0 +1,177 @@
+"""embed news articles into the float32 vector store and answer similar-article queries
+
+vectors live in data/embeddings/<model>/ next to the embedder's idf table and the
+ivf index; news_embeddings keeps one catalog row per embedded article, with no
+vector text. run from the repo root:
+    python -m src.ingest.news.embedding_worker
+    python -m src.ingest.news.embedding_worker --build-index
+    python -m src.ingest.news.embedding_worker --similar 1234
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ...db import db_manager, create_tables, BASE_DIR
+from .embeddings import HashingEmbedder, MODEL_NAME, EMBEDDING_TYPE
+from .vector_store import EmbeddingStore, IVFIndex
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_DIR = BASE_DIR / "data" / "embeddings"
+EMBEDDING_DIM = 256
+IDF_FILE = 'idf.npz'
+
+# rebuild the index once this share of the vectors is only reachable by exact scan
+REINDEX_FRACTION = 0.2
+
+ARTICLES_SQL = "SELECT id, title, text FROM news_articles ORDER BY id"
+
+UNEMBEDDED_ARTICLES_SQL = f"""
+    SELECT n.id, n.title, n.text
+    FROM news_articles n
+    WHERE NOT EXISTS (
+        SELECT 1 FROM news_embeddings e
+        WHERE e.article_id = n.id
+          AND e.model_name = '{MODEL_NAME}'
+          AND e.embedding_type = '{EMBEDDING_TYPE}'
+    )
+    ORDER BY n.id
+"""
+
+def _insert_catalog_sql(frame_name: str, dim: int) -> str:
+    """catalog rows for the articles in a registered frame whose vectors were just stored"""
+    return f"""
+        INSERT INTO news_embeddings (article_id, model_name, embedding_type, vector, dimension, created_at)
+        SELECT b.article_id, '{MODEL_NAME}', '{EMBEDDING_TYPE}', NULL, {int(dim)}, CURRENT_TIMESTAMP
+        FROM {frame_name} b
+        WHERE NOT EXISTS (
+            SELECT 1 FROM news_embeddings e
+            WHERE e.article_id = b.article_id
+              AND e.model_name = '{MODEL_NAME}'
+              AND e.embedding_type = '{EMBEDDING_TYPE}'
+        )
+    """
+
+def _flag_embedded_sql(frame_name: str) -> str:
+    return f"""
+        UPDATE news_articles SET has_embeddings = TRUE
+        WHERE id IN (SELECT article_id FROM {frame_name})
+    """
+
+def _texts(batch: pa.RecordBatch):
+    columns = batch.to_pydict()
+    texts = [f"{title or ''} {text or ''}" for title, text in zip(columns['title'], columns['text'])]
+    return columns['id'], texts
+
+def store_directory(model_name: str = MODEL_NAME) -> Path:
+    return EMBEDDINGS_DIR / model_name
+
+def open_store(directory: Optional[Path] = None) -> Tuple[EmbeddingStore, HashingEmbedder]:
+    """the vector store and the embedder whose idf its vectors were made with"""
+    directory = Path(directory or store_directory())
+    embedder = HashingEmbedder.load_or_create(directory / IDF_FILE, dim=EMBEDDING_DIM)
+    return EmbeddingStore(directory, embedder.dim, MODEL_NAME), embedder
+
+def fit_embedder(embedder: HashingEmbedder, batch_size: int = 20000):
+    """count document frequencies over every article"""
+    for batch in db_manager.iter_batches(ARTICLES_SQL, batch_size=batch_size):
+        embedder.fit(_texts(batch)[1])
+    logger.info(f"fitted idf on {embedder.documents} articles")
+
+def run_embedding(batch_size: int = 20000, rebuild: bool = False, build_index: bool = False,
+                  limit: Optional[int] = None, directory: Optional[Path] = None) -> Dict[str, float]:
+    """embed every article without a vector from this model, then refresh the index if it is stale
+    
+    the idf table is fitted on the first run and kept afterwards, so vectors from
+    different runs stay comparable; rebuild refits it and re-embeds everything
+    """
+    directory = Path(directory or store_directory())
+    started = time.perf_counter()
+    if rebuild:
+        EmbeddingStore(directory, EMBEDDING_DIM, MODEL_NAME).clear()
+        (directory / IDF_FILE).unlink(missing_ok=True)
+        db_manager.execute_query(
+            "DELETE FROM news_embeddings WHERE model_name = ? AND embedding_type = ?",
+            [MODEL_NAME, EMBEDDING_TYPE], use_cache=False
+        )
+    store, embedder = open_store(directory)
+    if not embedder.documents:
+        fit_embedder(embedder, batch_size)
+        embedder.save(directory / IDF_FILE)
+    
+    query = UNEMBEDDED_ARTICLES_SQL + (f" LIMIT {int(limit)}" if limit else "")
+    stats = {'articles': 0, 'seconds': 0.0}
+    for batch in db_manager.iter_batches(query, batch_size=batch_size):
+        ids, texts = _texts(batch)
+        # vectors first: an article cataloged as embedded always has one
+        store.append(np.asarray(ids, dtype=np.int64), embedder.embed(texts))
+        db_manager.execute_bulk(
+            [_insert_catalog_sql('embedding_batch', store.dim), _flag_embedded_sql('embedding_batch')],
+            {'embedding_batch': pd.DataFrame({'article_id': ids})}
+        )
+        stats['articles'] += batch.num_rows
+        logger.info(f"embedded {stats['articles']} articles")
+    
+    index = IVFIndex.load(store)
+    unindexed = len(store) - (index.size if index else 0)
+    if len(store) and (build_index or unindexed > REINDEX_FRACTION * len(store)):
+        IVFIndex.build(store)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+def similar_articles(article_id: int, k: int = 10, nprobe: int = 16,
+                     store: Optional[EmbeddingStore] = None, index: Optional[IVFIndex] = None) -> pd.DataFrame:
+    """the k articles closest to an embedded article, by cosine similarity
+    
+    searches the ivf index when there is one and scans the store otherwise
+    """
+    if store is None:
+        store = open_store()[0]
+        index = IVFIndex.load(store)
+    query = store.get(article_id)
+    if query is None:
+        return pd.DataFrame(columns=['id', 'title', 'url', 'ts_published', 'similarity'])
+    
+    # one extra hit, the article itself is its own closest match
+    if index is not None:
+        ids, scores = index.search(query, k + 1, nprobe)
+    else:
+        ids, scores = store.search_exact(query, k + 1)
+    hits = pd.DataFrame({'id': ids, 'similarity': scores})
+    hits = hits[hits['id'] != article_id].head(k)
+    
+    articles = db_manager.execute_query(
+        "SELECT id, title, url, ts_published FROM news_articles WHERE id IN (SELECT UNNEST(?))",
+        [hits['id'].tolist()]
+    )
+    return hits.merge(articles, on='id')[['id', 'title', 'url', 'ts_published', 'similarity']]
+
+def main():
+    parser = argparse.ArgumentParser(description="embed news articles and index them for similarity search")
+    parser.add_argument('--batch-size', type=int, default=20000, help="articles per embedded and written batch")
+    parser.add_argument('--rebuild', action='store_true', help="drop stored vectors, refit idf and re-embed everything")
+    parser.add_argument('--build-index', action='store_true', help="rebuild the ivf index even if it is current")
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many articles")
+    parser.add_argument('--similar', type=int, default=None, help="print the articles closest to this article id")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    
+    stats = run_embedding(args.batch_size, args.rebuild, args.build_index, args.limit)
+    rate = stats['articles'] / stats['seconds'] if stats['seconds'] else 0.0
+    logger.info(f"done: {stats['articles']} articles, {rate:.0f} articles/sec")
+    
+    if args.similar is not None:
+        for row in similar_articles(args.similar).itertuples():
+            print(f"{row.similarity:6.3f}  {row.id:>8}  {row.title}")
+
+if __name__ == '__main__':
+    main()
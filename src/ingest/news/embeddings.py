@@ -0,0 +1,118 @@
+"""local, deterministic article embeddings from a hashed tf-idf random projection
+
+every word and bigram is hashed straight onto a few signed dimensions, which is a
+very sparse random projection of its one-hot vector, so no vocabulary, model file
+or network is needed and the same text always gets the same vector
+"""
+
+import re
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .topics import STOPWORDS, term_hashes
+
+MODEL_NAME = 'hashed-tfidf-v1'
+EMBEDDING_TYPE = 'combined'
+
+EMBEDDING_WORD = re.compile(r"[a-z0-9]+")
+
+# buckets of the hashed document-frequency table behind the idf weights
+IDF_BUCKETS = 1 << 20
+
+_PRIME = (1 << 31) - 1
+
+def embedding_terms(text: str) -> List[str]:
+    """words and bigrams of a text, without stopwords, with repeats kept for term frequency"""
+    words = [w for w in EMBEDDING_WORD.findall(text.lower()) if len(w) > 1 and w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class HashingEmbedder:
+    """float32 unit vectors of dim dimensions, compared with a dot product
+    
+    a term adds tf-idf * sign to each of its probes dimensions. idf comes from
+    document frequencies counted into a hashed table by fit(); before fitting
+    every term weighs the same. once fitted, terms in fewer than min_df articles
+    are left out
+    """
+    
+    def __init__(self, dim: int = 256, probes: int = 2, min_df: int = 5, seed: int = 0):
+        self.dim = dim
+        self.probes = probes
+        self.min_df = min_df
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(probes, 1), dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=(probes, 1), dtype=np.int64)
+        self.document_counts = np.zeros(IDF_BUCKETS, dtype=np.int32)
+        self.documents = 0
+    
+    def fit(self, texts: Iterable[str]) -> 'HashingEmbedder':
+        """count document frequencies of the texts' terms, can be called on several batches"""
+        for text in texts:
+            terms = embedding_terms(text or '')
+            if terms:
+                self.document_counts[np.unique(term_hashes(terms) % IDF_BUCKETS)] += 1
+            self.documents += 1
+        return self
+    
+    def idf(self, hashes: np.ndarray) -> np.ndarray:
+        if not self.documents:
+            return np.ones(len(hashes), dtype=np.float32)
+        df = self.document_counts[hashes % IDF_BUCKETS]
+        return (np.log((1 + self.documents) / (1 + df)) + 1).astype(np.float32)
+    
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """len(texts) x dim float32 matrix of unit vectors, zero for texts without terms"""
+        documents = [embedding_terms(text or '') for text in texts]
+        lengths = np.fromiter(map(len, documents), dtype=np.int64, count=len(documents))
+        hashes = term_hashes(list(chain.from_iterable(documents)))
+        doc_of = np.repeat(np.arange(len(documents)), lengths)
+        
+        # sublinear term frequency: sum per (document, term) first, then 1 + log
+        keys, tf = np.unique(doc_of * (1 << 32) + hashes, return_counts=True)
+        terms = keys % (1 << 32)
+        term_docs = keys // (1 << 32)
+        weights = (1 + np.log(tf)).astype(np.float32) * self.idf(terms)
+        if self.documents and self.min_df > 1:
+            # terms too rare to be shared with other articles only add noise to the projection;
+            # articles made only of such terms keep them rather than ending up empty
+            rare = self.document_counts[terms % IDF_BUCKETS] < self.min_df
+            common = np.bincount(term_docs[~rare], minlength=len(documents))
+            weights[rare & (common[term_docs] > 0)] = 0
+        
+        # every probe sends the term's weight to one dimension with a hashed sign
+        mixed = (self._a * (terms % _PRIME) + self._b) % _PRIME
+        dims = mixed % self.dim
+        signs = np.where((mixed >> 16) & 1, 1.0, -1.0).astype(np.float32)
+        flat = (term_docs * self.dim + dims).ravel()
+        values = (signs * weights).ravel()
+        matrix = np.bincount(flat, weights=values, minlength=len(documents) * self.dim)
+        matrix = matrix.reshape(len(documents), self.dim).astype(np.float32)
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+    
+    def save(self, path: Union[str, Path]):
+        """write the idf table and settings"""
+        np.savez_compressed(
+            path, dim=self.dim, probes=self.probes, min_df=self.min_df, a=self._a, b=self._b,
+            document_counts=self.document_counts, documents=self.documents
+        )
+    
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'HashingEmbedder':
+        with np.load(path) as saved:
+            embedder = cls(int(saved['dim']), int(saved['probes']), int(saved['min_df']))
+            embedder._a, embedder._b = saved['a'], saved['b']
+            embedder.document_counts = saved['document_counts']
+            embedder.documents = int(saved['documents'])
+        return embedder
+    
+    @classmethod
+    def load_or_create(cls, path: Optional[Path], **kwargs) -> 'HashingEmbedder':
+        if path is not None and Path(path).exists():
+            return cls.load(path)
+        return cls(**kwargs)
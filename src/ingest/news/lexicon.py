@@ -0,0 +1,82 @@
+"""weighted financial sentiment lexicon, on vader's -4..4 valence scale"""
+
+from typing import Dict
+
+# word -> valence, with the inflections that show up in headlines listed explicitly
+FINANCIAL_LEXICON: Dict[str, float] = {
+    # earnings and guidance
+    'beat': 1.8, 'beats': 1.8, 'topped': 1.6, 'tops': 1.4, 'exceeded': 1.8, 'exceeds': 1.8,
+    'miss': -1.8, 'misses': -1.8, 'missed': -1.8, 'shortfall': -1.9,
+    'raised': 1.2, 'raises': 1.2, 'upgraded': 2.0, 'upgrade': 1.8, 'upgrades': 1.8,
+    'downgraded': -2.0, 'downgrade': -1.8, 'downgrades': -1.8,
+    'outperform': 1.8, 'outperformed': 1.8, 'outperforms': 1.8, 'overweight': 1.2,
+    'underperform': -1.8, 'underperformed': -1.8, 'underperforms': -1.8, 'underweight': -1.2,
+    'reaffirmed': 0.6, 'reiterated': 0.4,
+    'withdrew': -1.2, 'withdrawn': -1.2, 'suspended': -1.6, 'suspends': -1.6,
+    
+    # price moves
+    'gain': 1.6, 'gains': 1.6, 'gained': 1.6, 'gaining': 1.4,
+    'rise': 1.4, 'rises': 1.4, 'rose': 1.4, 'rising': 1.3, 'risen': 1.4,
+    'jump': 1.8, 'jumps': 1.8, 'jumped': 1.8, 'surge': 2.2, 'surges': 2.2, 'surged': 2.2, 'surging': 2.2,
+    'soar': 2.4, 'soars': 2.4, 'soared': 2.4, 'soaring': 2.4, 'rally': 1.8, 'rallies': 1.8, 'rallied': 1.8,
+    'rebound': 1.4, 'rebounds': 1.4, 'rebounded': 1.4, 'recover': 1.2, 'recovered': 1.2, 'recovery': 1.2,
+    'climb': 1.2, 'climbs': 1.2, 'climbed': 1.2, 'advance': 1.0, 'advanced': 1.0, 'advances': 1.0,
+    'high': 0.6, 'highs': 0.8, 'record': 1.0,
+    'fall': -1.4, 'falls': -1.4, 'fell': -1.4, 'falling': -1.4, 'fallen': -1.4,
+    'drop': -1.4, 'drops': -1.4, 'dropped': -1.4, 'dropping': -1.4,
+    'decline': -1.4, 'declines': -1.4, 'declined': -1.4, 'declining': -1.4,
+    'slide': -1.4, 'slides': -1.4, 'slid': -1.4, 'slump': -2.0, 'slumps': -2.0, 'slumped': -2.0,
+    'plunge': -2.4, 'plunges': -2.4, 'plunged': -2.4, 'plunging': -2.4,
+    'tumble': -2.0, 'tumbles': -2.0, 'tumbled': -2.0, 'sink': -1.6, 'sinks': -1.6, 'sank': -1.6,
+    'crash': -2.8, 'crashed': -2.8, 'crashes': -2.8, 'selloff': -1.8, 'lows': -0.8,
+    'volatile': -0.8, 'volatility': -0.6,
+    
+    # fundamentals
+    'growth': 1.4, 'grow': 1.2, 'grows': 1.2, 'grew': 1.2, 'growing': 1.2,
+    'profit': 1.4, 'profits': 1.4, 'profitable': 1.6, 'profitability': 1.2,
+    'loss': -1.6, 'losses': -1.6, 'unprofitable': -1.6,
+    'strong': 1.6, 'stronger': 1.6, 'strongest': 1.8, 'strength': 1.4, 'robust': 1.6, 'solid': 1.2,
+    'weak': -1.6, 'weaker': -1.6, 'weakest': -1.8, 'weakness': -1.6, 'sluggish': -1.4, 'soft': -0.8,
+    'expansion': 1.0, 'expand': 0.8, 'expands': 0.8, 'expanded': 0.8,
+    'contraction': -1.2, 'shrink': -1.2, 'shrinks': -1.2, 'shrank': -1.2,
+    'dividend': 0.8, 'buyback': 1.2, 'buybacks': 1.2, 'repurchase': 1.0,
+    'momentum': 0.8, 'demand': 0.4, 'boost': 1.4, 'boosts': 1.4, 'boosted': 1.4,
+    'improve': 1.2, 'improved': 1.2, 'improves': 1.2, 'improvement': 1.2,
+    'deteriorate': -1.6, 'deteriorated': -1.6, 'deteriorating': -1.6,
+    'headwinds': -1.2, 'headwind': -1.2, 'tailwinds': 1.2, 'tailwind': 1.2,
+    'slowdown': -1.4, 'slowing': -1.0, 'stagnant': -1.2, 'accelerate': 1.0, 'accelerated': 1.0,
+    
+    # market tone
+    'bull': 1.4, 'bullish': 1.8, 'bear': -1.4, 'bearish': -1.8,
+    'optimism': 1.6, 'optimistic': 1.6, 'confident': 1.4, 'confidence': 1.0,
+    'pessimism': -1.6, 'pessimistic': -1.6, 'uncertainty': -1.2, 'uncertain': -1.0,
+    'fear': -1.6, 'fears': -1.6, 'worried': -1.4, 'worries': -1.4, 'concern': -1.0, 'concerns': -1.0,
+    'risk': -0.6, 'risks': -0.6, 'risky': -1.0,
+    'positive': 1.4, 'negative': -1.4, 'favorable': 1.4, 'unfavorable': -1.4,
+    'upside': 1.2, 'downside': -1.2, 'opportunity': 1.0, 'opportunities': 1.0,
+    'recession': -2.0, 'inflation': -0.6, 'crisis': -2.4, 'turmoil': -2.0, 'panic': -2.4,
+    
+    # corporate events
+    'bankruptcy': -3.0, 'bankrupt': -3.0, 'default': -2.4, 'defaults': -2.4, 'insolvency': -2.8,
+    'lawsuit': -1.6, 'lawsuits': -1.6, 'sued': -1.6, 'probe': -1.4, 'investigation': -1.4,
+    'fraud': -2.8, 'scandal': -2.4, 'fined': -1.8, 'fine': -0.6, 'penalty': -1.6, 'recall': -1.6,
+    'layoffs': -1.6, 'layoff': -1.6, 'cuts': -1.0, 'restructuring': -0.8, 'writedown': -1.6,
+    'breach': -1.8, 'outage': -1.4, 'delay': -1.0, 'delayed': -1.0, 'delays': -1.0,
+    'approval': 1.4, 'approved': 1.4, 'approves': 1.4, 'wins': 1.6, 'won': 1.4, 'award': 1.2,
+    'partnership': 0.8, 'acquisition': 0.4, 'merger': 0.4, 'launch': 0.8, 'launches': 0.8,
+    'breakthrough': 2.0, 'innovative': 1.4, 'innovation': 1.2,
+    'success': 1.8, 'successful': 1.8, 'failure': -2.0, 'failed': -1.8, 'fails': -1.8,
+}
+
+# words flipping the valence of a lexicon word up to three words later
+NEGATIONS = frozenset({
+    'not', 'no', 'never', 'nor', 'none', 'nothing', 'neither', 'without', 'hardly', 'barely',
+    'cannot', "can't", "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "won't",
+    "couldn't", "shouldn't", "wouldn't", "hasn't", "haven't", "hadn't", 'lack', 'lacks', 'lacked',
+})
+
+# words strengthening the lexicon word right after them
+BOOSTERS = frozenset({
+    'very', 'sharply', 'significantly', 'substantially', 'strongly', 'dramatically', 'hugely',
+    'extremely', 'deeply', 'steeply', 'massively', 'highly', 'considerably', 'particularly',
+})
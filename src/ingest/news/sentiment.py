@@ -0,0 +1,184 @@
+"""lexicon sentiment for batches of articles, scored with sparse matrix products"""
+
+import re
+from itertools import chain, repeat
+from operator import methodcaller
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .lexicon import FINANCIAL_LEXICON, NEGATIONS, BOOSTERS
+from .tokenizer import fold_case
+
+MODEL_NAME = 'lexicon-v1'
+OVERALL = 'overall'
+TICKER_SPECIFIC = 'ticker-specific'
+
+# words with an optional contraction, so "don't" stays one token
+SENTIMENT_TOKEN = re.compile(r"\w+(?:'\w+)?")
+APOSTROPHES = str.maketrans({'’': "'", '‘': "'"})
+
+# vader's constants
+NORMALIZATION_ALPHA = 15.0
+NEGATION_SCALAR = -0.74
+BOOSTER_INCREMENT = 0.293
+NEGATION_WINDOW = 3
+
+# each lexicon word has one column per variant, offset by a multiple of the vocabulary size
+NEGATED = 1
+BOOSTED = 2
+VARIANTS = 4
+
+# codes of words that are not lexicon columns
+OTHER_CODE = -1
+NEGATION_CODE = -2
+BOOSTER_CODE = -3
+
+SCORE_COLUMNS = ['positive', 'negative', 'neutral', 'compound']
+
+# characters scored on either side of a ticker mention
+MENTION_WINDOW = 150
+
+def tokenize(text: str) -> List[str]:
+    """lowercased words of a text, keeping contractions whole"""
+    return SENTIMENT_TOKEN.findall(fold_case(text).translate(APOSTROPHES))
+
+def tokenize_with_offsets(text: str) -> Tuple[List[str], np.ndarray]:
+    """lowercased words of a text and the offset each one starts at"""
+    found = list(SENTIMENT_TOKEN.finditer(fold_case(text).translate(APOSTROPHES)))
+    starts = np.fromiter(map(methodcaller('start'), found), dtype=np.int64, count=len(found))
+    return list(map(methodcaller('group'), found)), starts
+
+def merge_windows(spans: Iterable[Tuple[int, int]], window: int) -> List[Tuple[int, int]]:
+    """character ranges of window either side of each span, with overlapping ranges merged"""
+    merged: List[List[int]] = []
+    for start, end in sorted(spans):
+        start, end = max(start - window, 0), end + window
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+class LexiconSentiment:
+    """vader-style positive/negative/neutral/compound scores from a weighted lexicon
+    
+    a batch of documents becomes one sparse document x (word, variant) count matrix
+    and every score is that matrix times a precomputed weight vector, so the only
+    python-level work per document is tokenizing it
+    """
+    
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None,
+                 negations: Iterable[str] = NEGATIONS, boosters: Iterable[str] = BOOSTERS):
+        lexicon = FINANCIAL_LEXICON if lexicon is None else lexicon
+        terms = [term for term, valence in lexicon.items() if valence]
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.negations = frozenset(negations)
+        self.boosters = frozenset(boosters)
+        
+        # one lookup per word gives its column, or marks it as a negation or booster
+        self._codes: Dict[str, int] = dict.fromkeys(self.negations, NEGATION_CODE)
+        self._codes.update(dict.fromkeys(self.boosters, BOOSTER_CODE))
+        self._codes.update(self.vocabulary)
+        
+        # valence of every (word, variant) column: plain, negated, boosted, negated and boosted
+        plain = np.array([lexicon[term] for term in terms], dtype=np.float64)
+        boosted = plain + np.sign(plain) * BOOSTER_INCREMENT
+        self.valence = np.concatenate([plain, plain * NEGATION_SCALAR, boosted, boosted * NEGATION_SCALAR])
+        
+        # vader adds one to the magnitude of every sentiment word before taking proportions
+        self.positive_weights = np.where(self.valence > 0, self.valence + 1, 0.0)
+        self.negative_weights = np.where(self.valence < 0, 1 - self.valence, 0.0)
+    
+    def term_matrix(self, documents: Sequence[Sequence[str]]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """(document x column counts of lexicon words, token count per document) for tokenized documents"""
+        lengths = np.fromiter(map(len, documents), dtype=np.int64, count=len(documents))
+        words = list(chain.from_iterable(documents))
+        doc_of = np.repeat(np.arange(len(documents)), lengths)
+        
+        columns = np.fromiter(map(self._codes.get, words, repeat(OTHER_CODE)), dtype=np.int64, count=len(words))
+        hits = np.flatnonzero(columns >= 0)
+        variant = np.zeros(len(hits), dtype=np.int64)
+        
+        if len(hits):
+            negators = np.flatnonzero(columns == NEGATION_CODE)
+            if len(negators):
+                # nearest negation before each hit, if it is close enough and in the same document
+                before = np.searchsorted(negators, hits) - 1
+                nearest = negators[np.maximum(before, 0)]
+                negated = (before >= 0) & (hits - nearest <= NEGATION_WINDOW) & (doc_of[nearest] == doc_of[hits])
+                variant += negated * NEGATED
+            
+            previous = np.maximum(hits - 1, 0)
+            boosted = (hits > 0) & (columns[previous] == BOOSTER_CODE) & (doc_of[previous] == doc_of[hits])
+            variant += boosted * BOOSTED
+        
+        counts = sparse.csr_matrix(
+            (np.ones(len(hits)), (doc_of[hits], columns[hits] + variant * len(self.vocabulary))),
+            shape=(len(documents), VARIANTS * len(self.vocabulary))
+        )
+        return counts, lengths
+    
+    def score(self, texts: Sequence[str]) -> pd.DataFrame:
+        """positive, negative, neutral and compound scores, one row per text"""
+        return self._scores(*self.term_matrix([tokenize(text or '') for text in texts]))
+    
+    def score_mentions(self, texts: Sequence[str], mentions: Sequence[Dict[Hashable, Sequence[Tuple[int, int]]]],
+                       window: int = MENTION_WINDOW) -> pd.DataFrame:
+        """scores of the text around each key's mentions, one row per (text, key)
+        
+        mentions[i] maps keys, e.g. ticker symbols, to (start, end) spans in texts[i].
+        each text is tokenized once however many keys it has, and a key is scored only
+        over the words within window characters of its spans. rows carry the text's
+        position in 'item' and the key in 'key'
+        """
+        windows: List[List[str]] = []
+        owners: List[int] = []  # row of the (text, key) each window belongs to
+        items, keys = [], []
+        for item, (text, spans_by_key) in enumerate(zip(texts, mentions)):
+            if not spans_by_key:
+                continue
+            words, starts = tokenize_with_offsets(text or '')
+            for key, spans in spans_by_key.items():
+                for start, end in merge_windows(spans, window):
+                    first, last = np.searchsorted(starts, (start, end))
+                    windows.append(words[first:last])
+                    owners.append(len(keys))
+                items.append(item)
+                keys.append(key)
+        
+        # windows are counted as separate documents, so negations don't reach across
+        # them, then summed into their (text, key) row
+        counts, lengths = self.term_matrix(windows)
+        membership = sparse.csr_matrix(
+            (np.ones(len(owners)), (owners, np.arange(len(owners)))), shape=(len(keys), len(owners))
+        )
+        scores = self._scores(membership @ counts, membership @ lengths)
+        scores.insert(0, 'key', keys)
+        scores.insert(0, 'item', items)
+        return scores
+    
+    def _scores(self, counts: sparse.csr_matrix, lengths: np.ndarray) -> pd.DataFrame:
+        """score columns from lexicon counts and token counts"""
+        valence = counts @ self.valence
+        positive = counts @ self.positive_weights
+        negative = counts @ self.negative_weights
+        neutral = lengths - np.asarray(counts.sum(axis=1)).ravel()
+        total = positive + negative + neutral
+        
+        def proportion(part: np.ndarray) -> np.ndarray:
+            return np.divide(part, total, out=np.zeros_like(total, dtype=np.float64), where=total > 0)
+        
+        return pd.DataFrame({
+            'positive': proportion(positive),
+            'negative': proportion(negative),
+            # an empty text is entirely neutral
+            'neutral': np.where(total > 0, proportion(neutral), 1.0),
+            'compound': valence / np.sqrt(valence * valence + NORMALIZATION_ALPHA),
+        })
+    
+    def score_text(self, text: str) -> Dict[str, float]:
+        """scores of a single text"""
+        return self.score([text]).iloc[0].to_dict()
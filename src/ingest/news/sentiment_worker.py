@@ -0,0 +1,116 @@
+"""score news articles with the lexicon sentiment engine and bulk write article_sentiments
+
+run from the repo root:
+    python -m src.ingest.news.sentiment_worker
+    python -m src.ingest.news.sentiment_worker --rescore   # replace existing scores
+"""
+
+import argparse
+import logging
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from ...db import db_manager, create_tables
+from ...db.daily_sentiment import mark_dirty_sql, refresh_daily_ticker_sentiment
+from .sentiment import LexiconSentiment, MODEL_NAME, OVERALL, SCORE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+ARTICLES_SQL = "SELECT id, title, text FROM news_articles"
+
+UNSCORED_ARTICLES_SQL = f"""
+    SELECT n.id, n.title, n.text
+    FROM news_articles n
+    WHERE NOT EXISTS (
+        SELECT 1 FROM article_sentiments s
+        WHERE s.article_id = n.id
+          AND s.ticker_id IS NULL
+          AND s.model_name = '{MODEL_NAME}'
+    )
+"""
+
+def _delete_scores_sql(frame_name: str) -> str:
+    """drop this model's overall scores for the articles in a registered frame"""
+    return f"""
+        DELETE FROM article_sentiments
+        WHERE ticker_id IS NULL
+          AND model_name = '{MODEL_NAME}'
+          AND article_id IN (SELECT article_id FROM {frame_name})
+    """
+
+def _insert_scores_sql(frame_name: str) -> str:
+    """insert overall scores from a registered frame"""
+    return f"""
+        INSERT INTO article_sentiments (
+            article_id, ticker_id, model_name, sentiment_type,
+            positive, negative, neutral, compound, created_at
+        )
+        SELECT article_id, NULL, '{MODEL_NAME}', '{OVERALL}',
+               positive, negative, neutral, compound, CURRENT_TIMESTAMP
+        FROM {frame_name}
+    """
+
+def score_batch(engine: LexiconSentiment, batch: pa.RecordBatch) -> pd.DataFrame:
+    """article_id plus score columns for one batch of (id, title, text) rows"""
+    columns = batch.to_pydict()
+    texts = [
+        f"{title} {text or ''}" if title else (text or '')
+        for title, text in zip(columns['title'], columns['text'])
+    ]
+    scores = engine.score(texts)
+    scores.insert(0, 'article_id', columns['id'])
+    return scores
+
+def persist_scores(scores: pd.DataFrame):
+    """replace the articles' overall scores and queue their daily aggregates in one transaction"""
+    if scores.empty:
+        return
+    db_manager.execute_bulk(
+        [_delete_scores_sql('score_batch'), _insert_scores_sql('score_batch'), mark_dirty_sql('score_batch')],
+        {'score_batch': scores[['article_id'] + SCORE_COLUMNS]}
+    )
+
+def run_scoring(batch_size: int = 20000, rescore: bool = False, limit: Optional[int] = None,
+                engine: Optional[LexiconSentiment] = None) -> Dict[str, float]:
+    """score every article without an overall score from this model, or every article with rescore
+    
+    each batch is committed on its own, so an interrupted run resumes where it stopped
+    """
+    engine = engine or LexiconSentiment()
+    query = ARTICLES_SQL if rescore else UNSCORED_ARTICLES_SQL
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    
+    stats = {'articles': 0, 'seconds': 0.0}
+    started = time.perf_counter()
+    for batch in db_manager.iter_batches(query, batch_size=batch_size):
+        persist_scores(score_batch(engine, batch))
+        stats['articles'] += batch.num_rows
+        logger.info(f"scored {stats['articles']} articles")
+    
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="score news article sentiment into article_sentiments")
+    parser.add_argument('--batch-size', type=int, default=20000, help="articles per scored and written batch")
+    parser.add_argument('--rescore', action='store_true', help="rescore articles that already have scores")
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many articles")
+    parser.add_argument('--refresh-aggregates', action='store_true', help="refresh daily_ticker_sentiment afterwards")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    
+    stats = run_scoring(args.batch_size, args.rescore, args.limit)
+    rate = stats['articles'] / stats['seconds'] if stats['seconds'] else 0.0
+    logger.info(f"done: {stats['articles']} articles, {rate:.0f} articles/sec")
+    
+    if args.refresh_aggregates:
+        refresh_daily_ticker_sentiment()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""tag the backlog of unprocessed news articles in parallel
+
+run from the repo root:
+    python -m src.ingest.news.tagging_worker --workers 8
+"""
+
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from ...db import db_manager, create_tables
+from ...db.daily_sentiment import refresh_daily_ticker_sentiment
+from .ticker_tagger import TickerTagger, TickerMatch
+
+logger = logging.getLogger(__name__)
+
+UNPROCESSED_ARTICLES_SQL = """
+    SELECT id, title, text
+    FROM news_articles
+    WHERE is_processed = false
+"""
+
+# tagger shared with pool workers, inherited on fork or set once by the initializer
+_worker_tagger: Optional[TickerTagger] = None
+
+def _init_worker(tagger: Optional[TickerTagger]):
+    """install the parent's tagger in a worker process"""
+    global _worker_tagger
+    if tagger is not None:
+        _worker_tagger = tagger
+
+def _tag_chunk(articles: List[Dict]) -> Dict[int, List[TickerMatch]]:
+    """tag one chunk of articles inside a worker"""
+    # pick up a dictionary the parent rebuilt since the last chunk
+    _worker_tagger.refresh_from_cache()
+    return _worker_tagger.tag_articles(articles)
+
+def iter_unprocessed_chunks(chunk_size: int, limit: Optional[int] = None) -> Iterator[List[Dict]]:
+    """stream unprocessed articles from duckdb as lists of at most chunk_size dicts"""
+    query = UNPROCESSED_ARTICLES_SQL
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    
+    for batch in db_manager.iter_batches(query, batch_size=chunk_size):
+        yield batch.to_pylist()
+
+def _create_pool(tagger: TickerTagger, workers: int):
+    """process pool whose workers share the tagger built in the parent"""
+    global _worker_tagger
+    
+    if 'fork' in mp.get_all_start_methods():
+        # forked workers inherit the compiled dictionary copy-on-write
+        _worker_tagger = tagger
+        return mp.get_context('fork').Pool(workers, initializer=_init_worker, initargs=(None,))
+    
+    # otherwise each worker unpickles it once at startup
+    return mp.get_context('spawn').Pool(workers, initializer=_init_worker, initargs=(tagger,))
+
+def run_tagging(workers: Optional[int] = None, chunk_size: int = 200, flush_size: int = 5000,
+                limit: Optional[int] = None, tagger: Optional[TickerTagger] = None,
+                reload_interval: Optional[float] = 60.0) -> Dict[str, float]:
+    """tag every unprocessed article, persisting associations and is_processed in bulk
+    
+    progress is committed every flush_size articles, so an interrupted run
+    resumes from the articles that are still unprocessed. symbols added to
+    ticker_symbols during the run are picked up every reload_interval seconds
+    """
+    workers = workers or os.cpu_count() or 1
+    tagger = tagger or TickerTagger()
+    
+    stats = {'articles': 0, 'associations': 0, 'seconds': 0.0}
+    started = time.perf_counter()
+    pending: Dict[int, List[TickerMatch]] = {}
+    
+    def flush():
+        if pending:
+            stats['associations'] += tagger.persist_ticker_associations_batch(pending, mark_processed=True)
+            stats['articles'] += len(pending)
+            pending.clear()
+            logger.info(f"tagged {stats['articles']} articles, {stats['associations']} associations")
+    
+    chunks = iter_unprocessed_chunks(chunk_size, limit)
+    pool = _create_pool(tagger, workers) if workers > 1 else None
+    # started once the workers are forked, so none of them inherits the thread or a lock it holds
+    if reload_interval:
+        tagger.start_auto_reload(reload_interval)
+    
+    try:
+        if pool is None:
+            for chunk in chunks:
+                pending.update(tagger.tag_articles(chunk))
+                if len(pending) >= flush_size:
+                    flush()
+        else:
+            # keep a bounded number of chunks in flight so memory stays flat
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.apply_async(_tag_chunk, (chunk,)))
+                if len(in_flight) >= workers * 2:
+                    pending.update(in_flight.popleft().get())
+                if len(pending) >= flush_size:
+                    flush()
+            while in_flight:
+                pending.update(in_flight.popleft().get())
+        
+        flush()
+    finally:
+        tagger.stop_auto_reload()
+        if pool is not None:
+            pool.terminate()
+    
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="tag unprocessed news articles with ticker symbols")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument('--chunk-size', type=int, default=200, help="articles per worker task")
+    parser.add_argument('--flush-size', type=int, default=5000, help="articles per bulk write")
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many articles")
+    parser.add_argument('--reload-interval', type=float, default=60.0, help="seconds between ticker_symbols checks, 0 disables")
+    parser.add_argument('--refresh-aggregates', action='store_true', help="refresh daily_ticker_sentiment afterwards")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    
+    stats = run_tagging(args.workers, args.chunk_size, args.flush_size, args.limit,
+                        reload_interval=args.reload_interval)
+    rate = stats['articles'] / stats['seconds'] if stats['seconds'] else 0.0
+    logger.info(f"done: {stats['articles']} articles, {stats['associations']} associations, {rate:.0f} articles/sec")
+    
+    if args.refresh_aggregates:
+        refresh_daily_ticker_sentiment()
+
+if __name__ == '__main__':
+    main()
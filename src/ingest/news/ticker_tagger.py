@@ -1,14 +1,22 @@
 """ticker symbol tagging system with comprehensive symbol dictionary"""
 
+import gc
 import re
+import os
 import json
+import pickle
 import logging
-from typing import Dict, List, Set, Tuple, Optional
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple, Optional
 from collections import defaultdict, Counter
-from dataclasses import dataclass
 
 import pandas as pd
-from ...db import db_manager
+from ...db import db_manager, BASE_DIR
+from ...db.daily_sentiment import mark_dirty_sql
+from .tokenizer import PhraseIndex, TokenStream
+from .sentiment import LexiconSentiment, MODEL_NAME, TICKER_SPECIFIC, SCORE_COLUMNS
 # Ticker patterns and blacklist moved inline
 TICKER_PATTERNS = [
     r'\b([A-Z]{1,5})\b',  # Basic ticker pattern
@@ -32,142 +40,482 @@ def extract_tickers_from_text(text: str) -> List[str]:
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# compiled dictionary saved between runs, rebuilt when ticker_symbols changes
+DICTIONARY_CACHE_PATH = BASE_DIR / "data" / "cache" / "ticker_dictionary.pkl"
+DICTIONARY_FORMAT = 1  # bump when the pickled layout changes
+
+# cheap fingerprint of the rows the dictionary is built from
+DICTIONARY_VERSION_SQL = """
+    SELECT COUNT(*) AS symbols,
+           COALESCE(BIT_XOR(HASH(id, symbol, company_name, aliases, sector)), 0) AS checksum
+    FROM ticker_symbols
+    WHERE is_active = true
+"""
+
+# kinds of dictionary terms in the phrase index
+SYMBOL_TERM = 'symbol'
+COMPANY_TERM = 'company'
+
+# words that turn a nearby uppercase run into a contextual ticker mention
+SHARE_KEYWORDS = ('stock', 'shares', 'equity')
+LISTING_KEYWORDS = ('trades', 'trading', 'listed')
+
+CAPITALIZED_WORD = re.compile(r'[A-Z][a-z]+$')
+LEADING_LETTERS = re.compile(r'[A-Za-z]{1,5}')
+
+# confidence scoring vocabularies
+FINANCIAL_INDICATORS = ('stock', 'shares', 'trading', 'market', 'price', 'earnings',
+                        'revenue', 'investor', 'analyst', 'upgrade', 'downgrade')
+FINANCIAL_TERMS = ('stock', 'shares', 'ticker', 'symbol', 'trades', 'listed', 'nasdaq', 'nyse')
+COMMON_WORDS = {'THE', 'AND', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'HAD', 'SAID'}
+
+def _is_letter_word(word: str) -> bool:
+    """1-5 ascii letters"""
+    return len(word) <= 5 and word.isascii() and word.isalpha()
+
+def _skip_space(text: str, pos: int) -> int:
+    """first non-space position at or after pos"""
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+def _skip_space_back(text: str, pos: int) -> int:
+    """last non-space position at or before pos, -1 if none"""
+    while pos >= 0 and text[pos].isspace():
+        pos -= 1
+    return pos
+
+def _drop_overlaps(spans: List[Tuple[str, int, int, str]]) -> List[Tuple[str, int, int, str]]:
+    """keep spans that start after the previous kept one ends, as successive regex matches would"""
+    kept = []
+    last_end = -1
+    for span in spans:
+        if span[1] >= last_end:
+            kept.append(span)
+            last_end = span[2]
+    return kept
+
+# snippets kept per association, and the priority of methods when one symbol is matched several ways
+MAX_CONTEXT_SNIPPETS = 5
+METHOD_PRIORITY = {'known_symbol': 4, 'company_name': 3, 'contextual_match': 2, 'pattern_match': 1}
+
+def extract_context(text: str, start: int, end: int, window: int = 50) -> str:
+    """extract context around a match"""
+    context_start = max(0, start - window)
+    context_end = min(len(text), end + window)
+    
+    context = text[context_start:context_end].strip()
+    
+    # clean up context
+    context = ' '.join(context.split())  # normalize whitespace
+    
+    return context
+
+class RawMatch:
+    """one mention found by one method, before deduplication"""
+    
+    __slots__ = ('symbol', 'company_name', 'start', 'end', 'confidence', 'match_method', 'window')
+    
+    def __init__(self, symbol: str, company_name: str, start: int, end: int,
+                 confidence: float, match_method: str, window: int = 50):
+        self.symbol = symbol
+        self.company_name = company_name
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        self.match_method = match_method
+        self.window = window  # context characters on each side, when a snippet is cut
+
 class TickerMatch:
-    """represents a ticker match in text"""
-    symbol: str
-    company_name: str
-    positions: List[Tuple[int, int]]  # (start, end) positions in text
-    context_snippets: List[str]  # surrounding text context
-    confidence: float  # 0-1 confidence score
-    match_method: str  # how it was matched
+    """represents a ticker match in text
+    
+    context snippets are cut from the article text the first time they are read,
+    so only the matches that get persisted pay for them
+    """
+    
+    __slots__ = ('symbol', 'company_name', 'positions', 'confidence', 'match_method', 'sentiment',
+                 '_context_snippets', '_text', '_windows')
+    
+    def __init__(self, symbol: str, company_name: str, positions: List[Tuple[int, int]],
+                 context_snippets: Optional[List[str]] = None, confidence: float = 0.0,
+                 match_method: str = '', text: Optional[str] = None, windows: Optional[List[int]] = None):
+        self.symbol = symbol
+        self.company_name = company_name
+        self.positions = positions  # (start, end) positions in text
+        self.confidence = confidence  # 0-1 confidence score
+        self.match_method = match_method  # how it was matched
+        self.sentiment: Optional[Dict[str, float]] = None  # scores of the text around the positions
+        self._context_snippets = context_snippets
+        self._text = text
+        self._windows = windows or []  # context window of each of the first positions
+    
+    @property
+    def context_snippets(self) -> List[str]:
+        """surrounding text of the first few positions"""
+        if self._context_snippets is None:
+            text = self._text or ''
+            self._context_snippets = [
+                extract_context(text, start, end, window)
+                for (start, end), window in zip(self.positions, self._windows)
+            ]
+            self._text = None
+        return self._context_snippets
+    
+    @property
+    def context_snippet(self) -> str:
+        """surrounding text of the first position, without cutting the others"""
+        if self._context_snippets is None and self._text is not None and self._windows:
+            (start, end), window = self.positions[0], self._windows[0]
+            return extract_context(self._text, start, end, window)
+        return self.context_snippets[0] if self.context_snippets else ''
+    
+    def __getstate__(self):
+        # cut the snippets before crossing a process boundary instead of shipping the article
+        return (self.symbol, self.company_name, self.positions, self.confidence,
+                self.match_method, self.sentiment, self.context_snippets)
+    
+    def __setstate__(self, state):
+        (self.symbol, self.company_name, self.positions, self.confidence,
+         self.match_method, self.sentiment, self._context_snippets) = state
+        self._text = None
+        self._windows = []
+    
+    def __repr__(self) -> str:
+        return (f"TickerMatch(symbol={self.symbol!r}, company_name={self.company_name!r}, "
+                f"positions={self.positions!r}, confidence={self.confidence!r}, match_method={self.match_method!r})")
 
 class TickerTagger:
     """comprehensive ticker symbol tagger with symbol dictionary"""
     
-    def __init__(self):
+    def __init__(self, ticker_records: Optional[List[Dict]] = None,
+                 cache_path: Optional[Path] = DICTIONARY_CACHE_PATH):
         self.symbol_dict = {}  # symbol -> TickerSymbol object
         self.company_name_dict = {}  # company name -> TickerSymbol object  
         self.alias_dict = {}  # alias -> TickerSymbol object
         
-        # load ticker data from database
-        self._load_ticker_data()
+        # dictionary given directly is never cached or reloaded
+        self.cache_path = Path(cache_path) if cache_path and ticker_records is None else None
+        self.dictionary_version: Optional[str] = None
+        self._cache_mtime: Optional[int] = None
+        self._staged: Optional[Dict[str, Any]] = None  # rebuilt dictionary waiting to be swapped in
+        self._reload_thread: Optional[threading.Thread] = None
+        self._stop_reload: Optional[threading.Event] = None
+        self.sentiment_engine = LexiconSentiment()
+        
+        if ticker_records is None:
+            self._load_dictionary()
+        else:
+            for symbol_obj in ticker_records:
+                self._add_symbol(symbol_obj)
+            # build the dictionary index for efficient matching
+            self._compile_patterns()
+        
+        logger.info(f"initialized ticker tagger with {len(self.symbol_dict)} symbols")
+    
+    def __getstate__(self):
+        # the reload thread stays with the process that started it
+        state = self.__dict__.copy()
+        state['_reload_thread'] = None
+        state['_stop_reload'] = None
+        return state
+    
+    def _load_dictionary(self):
+        """load the compiled dictionary from the cache file, rebuilding it from the database if stale"""
+        version = self._fetch_dictionary_version()
+        
+        cached = self._read_cache(version)
+        if cached is not None:
+            self._apply_dictionary(cached)
+            logger.info(f"loaded ticker dictionary {self.dictionary_version} from {self.cache_path}")
+            return
         
-        # compile regex patterns for efficient matching
+        self._load_ticker_data()
         self._compile_patterns()
+        self.dictionary_version = version
+        self._write_cache()
+    
+    def _fetch_dictionary_version(self) -> Optional[str]:
+        """fingerprint of the active ticker_symbols rows, None if the database can't be read"""
+        try:
+            row = db_manager.execute_query(DICTIONARY_VERSION_SQL, use_cache=False).iloc[0]
+            return f"{DICTIONARY_FORMAT}-{int(row['symbols'])}-{int(row['checksum']):x}"
+        except Exception as e:
+            logger.warning(f"failed to fingerprint ticker_symbols: {e}")
+            return None
+    
+    def _dictionary_state(self) -> Dict[str, Any]:
+        return {
+            'format': DICTIONARY_FORMAT,
+            'version': self.dictionary_version,
+            'symbol_dict': self.symbol_dict,
+            'company_name_dict': self.company_name_dict,
+            'alias_dict': self.alias_dict,
+            'dictionary_index': self.dictionary_index
+        }
+    
+    def _apply_dictionary(self, state: Dict[str, Any]):
+        self.symbol_dict = state['symbol_dict']
+        self.company_name_dict = state['company_name_dict']
+        self.alias_dict = state['alias_dict']
+        self.dictionary_index = state['dictionary_index']
+        self.dictionary_version = state['version']
+    
+    def _read_cache(self, version: Optional[str]) -> Optional[Dict[str, Any]]:
+        """the cached dictionary if it matches version, or any readable one when version is unknown"""
+        if not self.cache_path or not self.cache_path.exists():
+            return None
+        
+        # the cyclic gc would otherwise rescan the growing object graph many times during the load
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            mtime = self.cache_path.stat().st_mtime_ns
+            with open(self.cache_path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"failed to read ticker dictionary cache: {e}")
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
         
-        logger.info(f"initialized ticker tagger with {len(self.symbol_dict)} symbols")
+        if state.get('format') != DICTIONARY_FORMAT or (version is not None and state.get('version') != version):
+            return None
+        
+        self._cache_mtime = mtime
+        return state
+    
+    def _write_cache(self):
+        """save the compiled dictionary, replacing the file atomically for concurrent readers"""
+        if not self.cache_path or self.dictionary_version is None:
+            return
+        
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(self._dictionary_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+            self._cache_mtime = self.cache_path.stat().st_mtime_ns
+        except Exception as e:
+            logger.warning(f"failed to write ticker dictionary cache: {e}")
+    
+    def reload_if_changed(self) -> bool:
+        """rebuild the dictionary if ticker_symbols changed since it was loaded
+        
+        the new dictionary is swapped in before the next article is tagged
+        """
+        version = self._fetch_dictionary_version()
+        staged = self._staged
+        current = staged['version'] if staged else self.dictionary_version
+        if version is None or version == current:
+            return False
+        
+        fresh = TickerTagger(cache_path=self.cache_path)
+        self._cache_mtime = fresh._cache_mtime
+        self._staged = fresh._dictionary_state()
+        logger.info(f"ticker dictionary changed ({self.dictionary_version} -> {fresh.dictionary_version})")
+        return True
+    
+    def refresh_from_cache(self) -> bool:
+        """pick up a dictionary another process saved to the cache file
+        
+        a stat per call, for workers that can't query the database themselves
+        """
+        if not self.cache_path:
+            return False
+        
+        try:
+            mtime = self.cache_path.stat().st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._cache_mtime:
+            return False
+        
+        state = self._read_cache(None)
+        if state is None or state['version'] == self.dictionary_version:
+            return False
+        
+        self._staged = state
+        return True
+    
+    def start_auto_reload(self, interval: float = 60.0):
+        """poll ticker_symbols from a background thread and hot-swap the dictionary when it changes"""
+        if self._reload_thread is not None or not self.cache_path:
+            return
+        
+        self._stop_reload = threading.Event()
+        self._reload_thread = threading.Thread(
+            target=self._reload_loop, args=(interval,), name='ticker-dictionary-reload', daemon=True
+        )
+        self._reload_thread.start()
+    
+    def stop_auto_reload(self):
+        if self._reload_thread is None:
+            return
+        self._stop_reload.set()
+        self._reload_thread.join()
+        self._reload_thread = None
+    
+    def _reload_loop(self, interval: float):
+        while not self._stop_reload.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.warning(f"ticker dictionary reload failed: {e}")
+    
+    def _swap_staged(self):
+        """install a dictionary staged by a reload, between articles so no article sees a mix"""
+        staged = self._staged
+        if staged is not None:
+            self._staged = None
+            self._apply_dictionary(staged)
+            logger.info(f"swapped in ticker dictionary {self.dictionary_version} with {len(self.symbol_dict)} symbols")
     
     def _load_ticker_data(self):
         """load ticker symbols from database"""
         try:
-            symbols_df = db_manager.execute_query(
-                "SELECT * FROM ticker_symbols WHERE is_active = true"
-            )
+            columns = db_manager.execute_arrow(
+                "SELECT id, symbol, company_name, aliases, sector FROM ticker_symbols WHERE is_active = true"
+            ).to_pydict()
             
-            for _, row in symbols_df.iterrows():
-                # create simple symbol object
-                symbol_obj = {
-                    'id': int(row['id']) if 'id' in row else None,
-                    'symbol': row['symbol'], 
-                    'company_name': row.get('company_name'),
-                    'aliases': json.loads(row.get('aliases', '[]')) if pd.notna(row.get('aliases')) and row.get('aliases') else [],
-                    'sector': row.get('sector')
-                }
-                
-                # main symbol
-                self.symbol_dict[symbol_obj['symbol']] = symbol_obj
-                
-                # company name
-                if symbol_obj['company_name']:
-                    self.company_name_dict[symbol_obj['company_name'].lower()] = symbol_obj
-                
-                # company aliases
-                if symbol_obj['aliases']:
-                    for alias in symbol_obj['aliases']:
-                        self.alias_dict[alias.lower()] = symbol_obj
+            rows = zip(columns['id'], columns['symbol'], columns['company_name'], columns['aliases'], columns['sector'])
+            for symbol_id, symbol, company_name, aliases, sector in rows:
+                self._add_symbol({
+                    'id': symbol_id,
+                    'symbol': symbol,
+                    'company_name': company_name,
+                    # most symbols have no aliases, skip parsing those
+                    'aliases': json.loads(aliases) if aliases and aliases != '[]' else [],
+                    'sector': sector
+                })
             
             logger.info(f"loaded {len(self.symbol_dict)} symbols, {len(self.company_name_dict)} company names")
         except Exception as e:
             logger.warning(f"failed to load ticker data: {e}")
             # continue with empty dicts
     
+    def _add_symbol(self, symbol_obj: Dict):
+        """index a symbol object by symbol, company name and aliases"""
+        
+        # main symbol
+        self.symbol_dict[symbol_obj['symbol']] = symbol_obj
+        
+        # company name
+        if symbol_obj.get('company_name'):
+            self.company_name_dict[symbol_obj['company_name'].lower()] = symbol_obj
+        
+        # company aliases
+        for alias in symbol_obj.get('aliases') or []:
+            self.alias_dict[alias.lower()] = symbol_obj
+    
     def _compile_patterns(self):
-        """compile regex patterns for ticker matching"""
-        
-        # create pattern for all known symbols
-        symbols = list(self.symbol_dict.keys())
-        if symbols:
-            # escape special regex characters and sort by length (longest first)
-            escaped_symbols = [re.escape(s) for s in symbols]
-            escaped_symbols.sort(key=len, reverse=True)
-            
-            self.known_symbols_pattern = re.compile(
-                r'\b(' + '|'.join(escaped_symbols) + r')\b',
-                re.IGNORECASE
-            )
-        else:
-            self.known_symbols_pattern = None
-        
-        # pattern for company names (more complex)
-        company_names = list(self.company_name_dict.keys())
-        if company_names:
-            # sort by length, escape, and create pattern
-            escaped_names = [re.escape(name) for name in company_names if len(name) > 3]
-            escaped_names.sort(key=len, reverse=True)
-            
-            self.company_names_pattern = re.compile(
-                r'\b(' + '|'.join(escaped_names) + r')\b',
-                re.IGNORECASE
-            ) if escaped_names else None
-        else:
-            self.company_names_pattern = None
+        """build one token index over symbols, company names and aliases"""
+        
+        self.dictionary_index = PhraseIndex()
+        
+        # symbols match case-insensitively, as the old alternation regex did
+        for symbol in self.symbol_dict:
+            self.dictionary_index.add(symbol, (SYMBOL_TERM, symbol))
+        
+        # very short names are too ambiguous to match on their own
+        for name in list(self.company_name_dict) + list(self.alias_dict):
+            if len(name) > 3:
+                self.dictionary_index.add(name, (COMPANY_TERM, name))
+    
+    def _scan_dictionary(self, tokens: TokenStream) -> Tuple[List[Tuple[int, int, str]], List[Tuple[int, int, str]]]:
+        """one pass over the tokens returning (start, end, key) hits for symbols and for company names"""
+        symbol_hits = []
+        company_hits = []
+        
+        # symbols and names are resolved separately, so "Meta Platforms" can yield both
+        for start, end, (kind, key) in self.dictionary_index.find_all(tokens, group=lambda value: value[0]):
+            if kind == SYMBOL_TERM:
+                symbol_hits.append((start, end, key))
+            else:
+                company_hits.append((start, end, key))
+        
+        return symbol_hits, company_hits
     
     def tag_article_text(self, title: str, text: str, article_id: Optional[int] = None) -> List[TickerMatch]:
         """tag ticker symbols in article title and text"""
         
+        self._swap_staged()
+        
         full_text = f"{title} {text}" if title else text
         if not full_text.strip():
             return []
         
+        matches = self._collect_matches(full_text)
+        
+        # deduplicate and score matches
+        final_matches = self._deduplicate_and_score(matches, full_text)
+        
+        logger.debug(f"found {len(final_matches)} ticker matches in article")
+        
+        return final_matches
+    
+    def _collect_matches(self, full_text: str) -> List[RawMatch]:
+        """raw matches from every method, before deduplication"""
+        
+        # tokenize once, every method below works from the same token stream
+        tokens = TokenStream(full_text)
+        
         matches = []
+        symbol_hits, company_hits = self._scan_dictionary(tokens)
         
         # method 1: match known symbols from database
-        known_matches = self._match_known_symbols(full_text)
+        known_matches = self._match_known_symbols(symbol_hits)
         matches.extend(known_matches)
         
-        # method 2: match company names
-        company_matches = self._match_company_names(full_text)
+        # method 2: match company names and aliases
+        company_matches = self._match_company_names(company_hits)
         matches.extend(company_matches)
         
         # method 3: pattern-based matching for unknown symbols
-        pattern_matches = self._match_ticker_patterns(full_text)
+        pattern_matches = self._match_ticker_patterns(tokens)
         matches.extend(pattern_matches)
         
         # method 4: contextual matching (ticker mentioned near company name)
-        contextual_matches = self._match_contextual_tickers(full_text)
+        contextual_matches = self._match_contextual_tickers(tokens)
         matches.extend(contextual_matches)
         
-        # deduplicate and score matches
-        final_matches = self._deduplicate_and_score(matches, full_text)
-        
-        logger.debug(f"found {len(final_matches)} ticker matches in article")
+        return matches
+    
+    def tag_articles(self, articles: Iterable[Dict], score_sentiment: bool = True) -> Dict[int, List[TickerMatch]]:
+        """tag a batch of articles given as dicts with id, title and text
+        
+        with score_sentiment, each match also gets the sentiment of the text around its positions
+        """
+        results = {}
+        full_texts = []
+        for article in articles:
+            title, text = article.get('title') or '', article.get('text') or ''
+            results[article['id']] = self.tag_article_text(title, text, article['id'])
+            full_texts.append(f"{title} {text}" if title else text)
+        
+        if score_sentiment:
+            self._score_mention_sentiment(full_texts, list(results.values()))
+        return results
+    
+    def _score_mention_sentiment(self, full_texts: List[str], article_matches: List[List[TickerMatch]]):
+        """set each match's sentiment from the windows around its positions, one engine call per batch"""
+        mentions = [{match.symbol: match.positions for match in matches} for matches in article_matches]
+        if not any(mentions):
+            return
         
-        return final_matches
+        scores = self.sentiment_engine.score_mentions(full_texts, mentions)
+        by_key = {(i, match.symbol): match for i, matches in enumerate(article_matches) for match in matches}
+        for item, symbol, *values in scores.itertuples(index=False):
+            by_key[(item, symbol)].sentiment = dict(zip(SCORE_COLUMNS, values))
     
-    def _match_known_symbols(self, text: str) -> List[TickerMatch]:
+    def _match_known_symbols(self, symbol_hits: List[Tuple[int, int, str]]) -> List[RawMatch]:
         """match against known symbols from database"""
         matches = []
         
-        if not self.known_symbols_pattern:
-            return matches
-        
-        for match in self.known_symbols_pattern.finditer(text):
-            symbol = match.group(1).upper()
-            start, end = match.span()
-            
+        for start, end, symbol in symbol_hits:
             # skip if in blacklist
-            if symbol in TICKER_BLACKLIST:
+            if symbol.upper() in TICKER_BLACKLIST:
                 continue
             
             # get ticker object
@@ -175,31 +523,22 @@ class TickerTagger:
             if not ticker_obj:
                 continue
             
-            # extract context
-            context = self._extract_context(text, start, end)
-            
-            matches.append(TickerMatch(
+            matches.append(RawMatch(
                 symbol=symbol,
                 company_name=ticker_obj.get('company_name', '') or "",
-                positions=[(start, end)],
-                context_snippets=[context],
+                start=start,
+                end=end,
                 confidence=0.9,  # high confidence for known symbols
                 match_method="known_symbol"
             ))
         
         return matches
     
-    def _match_company_names(self, text: str) -> List[TickerMatch]:
-        """match company names and map to symbols"""
+    def _match_company_names(self, company_hits: List[Tuple[int, int, str]]) -> List[RawMatch]:
+        """match company names and aliases and map to symbols"""
         matches = []
         
-        if not self.company_names_pattern:
-            return matches
-        
-        for match in self.company_names_pattern.finditer(text):
-            company_name = match.group(1).lower()
-            start, end = match.span()
-            
+        for start, end, company_name in company_hits:
             ticker_obj = self.company_name_dict.get(company_name)
             if not ticker_obj:
                 # try aliases
@@ -208,133 +547,217 @@ class TickerTagger:
             if not ticker_obj:
                 continue
             
-            context = self._extract_context(text, start, end)
-            
-            matches.append(TickerMatch(
+            matches.append(RawMatch(
                 symbol=ticker_obj['symbol'],
                 company_name=ticker_obj.get('company_name', '') or "",
-                positions=[(start, end)],
-                context_snippets=[context],
+                start=start,
+                end=end,
                 confidence=0.8,  # slightly lower confidence for company names
                 match_method="company_name"
             ))
         
         return matches
     
-    def _match_ticker_patterns(self, text: str) -> List[TickerMatch]:
-        """match ticker-like patterns not in our database"""
-        matches = []
-        
-        # use patterns from sources.py
-        potential_tickers = extract_tickers_from_text(text, use_whitelist=False)
-        
-        for ticker in potential_tickers:
-            # skip if we already know this symbol
-            if ticker in self.symbol_dict:
+    def _match_ticker_patterns(self, tokens: TokenStream) -> List[RawMatch]:
+        """match ticker-like uppercase runs not in our database"""
+        text = tokens.text
+        
+        # occurrences of each candidate, and which ones also appear as $TICKER
+        occurrences = defaultdict(list)
+        cashtags = set()
+        for i in tokens.upper_runs:
+            ticker = tokens.token(i)
+            if ticker in TICKER_BLACKLIST or ticker in self.symbol_dict:
                 continue
-            
-            # find all occurrences in text
-            pattern = re.compile(r'\b' + re.escape(ticker) + r'\b')
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                context = self._extract_context(text, start, end)
+            start, end = tokens.starts[i], tokens.ends[i]
+            occurrences[ticker].append((start, end))
+            if start and text[start - 1] == '$':
+                cashtags.add(ticker)
+        
+        # scoring only looks for words in the surrounding text, so the raw lowercased window will do
+        folded = tokens.folded
+        matches = []
+        for ticker, positions in occurrences.items():
+            for start, end in positions:
+                context = folded[max(0, start - 50):end + 50]
                 
                 # calculate confidence based on context
-                confidence = self._calculate_pattern_confidence(ticker, context, text)
+                confidence = self._calculate_pattern_confidence(ticker, context, len(positions), ticker in cashtags)
                 
                 if confidence > 0.3:  # minimum threshold
-                    matches.append(TickerMatch(
+                    matches.append(RawMatch(
                         symbol=ticker,
                         company_name="",  # unknown
-                        positions=[(start, end)],
-                        context_snippets=[context],
+                        start=start,
+                        end=end,
                         confidence=confidence,
                         match_method="pattern_match"
                     ))
         
         return matches
     
-    def _match_contextual_tickers(self, text: str) -> List[TickerMatch]:
-        """match tickers mentioned near company names or financial context"""
+    def _match_contextual_tickers(self, tokens: TokenStream) -> List[RawMatch]:
+        """match tickers mentioned near company names or financial context
+        
+        looks for "Apple (AAPL)", "AAPL shares", "trades as MSFT", "ticker symbol MSFT"
+        and "$MSFT", in that order, each found from the token stream
+        """
+        spans = (
+            self._find_parenthetical(tokens)
+            + self._find_share_mentions(tokens)
+            + self._find_listing_mentions(tokens)
+            + self._find_ticker_labels(tokens)
+            + self._find_cashtags(tokens)
+        )
+        
+        text = tokens.text
         matches = []
+        for ticker, start, end, company_name in spans:
+            # skip blacklisted terms
+            if ticker in TICKER_BLACKLIST:
+                continue
+            
+            confidence = self._calculate_contextual_confidence(ticker, text[start:end])
+            
+            if confidence > 0.5:
+                matches.append(RawMatch(
+                    symbol=ticker,
+                    company_name=company_name,
+                    start=start,
+                    end=end,
+                    confidence=confidence,
+                    match_method="contextual_match",
+                    window=100
+                ))
         
-        # look for patterns like "Apple (AAPL)" or "AAPL shares" or "trades as MSFT"
-        contextual_patterns = [
-            re.compile(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*\(\s*([A-Z]{1,5})\s*\)'),  # Company (TICKER)
-            re.compile(r'\b([A-Z]{1,5})\s+(?:stock|shares|equity)', re.IGNORECASE),  # TICKER stock
-            re.compile(r'(?:trades|trading|listed)\s+as\s+([A-Z]{1,5})', re.IGNORECASE),  # trades as TICKER
-            re.compile(r'ticker\s+(?:symbol\s+)?([A-Z]{1,5})', re.IGNORECASE),  # ticker TICKER
-            re.compile(r'\$([A-Z]{1,5})\b'),  # $TICKER
-        ]
+        return matches
+    
+    def _find_parenthetical(self, tokens: TokenStream) -> List[Tuple[str, int, int, str]]:
+        """(ticker, start, end, company) for "Company Name (TICKER)" """
+        text, starts, ends = tokens.text, tokens.starts, tokens.ends
+        spans = []
         
-        for pattern in contextual_patterns:
-            for match in pattern.finditer(text):
-                groups = match.groups()
-                ticker = groups[-1].upper()  # last group is usually the ticker
-                start, end = match.span()
-                
-                # skip blacklisted terms
-                if ticker in TICKER_BLACKLIST:
-                    continue
-                
-                context = self._extract_context(text, start, end, window=100)
-                confidence = self._calculate_contextual_confidence(ticker, context, match.group(0))
-                
-                company_name = groups[0] if len(groups) > 1 and groups[0] else ""
-                
-                if confidence > 0.5:
-                    matches.append(TickerMatch(
-                        symbol=ticker,
-                        company_name=company_name,
-                        positions=[(start, end)],
-                        context_snippets=[context],
-                        confidence=confidence,
-                        match_method="contextual_match"
-                    ))
+        for i in tokens.upper_runs:
+            if i == 0:
+                continue
+            
+            # the ticker must sit alone inside parentheses
+            open_paren = _skip_space_back(text, starts[i] - 1)
+            close_paren = _skip_space(text, ends[i])
+            if open_paren < 0 or text[open_paren] != '(' or close_paren >= len(text) or text[close_paren] != ')':
+                continue
+            
+            # the company is a run of capitalized words right before the parenthesis
+            gap = text[ends[i - 1]:open_paren]
+            if gap and not gap.isspace():
+                continue
+            
+            company_start = None
+            k = i - 1
+            while k >= 0:
+                word = CAPITALIZED_WORD.search(text, starts[k], ends[k])
+                if word is None:
+                    break
+                company_start = word.start()
+                if company_start != starts[k] or k == 0 or not tokens.gap(k).isspace():
+                    break
+                k -= 1
+            
+            if company_start is not None:
+                spans.append((tokens.token(i), company_start, close_paren + 1, text[company_start:ends[i - 1]]))
         
-        return matches
+        return spans
     
-    def _extract_context(self, text: str, start: int, end: int, window: int = 50) -> str:
-        """extract context around a match"""
-        context_start = max(0, start - window)
-        context_end = min(len(text), end + window)
+    def _find_share_mentions(self, tokens: TokenStream) -> List[Tuple[str, int, int, str]]:
+        """(ticker, start, end, company) for "AAPL stock", "AAPL shares" or "AAPL equity" in any case"""
+        words, starts = tokens.words, tokens.starts
+        spans = []
+        
+        for i in tokens.starting_with(SHARE_KEYWORDS):
+            if i == 0 or not tokens.gap(i).isspace() or not _is_letter_word(words[i - 1]):
+                continue
+            keyword = next(k for k in SHARE_KEYWORDS if words[i].startswith(k))
+            spans.append((words[i - 1].upper(), starts[i - 1], starts[i] + len(keyword), ""))
+        
+        return _drop_overlaps(spans)
+    
+    def _find_listing_mentions(self, tokens: TokenStream) -> List[Tuple[str, int, int, str]]:
+        """(ticker, start, end, company) for "trades as AAPL", "trading as AAPL" or "listed as AAPL" """
+        text, words, starts, ends = tokens.text, tokens.words, tokens.starts, tokens.ends
+        spans = []
+        
+        for i in tokens.ending_with(LISTING_KEYWORDS):
+            if i + 2 >= len(words) or words[i + 1] != 'as':
+                continue
+            if not tokens.gap(i + 1).isspace() or not tokens.gap(i + 2).isspace():
+                continue
+            letters = LEADING_LETTERS.match(text, starts[i + 2])
+            if letters:
+                keyword = next(k for k in LISTING_KEYWORDS if words[i].endswith(k))
+                spans.append((letters.group().upper(), ends[i] - len(keyword), letters.end(), ""))
         
-        context = text[context_start:context_end].strip()
+        return _drop_overlaps(spans)
+    
+    def _find_ticker_labels(self, tokens: TokenStream) -> List[Tuple[str, int, int, str]]:
+        """(ticker, start, end, company) for "ticker AAPL" or "ticker symbol AAPL" """
+        text, words, starts, ends = tokens.text, tokens.words, tokens.starts, tokens.ends
+        spans = []
         
-        # clean up context
-        context = ' '.join(context.split())  # normalize whitespace
+        for i in tokens.ending_with(('ticker',)):
+            if i + 1 == len(words) or not tokens.gap(i + 1).isspace():
+                continue
+            
+            # "symbol" is skipped only when a ticker follows it, otherwise it is read as the ticker
+            j = i + 1
+            if words[j] == 'symbol' and j + 1 < len(words) and tokens.gap(j + 1).isspace() \
+                    and LEADING_LETTERS.match(text, starts[j + 1]):
+                j += 1
+            
+            letters = LEADING_LETTERS.match(text, starts[j])
+            if letters:
+                spans.append((letters.group().upper(), ends[i] - len('ticker'), letters.end(), ""))
         
-        return context
+        return _drop_overlaps(spans)
+    
+    def _find_cashtags(self, tokens: TokenStream) -> List[Tuple[str, int, int, str]]:
+        """(ticker, start, end, company) for "$AAPL" """
+        text = tokens.text
+        spans = []
+        for i in tokens.upper_runs:
+            start = tokens.starts[i]
+            if start and text[start - 1] == '$':
+                spans.append((tokens.token(i), start - 1, tokens.ends[i], ""))
+        return spans
+    
+    def _extract_context(self, text: str, start: int, end: int, window: int = 50) -> str:
+        """extract context around a match"""
+        return extract_context(text, start, end, window)
     
-    def _calculate_pattern_confidence(self, ticker: str, context: str, full_text: str) -> float:
+    def _calculate_pattern_confidence(self, ticker: str, context: str, mention_count: int, has_cashtag: bool) -> float:
         """calculate confidence for pattern-matched tickers"""
         confidence = 0.5  # base confidence
         
         context_lower = context.lower()
         
         # positive indicators
-        financial_indicators = ['stock', 'shares', 'trading', 'market', 'price', 'earnings', 
-                               'revenue', 'investor', 'analyst', 'upgrade', 'downgrade']
-        
-        for indicator in financial_indicators:
+        for indicator in FINANCIAL_INDICATORS:
             if indicator in context_lower:
                 confidence += 0.1
         
         # bonus for dollar sign prefix
-        if f'${ticker}' in full_text:
+        if has_cashtag:
             confidence += 0.2
         
         # bonus for multiple mentions
-        mention_count = full_text.count(ticker)
         confidence += min(mention_count * 0.05, 0.2)
         
         # penalty for very common letter combinations
-        if ticker in ['THE', 'AND', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'HAD', 'BUT', 'SAID']:
+        if ticker in COMMON_WORDS:
             confidence *= 0.1
         
         return min(confidence, 1.0)
     
-    def _calculate_contextual_confidence(self, ticker: str, context: str, matched_text: str) -> float:
+    def _calculate_contextual_confidence(self, ticker: str, matched_text: str) -> float:
         """calculate confidence for contextually matched tickers"""
         confidence = 0.7  # higher base for contextual matches
         
@@ -343,14 +766,14 @@ class TickerTagger:
             confidence += 0.2
         
         # bonus for explicit financial language
-        financial_terms = ['stock', 'shares', 'ticker', 'symbol', 'trades', 'listed', 'nasdaq', 'nyse']
-        for term in financial_terms:
-            if term in matched_text.lower():
+        matched_lower = matched_text.lower()
+        for term in FINANCIAL_TERMS:
+            if term in matched_lower:
                 confidence += 0.1
         
         return min(confidence, 1.0)
     
-    def _deduplicate_and_score(self, matches: List[TickerMatch], text: str) -> List[TickerMatch]:
+    def _deduplicate_and_score(self, matches: List[RawMatch], text: str) -> List[TickerMatch]:
         """deduplicate matches and calculate final scores"""
         
         # group matches by symbol
@@ -361,20 +784,7 @@ class TickerTagger:
         final_matches = []
         
         for symbol, match_list in symbol_matches.items():
-            if not match_list:
-                continue
-            
-            # merge matches for the same symbol
-            all_positions = []
-            all_contexts = []
-            confidences = []
-            methods = []
-            
-            for match in match_list:
-                all_positions.extend(match.positions)
-                all_contexts.extend(match.context_snippets)
-                confidences.append(match.confidence)
-                methods.append(match.match_method)
+            confidences = [m.confidence for m in match_list]
             
             # calculate final confidence (weighted average, favoring higher confidences)
             final_confidence = max(confidences) * 0.7 + (sum(confidences) / len(confidences)) * 0.3
@@ -384,7 +794,7 @@ class TickerTagger:
             best_company_name = max(company_names, key=len) if company_names else ""
             
             # count mentions
-            mention_count = len(all_positions)
+            mention_count = len(match_list)
             
             # boost confidence for multiple mentions
             if mention_count > 1:
@@ -393,10 +803,12 @@ class TickerTagger:
             final_matches.append(TickerMatch(
                 symbol=symbol,
                 company_name=best_company_name,
-                positions=all_positions,
-                context_snippets=all_contexts[:5],  # keep top 5 contexts
+                positions=[(m.start, m.end) for m in match_list],
                 confidence=final_confidence,
-                match_method=max(methods, key=lambda m: {'known_symbol': 4, 'company_name': 3, 'contextual_match': 2, 'pattern_match': 1}.get(m, 0))
+                match_method=max((m.match_method for m in match_list), key=lambda m: METHOD_PRIORITY.get(m, 0)),
+                # snippets for the first few mentions are cut on demand
+                text=text,
+                windows=[m.window for m in match_list[:MAX_CONTEXT_SNIPPETS]]
             ))
         
         # sort by confidence
@@ -406,95 +818,176 @@ class TickerTagger:
     
     def persist_ticker_associations(self, article_id: int, ticker_matches: List[TickerMatch]):
         """save ticker associations to database"""
-        
-        if not ticker_matches:
-            return
-        
-        associations_data = []
-        
-        for match in ticker_matches:
-            # get or create ticker symbol
-            existing_ticker = db_manager.execute_query(
-                "SELECT id FROM ticker_symbols WHERE symbol = ?",
-                [match.symbol]
-            )
-            
-            if existing_ticker.empty:
-                # create new ticker
-                next_id = db_manager.execute_query("SELECT COALESCE(MAX(id), 0) + 1 as next_id FROM ticker_symbols").iloc[0]['next_id']
-                ticker_data = pd.DataFrame([{
-                    'id': int(next_id),
+        self.persist_ticker_associations_batch({article_id: ticker_matches})
+    
+    def persist_ticker_associations_batch(self, article_matches: Dict[int, List[TickerMatch]],
+                                          mark_processed: bool = False) -> int:
+        """save ticker associations for many articles in one bulk write
+        
+        with mark_processed, every article in article_matches (including those
+        without matches) is flagged is_processed in the same transaction.
+        returns the number of associations actually inserted
+        """
+        
+        rows = []
+        for article_id, ticker_matches in article_matches.items():
+            for match in ticker_matches:
+                rows.append({
+                    'article_id': int(article_id),
                     'symbol': match.symbol,
-                    'company_name': match.company_name if match.company_name else None,
-                    'aliases': '[]',
+                    'company_name': match.company_name or None,
                     'sector': None,
                     'market_cap': None,
-                    'is_active': True,
-                    'created_at': pd.Timestamp.now()
-                }])
-                
-                db_manager.insert_dataframe(ticker_data, 'ticker_symbols', mode='append')
-                
-                # get the new ID
-                ticker_result = db_manager.execute_query(
-                    "SELECT id FROM ticker_symbols WHERE symbol = ?",
-                    [match.symbol]
-                )
-                ticker_id = ticker_result.iloc[0]['id']
-            else:
-                ticker_id = existing_ticker.iloc[0]['id']
+                    'confidence': float(match.confidence),
+                    'match_method': match.match_method,
+                    'context_snippet': match.context_snippet,
+                    'mention_count': len(match.positions) or 1
+                })
+        
+        sentiment_rows = [
+            {'article_id': int(article_id), 'symbol': match.symbol, **match.sentiment}
+            for article_id, ticker_matches in article_matches.items()
+            for match in ticker_matches
+            if match.sentiment
+        ]
+        
+        statements = []
+        frames = {}
+        inserted = 0
+        
+        if rows:
+            for table_name in ('ticker_symbols', 'article_ticker_associations'):
+                db_manager.ensure_sequence(table_name)
             
-            # create association data
-            associations_data.append({
-                'id': len(associations_data) + 1,  # manual ID
-                'article_id': article_id,
-                'ticker_id': ticker_id,
-                'confidence': match.confidence,
-                'match_method': match.match_method,
-                'context_snippet': match.context_snippets[0] if match.context_snippets else '',
-                'created_at': pd.Timestamp.now()
-            })
-        
-        if associations_data:
-            associations_df = pd.DataFrame(associations_data)
-            db_manager.insert_dataframe(associations_df, 'article_ticker_associations', mode='append')
-            logger.debug(f"saved {len(ticker_matches)} ticker associations for article {article_id}")
+            frames['match_batch'] = pd.DataFrame(rows)
+            statements += [
+                _upsert_symbols_sql('match_batch'),
+                _insert_associations_sql('match_batch'),
+                mark_dirty_sql('match_batch')
+            ]
+        
+        if sentiment_rows:
+            frames['sentiment_batch'] = pd.DataFrame(sentiment_rows, columns=['article_id', 'symbol'] + SCORE_COLUMNS)
+            statements += [
+                _delete_ticker_sentiments_sql('sentiment_batch'),
+                _insert_ticker_sentiments_sql('sentiment_batch')
+            ]
+        
+        if mark_processed and article_matches:
+            frames['processed_batch'] = pd.DataFrame({'article_id': [int(i) for i in article_matches]})
+            statements.append(_mark_processed_sql('processed_batch'))
+        
+        if statements:
+            counts = db_manager.execute_bulk(statements, frames)
+            if rows:
+                # existing (article, ticker) pairs and duplicates within the batch are skipped
+                inserted = counts[1] or 0
+        
+        logger.debug(f"saved {inserted} new ticker associations for {len(article_matches)} articles")
+        return inserted
+
+def _mark_processed_sql(frame_name: str) -> str:
+    """flag the articles in a registered frame as tagged"""
+    return f"""
+        UPDATE news_articles
+        SET is_processed = TRUE, ts_processed = CURRENT_TIMESTAMP
+        WHERE id IN (SELECT article_id FROM {frame_name})
+    """
+
+def _upsert_symbols_sql(frame_name: str) -> str:
+    """insert symbols from a registered frame that are not in ticker_symbols yet"""
+    return f"""
+        INSERT INTO ticker_symbols (id, symbol, company_name, aliases, sector, market_cap, is_active, created_at)
+        SELECT nextval('ticker_symbols_id_seq'), s.symbol, s.company_name, '[]',
+               s.sector, s.market_cap, TRUE, CURRENT_TIMESTAMP
+        FROM (
+            SELECT symbol,
+                   MAX(company_name) AS company_name,
+                   MAX(sector) AS sector,
+                   MAX(market_cap) AS market_cap
+            FROM {frame_name}
+            GROUP BY symbol
+        ) s
+        WHERE NOT EXISTS (SELECT 1 FROM ticker_symbols t WHERE t.symbol = s.symbol)
+    """
+
+def _insert_associations_sql(frame_name: str) -> str:
+    """insert one association per (article, ticker) from a registered frame"""
+    return f"""
+        INSERT INTO article_ticker_associations
+            (id, article_id, ticker_id, confidence, match_method, context_snippet, mention_count, created_at)
+        SELECT nextval('article_ticker_associations_id_seq'), m.article_id, t.id, m.confidence,
+               m.match_method, m.context_snippet, m.mention_count, CURRENT_TIMESTAMP
+        FROM {frame_name} m
+        JOIN ticker_symbols t ON t.symbol = m.symbol
+        WHERE NOT EXISTS (
+            SELECT 1 FROM article_ticker_associations a
+            WHERE a.article_id = m.article_id AND a.ticker_id = t.id
+        )
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY m.article_id, t.id ORDER BY m.confidence DESC) = 1
+    """
+
+def _delete_ticker_sentiments_sql(frame_name: str) -> str:
+    """drop this model's earlier ticker-scoped scores for the (article, symbol) pairs in a registered frame"""
+    return f"""
+        DELETE FROM article_sentiments s
+        WHERE s.model_name = '{MODEL_NAME}'
+          AND s.ticker_id IS NOT NULL
+          AND EXISTS (
+              SELECT 1
+              FROM {frame_name} m
+              JOIN ticker_symbols t ON t.symbol = m.symbol
+              WHERE m.article_id = s.article_id AND t.id = s.ticker_id
+          )
+    """
+
+def _insert_ticker_sentiments_sql(frame_name: str) -> str:
+    """insert one ticker-scoped score per (article, ticker) from a registered frame"""
+    return f"""
+        INSERT INTO article_sentiments (
+            article_id, ticker_id, model_name, sentiment_type,
+            positive, negative, neutral, compound, created_at
+        )
+        SELECT m.article_id, t.id, '{MODEL_NAME}', '{TICKER_SPECIFIC}',
+               m.positive, m.negative, m.neutral, m.compound, CURRENT_TIMESTAMP
+        FROM {frame_name} m
+        JOIN ticker_symbols t ON t.symbol = m.symbol
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY m.article_id, t.id) = 1
+    """
 
 # utility functions for populating ticker database
+def _upsert_ticker_rows(ticker_rows: List[Dict]) -> int:
+    """insert symbol rows that don't exist yet, assigning ids from the sequence; returns the number inserted"""
+    if not ticker_rows:
+        return 0
+    
+    db_manager.ensure_sequence('ticker_symbols')
+    symbols_df = pd.DataFrame(ticker_rows, columns=['symbol', 'company_name', 'sector', 'market_cap'])
+    counts = db_manager.execute_bulk([_upsert_symbols_sql('symbol_batch')], {'symbol_batch': symbols_df})
+    return counts[0] or 0
+
 def populate_ticker_database_from_csv(csv_path: str):
     """populate ticker database from csv file with symbol,company_name,sector columns"""
-    import pandas as pd
     
     df = pd.read_csv(csv_path)
     
     # prepare data
     ticker_data = []
-    for _, row in df.iterrows():
-        symbol = row['symbol'].strip().upper()
-        company_name = row.get('company_name', '').strip()
-        sector = row.get('sector', '').strip()
-        
-        # check if already exists
-        existing = db_manager.execute_query(
-            "SELECT id FROM ticker_symbols WHERE symbol = ?",
-            [symbol]
-        )
-        if not existing.empty:
-            continue
+    for row in df.to_dict('records'):
+        symbol = str(row['symbol']).strip().upper()
+        company_name = str(row.get('company_name') or '').strip()
+        sector = str(row.get('sector') or '').strip()
         
         ticker_data.append({
             'symbol': symbol,
             'company_name': company_name if company_name else None,
             'sector': sector if sector else None,
-            'aliases': '[]',
-            'is_active': True,
-            'created_at': pd.Timestamp.now()
+            'market_cap': None
         })
     
     if ticker_data:
-        ticker_df = pd.DataFrame(ticker_data)
-        db_manager.insert_dataframe(ticker_df, 'ticker_symbols', mode='append')
-        logger.info(f"populated ticker database with {len(ticker_data)} symbols")
+        inserted = _upsert_ticker_rows(ticker_data)
+        logger.info(f"populated ticker database with {inserted} new symbols from {len(ticker_data)} csv rows")
 
 def populate_sp500_tickers():
     """populate database with S&P 500 tickers (example)"""
@@ -514,28 +1007,10 @@ def populate_sp500_tickers():
         # add more as needed...
     ]
     
-    ticker_data = []
-    for symbol, name, sector in sp500_tickers:
-        # check if already exists
-        existing = db_manager.execute_query(
-            "SELECT id FROM ticker_symbols WHERE symbol = ?",
-            [symbol]
-        )
-        if not existing.empty:
-            continue
-        
-        ticker_data.append({
-            'id': len(ticker_data) + 1,  # manual ID
-            'symbol': symbol,
-            'company_name': name,
-            'sector': sector,
-            'market_cap': 'large',
-            'aliases': '[]',
-            'is_active': True,
-            'created_at': pd.Timestamp.now()
-        })
+    ticker_data = [
+        {'symbol': symbol, 'company_name': name, 'sector': sector, 'market_cap': 'large'}
+        for symbol, name, sector in sp500_tickers
+    ]
     
-    if ticker_data:
-        ticker_df = pd.DataFrame(ticker_data)
-        db_manager.insert_dataframe(ticker_df, 'ticker_symbols', mode='append')
-        logger.info(f"populated database with {len(ticker_data)} S&P 500 tickers")
\ No newline at end of file
+    inserted = _upsert_ticker_rows(ticker_data)
+    logger.info(f"populated database with {inserted} new S&P 500 tickers of {len(ticker_data)}")
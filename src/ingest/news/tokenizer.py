@@ -0,0 +1,144 @@
+"""single-pass tokenization of article text, shared by every ticker match strategy"""
+
+import re
+from itertools import accumulate, compress
+from operator import methodcaller
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r'\w+')
+SEPARATOR_PATTERN = re.compile(r'(\W+)')
+
+def fold_case(text: str) -> str:
+    """lowercase text without changing its length, so offsets map back to the original"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # a few characters expand when lowercased, keep those as they are
+    return ''.join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+class TokenStream:
+    """word tokens of a text with their offsets, built in one pass"""
+    
+    __slots__ = ('text', 'folded', 'starts', 'ends', 'tokens', 'words', 'upper_runs')
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.folded = fold_case(text)
+        
+        # splitting on separators alternates word, separator, word, ... and the
+        # running length of the pieces gives every offset without a python loop
+        pieces = SEPARATOR_PATTERN.split(text)
+        offsets = list(accumulate(map(len, pieces), initial=0))
+        tokens = pieces[0::2]
+        starts = offsets[0::2]
+        ends = offsets[1::2]
+        
+        # the first and last pieces are empty when the text starts or ends with a separator
+        first = 1 if tokens and not tokens[0] else 0
+        last = len(tokens) - 1 if len(tokens) > first and not tokens[-1] else len(tokens)
+        self.tokens: List[str] = tokens[first:last]
+        self.starts: List[int] = starts[first:last]
+        self.ends: List[int] = ends[first:last]
+        
+        # lowercased words, used for dictionary and keyword lookups
+        if len(self.folded) == len(text):
+            self.words = list(map(str.lower, self.tokens))
+        else:
+            self.words = [self.folded[start:end] for start, end in zip(self.starts, self.ends)]
+        
+        # uppercase runs of 1-5 ascii letters, the tokens that look like tickers
+        upper = compress(range(len(self.tokens)), map(str.isupper, self.tokens))
+        self.upper_runs = [
+            i for i in upper
+            if len(self.tokens[i]) <= 5 and self.tokens[i].isalpha() and self.tokens[i].isascii()
+        ]
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def token(self, i: int) -> str:
+        """token i as written in the original text"""
+        return self.tokens[i]
+    
+    def starting_with(self, prefixes: Tuple[str, ...]) -> List[int]:
+        """indexes of lowercased words starting with any of the prefixes"""
+        return list(compress(range(len(self.words)), map(methodcaller('startswith', prefixes), self.words)))
+    
+    def ending_with(self, suffixes: Tuple[str, ...]) -> List[int]:
+        """indexes of lowercased words ending with any of the suffixes"""
+        return list(compress(range(len(self.words)), map(methodcaller('endswith', suffixes), self.words)))
+    
+    def gap(self, i: int) -> str:
+        """text between token i - 1 and token i"""
+        return self.text[self.ends[i - 1]:self.starts[i]]
+
+class PhraseIndex:
+    """case-insensitive dictionary of phrases matched on whole tokens
+    
+    phrases are walked token by token through a trie, then the exact characters
+    between the tokens are checked, so "amazon.com" does not match "amazon com"
+    """
+    
+    def __init__(self):
+        self._root: Dict[Optional[str], Any] = {}  # word -> child node, None -> [(phrase, lead, value)]
+        self.phrase_count = 0
+    
+    def add(self, phrase: str, value: Any):
+        """add a phrase, reporting value on a hit"""
+        folded = fold_case(phrase)
+        words = WORD_PATTERN.findall(folded)
+        if not words:
+            return
+        
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        
+        # characters before the first word, e.g. the "." of ".com"
+        lead = WORD_PATTERN.search(folded).start()
+        node.setdefault(None, []).append((folded, lead, value))
+        self.phrase_count += 1
+    
+    def find_all(self, tokens: TokenStream, group: Optional[Callable[[Any], Hashable]] = None) -> List[Tuple[int, int, Any]]:
+        """non-overlapping (start, end, value) matches, preferring the leftmost and then the longest
+        
+        with a group function, overlaps are only resolved between values of the same group
+        """
+        root = self._root
+        words, starts = tokens.words, tokens.starts
+        folded = tokens.folded
+        count = len(words)
+        
+        selected = []
+        last_end: Dict[Hashable, int] = {}
+        for i in range(count):
+            node = root.get(words[i])
+            if node is None:
+                continue
+            
+            # longest phrase per group starting at this token
+            longest: Dict[Hashable, Tuple[int, int, Any]] = {}
+            j = i
+            while True:
+                for phrase, lead, value in node.get(None, ()):
+                    start = starts[i] - lead
+                    end = start + len(phrase)
+                    if start < 0 or folded[start:end] != phrase:
+                        continue
+                    key = group(value) if group else None
+                    if key not in longest or end > longest[key][1]:
+                        longest[key] = (start, end, value)
+                
+                j += 1
+                if j == count:
+                    break
+                node = node.get(words[j])
+                if node is None:
+                    break
+            
+            for key, match in longest.items():
+                if match[0] >= last_end.get(key, -1):
+                    selected.append(match)
+                    last_end[key] = match[1]
+        
+        return selected
@@ -0,0 +1,123 @@
+"""roll tagged news articles into the trending-topic detector and save its state
+
+each run only reads the articles tagged since the saved checkpoint, so keeping
+years of history current costs one pass over the new articles. the checkpoint is
+the time an article was tagged (or stored, for articles stored already tagged),
+which only moves forward, so backfilled and late articles are still read. run
+from the repo root:
+    python -m src.ingest.news.topic_worker
+    python -m src.ingest.news.topic_worker --ticker AAPL   # print what is trending
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from ...db import db_manager, create_tables, BASE_DIR
+from .topics import TopicTrendDetector
+
+logger = logging.getLogger(__name__)
+
+TOPIC_STATE_PATH = BASE_DIR / "data" / "cache" / "topic_trends.pkl"
+
+# articles tagged after a (processed time, id) checkpoint in published order, with the symbols the tagger found
+ARTICLES_SQL = """
+    SELECT n.id, n.title, n.text, n.ts_published,
+           COALESCE(n.ts_processed, n.ts_crawled) AS ts_checkpoint,
+           LIST(t.symbol) FILTER (WHERE t.symbol IS NOT NULL) AS tickers
+    FROM news_articles n
+    LEFT JOIN article_ticker_associations a ON a.article_id = n.id
+    LEFT JOIN ticker_symbols t ON t.id = a.ticker_id
+    WHERE n.is_processed
+      AND n.ts_published IS NOT NULL
+      AND (COALESCE(n.ts_processed, n.ts_crawled), n.id) > (?, ?)
+    GROUP BY n.id, n.title, n.text, n.ts_published, n.ts_processed, n.ts_crawled
+    ORDER BY n.ts_published, n.id
+"""
+
+def load_detector(path: Path = TOPIC_STATE_PATH) -> Optional[TopicTrendDetector]:
+    """the saved detector, or None when there is none or it can't be read"""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"ignoring unreadable topic state {path}: {e}")
+        return None
+
+def save_detector(detector: TopicTrendDetector, path: Path = TOPIC_STATE_PATH):
+    """write the detector atomically, so readers never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(detector, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def update_topics(detector: TopicTrendDetector, batch_size: int = 5000) -> int:
+    """add every article tagged after the detector's checkpoint, and move the checkpoint past them"""
+    # the epoch stands in for "no checkpoint", duckdb compares the row tuples
+    after = detector.checkpoint or (datetime(1970, 1, 1), 0)
+    checkpoint = after
+    count = 0
+    for batch in db_manager.iter_batches(ARTICLES_SQL, list(after), batch_size=batch_size):
+        columns = batch.to_pydict()
+        for article_id, title, text, published, tagged, tickers in zip(
+            columns['id'], columns['title'], columns['text'], columns['ts_published'],
+            columns['ts_checkpoint'], columns['tickers']
+        ):
+            detector.add((title, text), tickers or (), published)
+            # rows come in published order, not tagging order
+            checkpoint = max(checkpoint, (tagged, article_id))
+        count += batch.num_rows
+        logger.info(f"added {count} articles to the topic detector")
+    if count:
+        detector.checkpoint = checkpoint
+    return count
+
+def run_topics(path: Path = TOPIC_STATE_PATH, rebuild: bool = False) -> Dict[str, float]:
+    """bring the saved detector up to date with the articles tagged since the last run"""
+    detector = None if rebuild else load_detector(path)
+    if detector is not None and not hasattr(detector, 'checkpoint'):
+        # saved before checkpoints followed tagging time, its position can't be carried over
+        logger.info("rebuilding topic state saved with a published-time checkpoint")
+        detector = None
+    detector = detector or TopicTrendDetector()
+    
+    started = time.perf_counter()
+    articles = update_topics(detector)
+    if articles:
+        save_detector(detector, path)
+    return {'articles': articles, 'seconds': time.perf_counter() - started}
+
+def main():
+    parser = argparse.ArgumentParser(description="update the trending-topic detector from tagged articles")
+    parser.add_argument('--rebuild', action='store_true', help="start from an empty detector")
+    parser.add_argument('--ticker', help="print the terms trending for a ticker, or '*' for all articles")
+    parser.add_argument('--top', type=int, default=10, help="terms to print")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    
+    stats = run_topics(rebuild=args.rebuild)
+    rate = stats['articles'] / stats['seconds'] if stats['seconds'] else 0.0
+    logger.info(f"done: {stats['articles']} articles, {rate:.0f} articles/sec")
+    
+    if args.ticker:
+        detector = load_detector()
+        for row in (detector.trending(args.ticker, args.top) if detector else []):
+            print(f"{row['topic']:<30} {row['frequency']:>6} {row['expected']:>8.1f} {row['score']:>7.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""streaming trending-topic detection with count-min sketches
+
+every article updates fixed-size sketches for the market as a whole and for each
+ticker it mentions. when a time window closes, its counts are folded into an
+exponentially decayed baseline, and terms are trending when the open window
+holds more of them than the baseline predicts
+"""
+
+import re
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+# scope holding every article, whatever tickers it mentions
+ALL_TICKERS = '*'
+
+# every word and number; only the tokens matching TERM_PATTERN can be terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+TERM_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+
+STOPWORDS = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'had',
+    'has', 'have', 'his', 'its', 'it', 'be', 'by', 'on', 'in', 'of', 'to', 'as', 'at', 'an', 'or',
+    'is', 'if', 'so', 'do', 'we', 'he', 'she', 'they', 'them', 'their', 'this', 'that', 'these',
+    'those', 'with', 'from', 'into', 'over', 'after', 'before', 'about', 'than', 'then', 'there',
+    'will', 'would', 'could', 'should', 'may', 'might', 'also', 'been', 'being', 'were', 'which',
+    'who', 'whom', 'what', 'when', 'where', 'while', 'more', 'most', 'some', 'such', 'only', 'other',
+    'said', 'says', 'say', 'new', 'year', 'years', 'inc', 'corp', 'company', 'companies', 'ltd',
+    'per', 'cent', 'percent', 'just', 'like', 'out', 'up', 'down', 'any', 'each', 'how', 'why',
+    'does', 'did', 'yet', 'very', 'still', 'much', 'many', 'now', 'week', 'day', 'today',
+})
+
+# mersenne prime for the sketch's universal hash family
+_PRIME = (1 << 31) - 1
+
+def _is_term(token: str) -> bool:
+    return len(token) > 2 and token not in STOPWORDS and TERM_PATTERN.fullmatch(token) is not None
+
+def extract_terms(*fields: str) -> Set[str]:
+    """distinct unigrams and bigrams of one or more text fields, such as a title and a summary
+    
+    stopwords, short words and numbers are left out and break bigrams, which pair
+    adjacent words of the same field only
+    """
+    terms = set()
+    for field in fields:
+        tokens = TOKEN_PATTERN.findall(field.lower())
+        kept = [_is_term(token) for token in tokens]
+        terms.update(token for token, keep in zip(tokens, kept) if keep)
+        terms.update(
+            f"{first} {second}"
+            for first, second, keep_first, keep_second in zip(tokens, tokens[1:], kept, kept[1:])
+            if keep_first and keep_second
+        )
+    return terms
+
+def term_hashes(terms: Sequence[str]) -> np.ndarray:
+    """stable 32-bit hashes, the same in every process"""
+    return np.fromiter(map(zlib.crc32, map(str.encode, terms)), dtype=np.int64, count=len(terms))
+
+class CountMinSketch:
+    """approximate counts in a fixed depth x width table; estimates never undercount"""
+    
+    def __init__(self, width: int = 4096, depth: int = 4, seed: int = 0):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(depth, 1), dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=(depth, 1), dtype=np.int64)
+        self._rows = np.arange(depth)[:, None]
+    
+    def columns(self, hashes: np.ndarray) -> np.ndarray:
+        """depth x len(hashes) cells of each hashed term, shared by sketches of the same shape and seed"""
+        return (self._a * (hashes % _PRIME) + self._b) % _PRIME % self.width
+    
+    def add(self, hashes: np.ndarray, count: float = 1.0):
+        """count each of a set of distinct terms once more, or count times"""
+        self.add_columns(self.columns(hashes), count)
+    
+    def add_columns(self, columns: np.ndarray, count: float = 1.0):
+        # distinct terms sharing a cell bump it once; every term's cells still
+        # grow with each of its own additions, so estimates stay upper bounds
+        self.table[self._rows, columns] += count
+    
+    def estimate(self, hashes: np.ndarray) -> np.ndarray:
+        """estimated count of each hashed term"""
+        return self.estimate_columns(self.columns(hashes))
+    
+    def estimate_columns(self, columns: np.ndarray) -> np.ndarray:
+        return self.table[self._rows, columns].min(axis=0)
+    
+    def scale(self, factor: float):
+        """multiply every count, e.g. to decay old windows"""
+        self.table *= factor
+    
+    def merge(self, other: 'CountMinSketch'):
+        """add the counts of a sketch built with the same width, depth and seed"""
+        self.table += other.table
+    
+    def clear(self):
+        self.table.fill(0)
+
+class HeavyHitters:
+    """the terms with the largest estimated counts, kept to at most twice the capacity
+    
+    pruning back to capacity whenever the set doubles keeps each update amortized O(1)
+    """
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[str, float] = {}
+        self.floor = 0.0  # smallest count kept at the last prune
+    
+    def offer(self, terms: Sequence[str], estimates: np.ndarray):
+        """track terms whose estimate beats the floor; tracked terms below it are
+        left alone, trending() re-estimates them from the sketch anyway"""
+        counts = self.counts
+        for i in np.flatnonzero(estimates > self.floor).tolist():
+            counts[terms[i]] = estimates[i]
+        if len(counts) > 2 * self.capacity:
+            kept = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+            self.counts = dict(kept)
+            self.floor = kept[-1][1]
+    
+    def clear(self):
+        self.counts = {}
+        self.floor = 0.0
+
+class _Scope:
+    """sketches of one ticker, or of every article"""
+    
+    __slots__ = ('window', 'baseline', 'hitters', 'articles', 'baseline_articles')
+    
+    def __init__(self, width: int, depth: int, top_k: int):
+        # same seed everywhere so window and baseline tables line up for merging
+        self.window = CountMinSketch(width, depth)
+        self.baseline = CountMinSketch(width, depth)
+        self.hitters = HeavyHitters(top_k)
+        self.articles = 0
+        self.baseline_articles = 0.0
+
+class TopicTrendDetector:
+    """terms and bigrams trending in the current window, overall and per ticker
+    
+    memory is bounded by the sketch sizes and max_tickers, whatever the number of
+    articles. articles are expected in roughly published order; late ones count
+    toward the open window
+    """
+    
+    def __init__(self, window: timedelta = timedelta(days=1), halflife_windows: float = 7.0,
+                 width: int = 4096, ticker_width: int = 1024, depth: int = 4, top_k: int = 100,
+                 min_count: int = 3, max_tickers: int = 1000):
+        self.window = window
+        self.decay = 0.5 ** (1.0 / halflife_windows)
+        self.width = width
+        self.ticker_width = ticker_width
+        self.depth = depth
+        self.top_k = top_k
+        self.min_count = min_count
+        self.max_tickers = max_tickers
+        
+        self.window_start: Optional[datetime] = None
+        # (processed time, id) of the last article a feed such as topic_worker added, for resuming
+        self.checkpoint: Optional[Tuple[datetime, int]] = None
+        self._market = _Scope(width, depth, top_k)
+        self._tickers: 'OrderedDict[str, _Scope]' = OrderedDict()  # least recently mentioned first
+    
+    def add(self, text: Union[str, Sequence[str]], tickers: Iterable[str] = (),
+            published: Optional[datetime] = None):
+        """count an article's terms once each, in the market scope and the scope of each ticker
+        
+        text is the article's text, or its fields (e.g. title and summary) so bigrams don't span them
+        """
+        if published is not None:
+            self._advance(published)
+        
+        fields = (text,) if isinstance(text, str) else text
+        terms = list(extract_terms(*(field or '' for field in fields)))
+        if not terms:
+            return
+        hashes = term_hashes(terms)
+        
+        self._update(self._market, terms, self._market.window.columns(hashes))
+        if tickers:
+            # every ticker sketch has the same shape, so their cells are computed once
+            columns = None
+            for ticker in set(tickers):
+                scope = self._ticker_scope(ticker)
+                if columns is None:
+                    columns = scope.window.columns(hashes)
+                self._update(scope, terms, columns)
+    
+    def _update(self, scope: _Scope, terms: List[str], columns: np.ndarray):
+        scope.window.add_columns(columns)
+        scope.articles += 1
+        scope.hitters.offer(terms, scope.window.estimate_columns(columns))
+    
+    def _ticker_scope(self, ticker: str) -> _Scope:
+        scope = self._tickers.get(ticker)
+        if scope is None:
+            if len(self._tickers) >= self.max_tickers:
+                self._tickers.popitem(last=False)
+            scope = self._tickers[ticker] = _Scope(self.ticker_width, self.depth, self.top_k)
+        else:
+            self._tickers.move_to_end(ticker)
+        return scope
+    
+    def _advance(self, published: datetime):
+        """close the open window, and any empty ones after it, once published is past its end"""
+        if self.window_start is None:
+            self.window_start = published
+            return
+        
+        elapsed = (published - self.window_start) // self.window
+        if elapsed >= 1:
+            self.close_window(int(elapsed))
+    
+    def close_window(self, windows: int = 1):
+        """fold the open window into the decayed baselines and start the next one
+        
+        windows > 1 also decays for the empty windows in between
+        """
+        for scope in self._scopes():
+            scope.baseline.scale(self.decay ** windows)
+            scope.baseline_articles *= self.decay ** windows
+            # the closed window enters the baseline with the decay of its age
+            scope.window.scale(self.decay ** (windows - 1))
+            scope.baseline.merge(scope.window)
+            scope.baseline_articles += scope.articles * self.decay ** (windows - 1)
+            scope.window.clear()
+            scope.hitters.clear()
+            scope.articles = 0
+        
+        if self.window_start is not None:
+            self.window_start += self.window * windows
+    
+    def _scopes(self) -> Iterable[_Scope]:
+        yield self._market
+        yield from self._tickers.values()
+    
+    def trending(self, ticker: Optional[str] = None, n: int = 10) -> List[Dict]:
+        """top terms of the open window by how far their count exceeds the baseline's expectation
+        
+        the score is (count - expected) / sqrt(expected + 1), where expected scales the
+        term's decayed baseline count to the window's article count
+        """
+        scope = self._market if ticker in (None, ALL_TICKERS) else self._tickers.get(ticker)
+        if scope is None or not scope.hitters.counts:
+            return []
+        
+        terms = list(scope.hitters.counts)
+        hashes = term_hashes(terms)
+        counts = scope.window.estimate(hashes).astype(np.float64)
+        if scope.baseline_articles:
+            expected = scope.baseline.estimate(hashes) * (scope.articles / scope.baseline_articles)
+        else:
+            expected = np.zeros(len(terms))
+        scores = (counts - expected) / np.sqrt(expected + 1)
+        
+        keep = counts >= self.min_count
+        order = np.argsort(-scores[keep], kind='stable')[:n]
+        kept_terms = [term for term, k in zip(terms, keep) if k]
+        return [
+            {
+                'topic': kept_terms[i],
+                'frequency': int(round(counts[keep][i])),
+                'expected': float(expected[keep][i]),
+                'score': float(scores[keep][i]),
+            }
+            for i in order
+        ]
+    
+    def tickers(self) -> List[str]:
+        """tickers with a scope, most recently mentioned last"""
+        return list(self._tickers)
@@ -0,0 +1,284 @@
+"""float32 embedding storage on disk and an ivf index for nearest-neighbour search
+
+vectors are appended to a raw float32 file with a parallel int64 file of article
+ids and read back through memory maps, so opening a store of a million articles
+reads nothing until a query touches it. the ivf index clusters the vectors with
+spherical k-means and keeps each cluster's vectors contiguous, so a query scores
+the closest nprobe clusters with one matrix-vector product each
+"""
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = 'vectors.f32'
+IDS_FILE = 'ids.i64'
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.npz'
+INDEX_VECTORS_FILE = 'index.f32'
+
+# rows per matrix product when a pass goes over the whole store
+CHUNK_ROWS = 65536
+
+def _write_atomic(path: Path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """positions of the k highest scores, best first"""
+    if k < len(scores):
+        top = np.argpartition(-scores, k)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+class EmbeddingStore:
+    """append-only float32 vectors keyed by article id
+    
+    re-embedding an article appends a new row; lookups and searches use the
+    newest row of each id. a row counts once both of its files hold it, so a
+    crash mid-append leaves the store as it was before
+    """
+    
+    def __init__(self, directory: Path, dim: int, model_name: str = ''):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta['dim'] != dim:
+                raise ValueError(f"store {self.directory} holds {meta['dim']}-dim vectors, not {dim}")
+        else:
+            meta_path.write_text(json.dumps({'dim': dim, 'model_name': model_name}))
+        self.dim = dim
+        self.model_name = model_name
+        self._count = None
+        self._vectors = None
+        self._ids = None
+        self._latest = None
+    
+    def __len__(self) -> int:
+        if self._count is None:
+            sizes = [self._size(VECTORS_FILE) // (4 * self.dim), self._size(IDS_FILE) // 8]
+            self._count = min(sizes)
+        return self._count
+    
+    def _size(self, name: str) -> int:
+        path = self.directory / name
+        return path.stat().st_size if path.exists() else 0
+    
+    def append(self, ids: np.ndarray, vectors: np.ndarray):
+        """add vectors for article ids, replacing earlier vectors of the same ids"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"expected {len(ids)} x {self.dim} vectors, got {vectors.shape}")
+        count = len(self)
+        # cut any partial row a crashed append left behind, then write ids last so
+        # a row only counts once its vector is complete
+        for name, width in ((VECTORS_FILE, 4 * self.dim), (IDS_FILE, 8)):
+            with open(self.directory / name, 'ab') as f:
+                f.truncate(count * width)
+        with open(self.directory / VECTORS_FILE, 'ab') as f:
+            f.write(vectors.tobytes())
+        with open(self.directory / IDS_FILE, 'ab') as f:
+            f.write(ids.tobytes())
+        self._reset()
+    
+    def clear(self):
+        """drop every vector, and any index built on them"""
+        for name in (VECTORS_FILE, IDS_FILE, INDEX_FILE, INDEX_VECTORS_FILE):
+            (self.directory / name).unlink(missing_ok=True)
+        self._reset()
+    
+    def _reset(self):
+        self._count = self._vectors = self._ids = self._latest = None
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """rows x dim read-only memory map"""
+        if self._vectors is None:
+            self._vectors = self._map(VECTORS_FILE, np.float32, (len(self), self.dim))
+        return self._vectors
+    
+    @property
+    def ids(self) -> np.ndarray:
+        """article id of each row"""
+        if self._ids is None:
+            self._ids = self._map(IDS_FILE, np.int64, (len(self),))
+        return self._ids
+    
+    def _map(self, name: str, dtype, shape) -> np.ndarray:
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.directory / name, dtype=dtype, mode='r', shape=shape)
+    
+    def _latest_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """sorted distinct ids and the newest row of each"""
+        if self._latest is None:
+            ids = np.asarray(self.ids)
+            # stable sort keeps rows of an id in append order, the last one is the newest
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            last = np.append(sorted_ids[1:] != sorted_ids[:-1], True) if len(ids) else np.zeros(0, bool)
+            self._latest = (sorted_ids[last], order[last])
+        return self._latest
+    
+    def rows_of(self, article_ids) -> np.ndarray:
+        """newest row of each article id, -1 where it has no vector"""
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        known, rows = self._latest_rows()
+        position = np.searchsorted(known, article_ids)
+        position = np.minimum(position, max(len(known) - 1, 0))
+        found = (known[position] == article_ids) if len(known) else np.zeros(len(article_ids), bool)
+        return np.where(found, rows[position] if len(rows) else -1, -1)
+    
+    def is_current(self, rows: np.ndarray) -> np.ndarray:
+        """whether each row is the newest for its article id"""
+        return self.rows_of(self.ids[rows]) == rows
+    
+    def get(self, article_id: int) -> Optional[np.ndarray]:
+        row = self.rows_of([article_id])[0]
+        return None if row < 0 else np.array(self.vectors[row])
+    
+    def search_exact(self, query: np.ndarray, k: int = 10, start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """brute-force top k (ids, scores) by dot product over rows from start on"""
+        scores = np.empty(len(self) - start, dtype=np.float32)
+        for lo in range(start, len(self), CHUNK_ROWS):
+            hi = min(lo + CHUNK_ROWS, len(self))
+            scores[lo - start:hi - start] = self.vectors[lo:hi] @ query
+        rows = np.arange(start, len(self))
+        return self._best(rows, scores, k)
+    
+    def _best(self, rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """top k of candidate rows, skipping rows superseded by a newer vector"""
+        top = _top_k(scores, k)
+        current = self.is_current(rows[top])
+        if not current.all():
+            # stale rows only ever drop out, so widen the candidate set until k remain
+            keep = self.is_current(rows)
+            rows, scores = rows[keep], scores[keep]
+            top = _top_k(scores, k)
+        return self.ids[rows[top]], scores[top]
+
+class IVFIndex:
+    """inverted-file index over an EmbeddingStore's vectors
+    
+    covers the rows present when it was built; rows appended later are scanned
+    exactly until the next build, so new articles are searchable at once
+    """
+    
+    def __init__(self, store: EmbeddingStore, centroids: np.ndarray, offsets: np.ndarray,
+                 rows: np.ndarray, vectors: np.ndarray):
+        self.store = store
+        self.centroids = centroids
+        self.offsets = offsets  # list i holds rows[offsets[i]:offsets[i + 1]]
+        self.rows = rows
+        self.vectors = vectors  # the store's vectors reordered list by list
+        self.size = len(rows)
+    
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+    
+    @classmethod
+    def build(cls, store: EmbeddingStore, nlist: Optional[int] = None, iterations: int = 10,
+              sample_size: int = 100000, seed: int = 0) -> 'IVFIndex':
+        """cluster the store's vectors and write the index next to them
+        
+        nlist defaults to sqrt of the row count; centroids are trained on a random
+        sample, then every row is assigned to its closest one
+        """
+        count = len(store)
+        if not count:
+            raise ValueError(f"store {store.directory} is empty")
+        nlist = min(nlist or int(np.sqrt(count)), count)
+        rng = np.random.default_rng(seed)
+        
+        sample = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+        centroids = _spherical_kmeans(np.asarray(store.vectors[sample]), nlist, iterations, rng)
+        
+        labels = np.empty(count, dtype=np.int32)
+        for lo in range(0, count, CHUNK_ROWS):
+            hi = min(lo + CHUNK_ROWS, count)
+            labels[lo:hi] = np.argmax(store.vectors[lo:hi] @ centroids.T, axis=1)
+        rows = np.argsort(labels, kind='stable').astype(np.int64)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        
+        def write_vectors(f):
+            for lo in range(0, count, CHUNK_ROWS):
+                f.write(np.ascontiguousarray(store.vectors[rows[lo:lo + CHUNK_ROWS]]).tobytes())
+        
+        def write_index(f):
+            np.savez(f, centroids=centroids, offsets=offsets, rows=rows)
+        
+        # vectors first: an index file never points at vectors that are not there
+        _write_atomic(store.directory / INDEX_VECTORS_FILE, write_vectors)
+        _write_atomic(store.directory / INDEX_FILE, write_index)
+        logger.info(f"built ivf index over {count} vectors in {nlist} lists")
+        return cls.load(store)
+    
+    @classmethod
+    def load(cls, store: EmbeddingStore) -> Optional['IVFIndex']:
+        """the index saved with the store, or None when it has none"""
+        path = store.directory / INDEX_FILE
+        if not path.exists():
+            return None
+        with np.load(path) as saved:
+            centroids, offsets, rows = saved['centroids'], saved['offsets'], saved['rows']
+        if len(rows) > len(store):
+            logger.warning(f"ignoring ivf index at {path}: it covers more rows than the store holds")
+            return None
+        vectors = np.memmap(store.directory / INDEX_VECTORS_FILE, dtype=np.float32, mode='r',
+                            shape=(len(rows), store.dim))
+        return cls(store, centroids, offsets, rows, vectors)
+    
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = 16) -> Tuple[np.ndarray, np.ndarray]:
+        """approximate top k (ids, scores) by dot product, from the nprobe closest lists"""
+        query = np.asarray(query, dtype=np.float32)
+        lists = _top_k(self.centroids @ query, min(nprobe, self.nlist))
+        
+        rows, scores = [], []
+        for i in lists.tolist():
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            if hi > lo:
+                rows.append(self.rows[lo:hi])
+                scores.append(self.vectors[lo:hi] @ query)
+        tail = np.arange(self.size, len(self.store))
+        if len(tail):
+            rows.append(tail)
+            scores.append(self.store.vectors[self.size:] @ query)
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self.store._best(np.concatenate(rows), np.concatenate(scores), k)
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """k unit centroids maximizing cosine similarity to their members"""
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    members = np.arange(len(vectors))
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        assignment = sparse.csr_matrix((np.ones(len(vectors), np.float32), (labels, members)),
+                                       shape=(k, len(vectors)))
+        sums = np.asarray(assignment @ vectors, dtype=np.float32)
+        # a list left empty restarts from a random vector
+        empty = np.flatnonzero(np.bincount(labels, minlength=k) == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), size=len(empty))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
@@ -0,0 +1,82 @@
+"""performance metrics for many portfolios at once
+
+returns are a T x N matrix of periodic asset returns and weights a K x N matrix,
+one portfolio per row. every metric is computed for all K portfolios with a few
+array passes over a T x chunk block, so memory stays bounded however large K is
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# periods per year of daily returns
+TRADING_DAYS = 252
+
+METRIC_NAMES = ['total_return', 'annualized_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown']
+
+# upper bound on the T x chunk portfolio-return block and the arrays derived from it
+CHUNK_BYTES = 32 * 1024 * 1024
+
+def portfolio_returns(returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """T x K returns of each weight row, missing asset returns counting as zero"""
+    returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+    return returns @ np.atleast_2d(np.asarray(weights, dtype=np.float64)).T
+
+def batch_metrics(returns: np.ndarray, weights: np.ndarray, periods_per_year: int = TRADING_DAYS,
+                  risk_free: float = 0.0, chunk_size: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """each of METRIC_NAMES as a length-K array, for a T x N returns and K x N weights matrix
+    
+    follows the single-portfolio definitions: returns compound over the period,
+    volatility and downside deviation are annualized sample standard deviations
+    (downside over the negative periods only), sharpe and sortino are zero when
+    their deviation is, and max drawdown is measured from the running peak of
+    the compounded value. risk_free is an annual rate
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    periods, assets = returns.shape
+    if weights.shape[1] != assets:
+        raise ValueError(f"weights have {weights.shape[1]} columns for {assets} assets")
+    if periods < 2:
+        raise ValueError("metrics need at least two periods of returns")
+    count = len(weights)
+    # a handful of T x chunk float64 arrays are alive at once
+    chunk_size = chunk_size or max(1, CHUNK_BYTES // (4 * 8 * periods))
+    
+    results = {name: np.empty(count) for name in METRIC_NAMES}
+    scale = np.sqrt(periods_per_year)
+    for lo in range(0, count, chunk_size):
+        hi = min(lo + chunk_size, count)
+        block = returns @ weights[lo:hi].T
+        
+        growth = np.cumprod(1 + block, axis=0)
+        total = growth[-1] - 1
+        annualized = (1 + total) ** (periods_per_year / periods) - 1
+        volatility = block.std(axis=0, ddof=1) * scale
+        
+        peak = np.maximum.accumulate(growth, axis=0)
+        growth -= peak
+        growth /= peak
+        max_drawdown = growth.min(axis=0)
+        
+        # downside deviation: sample std of the negative periods, two passes for accuracy
+        negative = block < 0
+        negatives = negative.sum(axis=0)
+        downside = np.where(negative, block, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            downside_mean = downside.sum(axis=0) / negatives
+            downside -= downside_mean
+            downside *= negative
+            downside_std = np.sqrt((downside ** 2).sum(axis=0) / (negatives - 1)) * scale
+        downside_std[negatives < 2] = 0.0
+        
+        excess = annualized - risk_free
+        results['total_return'][lo:hi] = total
+        results['annualized_return'][lo:hi] = annualized
+        results['volatility'][lo:hi] = volatility
+        results['sharpe_ratio'][lo:hi] = np.divide(excess, volatility, out=np.zeros_like(excess),
+                                                   where=volatility > 0)
+        results['sortino_ratio'][lo:hi] = np.divide(excess, downside_std, out=np.zeros_like(excess),
+                                                    where=downside_std > 0)
+        results['max_drawdown'][lo:hi] = max_drawdown
+    return results
@@ -0,0 +1,158 @@
+"""monte carlo value at risk and expected shortfall of portfolios over several horizons
+
+paths are drawn either from a multivariate normal fitted to the asset returns or
+by resampling whole days (optionally blocks of days) of historical returns, so
+the cross-asset correlation is kept either way. weights are held fixed every
+period, as in metrics.portfolio_returns, so a portfolio's return is w'r and the
+correlated asset draws only enter through it: the normal model samples the K x K
+portfolio covariance W C W' through its cholesky factor and the bootstrap
+resamples the T x K historical portfolio returns, whatever the number of assets.
+
+paths are generated in fixed blocks, each from its own child of the seed, so a
+seeded run gives the same numbers whatever memory budget groups the blocks
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_HORIZONS = (1, 5, 21)
+DEFAULT_LEVELS = (0.95, 0.99)
+
+# paths per independently seeded block
+PATH_BLOCK = 4096
+
+# upper bound on the paths x horizon arrays of one chunk of blocks
+MEMORY_BUDGET = 64 * 1024 * 1024
+
+# live paths x horizon float64 arrays per portfolio while a chunk is simulated
+_CHUNK_ARRAYS = 3
+
+class PortfolioSimulator:
+    """draws daily portfolio returns for K fixed-weight portfolios of N assets
+    
+    method 'normal' uses mean and cov, estimated from the T x N returns when not
+    given; 'bootstrap' resamples the rows of returns in blocks of block_length
+    """
+    
+    def __init__(self, weights: np.ndarray, method: str = 'normal', returns: Optional[np.ndarray] = None,
+                 mean: Optional[np.ndarray] = None, cov: Optional[np.ndarray] = None, block_length: int = 1):
+        self.weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        self.method = method
+        self.block_length = int(block_length)
+        if method == 'normal':
+            if mean is None or cov is None:
+                if returns is None:
+                    raise ValueError("the normal model needs returns, or a mean and covariance")
+                history = np.asarray(returns, dtype=np.float64)
+                mean = np.nanmean(history, axis=0) if mean is None else mean
+                cov = _nan_cov(history) if cov is None else cov
+            self.mean = self.weights @ np.asarray(mean, dtype=np.float64)
+            portfolio_cov = self.weights @ np.asarray(cov, dtype=np.float64) @ self.weights.T
+            # a tiny ridge keeps the factor defined for duplicate or zero-risk portfolios
+            ridge = 1e-12 * max(np.trace(portfolio_cov), 1e-300)
+            self.factor = np.linalg.cholesky(portfolio_cov + ridge * np.eye(len(portfolio_cov)))
+        elif method == 'bootstrap':
+            if returns is None:
+                raise ValueError("the bootstrap needs historical returns")
+            self.history = np.nan_to_num(np.asarray(returns, dtype=np.float64)) @ self.weights.T
+            if len(self.history) < 1 or self.block_length < 1:
+                raise ValueError("the bootstrap needs returns and a positive block length")
+        else:
+            raise ValueError(f"unknown simulation method {method!r}, expected normal or bootstrap")
+    
+    @property
+    def portfolios(self) -> int:
+        return len(self.weights)
+    
+    def draw(self, rng: np.random.Generator, paths: int, periods: int) -> np.ndarray:
+        """paths x periods x K daily portfolio returns"""
+        if self.method == 'normal':
+            shocks = rng.standard_normal((paths, periods, self.portfolios))
+            if self.portfolios == 1:
+                # a single portfolio is a scaled normal, done in place
+                shocks *= self.factor[0, 0]
+                shocks += self.mean
+                return shocks
+            return shocks @ self.factor.T + self.mean
+        days = len(self.history)
+        blocks = -(-periods // self.block_length)
+        starts = rng.integers(0, days, (paths, blocks, 1))
+        rows = (starts + np.arange(self.block_length)) % days
+        return self.history[rows.reshape(paths, -1)[:, :periods]]
+
+def _nan_cov(returns: np.ndarray) -> np.ndarray:
+    """sample covariance with missing returns counted as the column mean"""
+    missing = ~np.isfinite(returns)
+    centered = np.where(missing, 0.0, returns - np.nanmean(returns, axis=0))
+    return centered.T @ centered / max(len(returns) - 1, 1)
+
+def simulate_returns(simulator: PortfolioSimulator, paths: int, horizons: Sequence[int] = DEFAULT_HORIZONS,
+                     seed: Optional[int] = None, memory_budget: int = MEMORY_BUDGET) -> np.ndarray:
+    """paths x len(horizons) x K compounded returns at each horizon, in periods"""
+    horizons = np.asarray(sorted({int(h) for h in horizons}))
+    if horizons[0] < 1:
+        raise ValueError("horizons are at least one period")
+    longest = int(horizons[-1])
+    portfolios = simulator.portfolios
+    blocks = -(-paths // PATH_BLOCK)
+    seeds = np.random.SeedSequence(seed).spawn(blocks)
+    block_bytes = PATH_BLOCK * longest * portfolios * 8 * _CHUNK_ARRAYS
+    per_chunk = max(1, memory_budget // block_bytes)
+    
+    results = np.empty((paths, len(horizons), portfolios))
+    for first in range(0, blocks, per_chunk):
+        last = min(first + per_chunk, blocks)
+        lo, hi = first * PATH_BLOCK, min(last * PATH_BLOCK, paths)
+        chunk = np.empty((hi - lo, longest, portfolios))
+        for block in range(first, last):
+            start = block * PATH_BLOCK - lo
+            count = min(PATH_BLOCK, paths - block * PATH_BLOCK)
+            chunk[start:start + count] = simulator.draw(np.random.default_rng(seeds[block]), count, longest)
+        # compounded through log growth; a return of -100% or worse wipes the path out
+        np.maximum(chunk, -1.0, out=chunk)
+        with np.errstate(divide='ignore'):
+            np.log1p(chunk, out=chunk)
+        np.cumsum(chunk, axis=1, out=chunk)
+        results[lo:hi] = np.expm1(chunk[:, horizons - 1])
+    return results
+
+def tail_risk(outcomes: np.ndarray, levels: Sequence[float] = DEFAULT_LEVELS) -> Dict[str, np.ndarray]:
+    """'var' and 'cvar' of simulated returns as positive loss fractions, len(levels) x the outcomes' other axes
+    
+    var at level a is the loss exceeded in a 1 - a share of paths, cvar the
+    average loss over those paths
+    """
+    outcomes = np.sort(np.asarray(outcomes, dtype=np.float64), axis=0)
+    paths = len(outcomes)
+    cumulative = np.cumsum(outcomes, axis=0)
+    var, cvar = [], []
+    for level in levels:
+        if not 0 < level < 1:
+            raise ValueError(f"confidence levels are between 0 and 1, got {level}")
+        tail = max(1, int(np.ceil((1 - level) * paths)))
+        var.append(-outcomes[tail - 1])
+        cvar.append(-cumulative[tail - 1] / tail)
+    return {'var': np.array(var), 'cvar': np.array(cvar)}
+
+def monte_carlo_risk(weights: np.ndarray, paths: int = 100_000, horizons: Sequence[int] = DEFAULT_HORIZONS,
+                     levels: Sequence[float] = DEFAULT_LEVELS, method: str = 'normal',
+                     returns: Optional[np.ndarray] = None, mean: Optional[np.ndarray] = None,
+                     cov: Optional[np.ndarray] = None, block_length: int = 1, seed: Optional[int] = None,
+                     memory_budget: int = MEMORY_BUDGET) -> Dict[str, np.ndarray]:
+    """var and cvar of K x N weights at each horizon and confidence level
+    
+    returns 'horizons', 'levels', and 'var', 'cvar' and 'expected_return' shaped
+    len(horizons) x len(levels) x K (expected_return without the levels axis)
+    """
+    simulator = PortfolioSimulator(weights, method, returns, mean, cov, block_length)
+    horizons = sorted({int(h) for h in horizons})
+    outcomes = simulate_returns(simulator, paths, horizons, seed, memory_budget)
+    risk = tail_risk(outcomes, levels)
+    return {
+        'horizons': np.array(horizons),
+        'levels': np.asarray(levels, dtype=np.float64),
+        'var': risk['var'].transpose(1, 0, 2),
+        'cvar': risk['cvar'].transpose(1, 0, 2),
+        'expected_return': outcomes.mean(axis=0),
+    }
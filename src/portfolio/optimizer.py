@@ -0,0 +1,233 @@
+"""long-only portfolio optimization: shrunk covariance, mean-variance, minimum variance, risk parity
+
+weights are fully invested and non-negative. the quadratic programs are solved
+by a primal active-set method over the assets that hold weight, so a solve costs
+O(k^3) in the k assets of the answer rather than in the universe, and a solve
+started from a nearby answer takes a few steps. efficient_frontier uses this to
+walk a grid of target returns, each solve starting from the previous portfolio
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# largest number of bound constraints released per active-set step
+RELEASE_BATCH = 8
+
+def ledoit_wolf(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """(covariance, shrinkage) of a T x N returns matrix, shrunk towards a scaled identity
+    
+    the ledoit-wolf (2004) estimate: the sample covariance (normalized by T) mixed
+    with mu * I, mu its average variance, in the proportion that minimizes the
+    expected squared error. missing returns are treated as the column mean
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    missing = ~np.isfinite(returns)
+    present = np.maximum((~missing).sum(axis=0), 1)
+    centered = np.where(missing, 0.0, returns)
+    centered -= centered.sum(axis=0) / present
+    centered[missing] = 0.0
+    periods, assets = centered.shape
+    if periods < 2:
+        raise ValueError("covariance needs at least two periods of returns")
+    
+    sample = centered.T @ centered / periods
+    mu = np.trace(sample) / assets
+    # squared frobenius distances, divided by N as in the paper
+    dispersion = ((sample ** 2).sum() - 2 * mu * np.trace(sample) + assets * mu ** 2) / assets
+    # sum over t of ||x_t x_t' - S||^2 is sum ||x_t||^4 - T ||S||^2
+    noise = ((centered ** 2).sum(axis=1) ** 2).sum() - periods * (sample ** 2).sum()
+    noise = min(noise / (periods ** 2 * assets), dispersion)
+    shrinkage = noise / dispersion if dispersion > 0 else 0.0
+    cov = (1 - shrinkage) * sample
+    cov[np.diag_indices(assets)] += shrinkage * mu
+    return cov, float(shrinkage)
+
+def _solve_qp(cov: np.ndarray, linear: np.ndarray, constraints: np.ndarray, bounds: np.ndarray,
+              start: np.ndarray, tol: float = 1e-10, max_iterations: Optional[int] = None) -> np.ndarray:
+    """min 1/2 w'Cw - linear'w subject to constraints w = bounds and w >= 0, from a feasible start
+    
+    the working set is the assets held at zero. each step solves the equality
+    problem over the other assets and moves towards it until an asset hits zero;
+    at an equality optimum the zero assets whose multiplier says they would lower
+    the objective are released
+    """
+    w = start.astype(np.float64).copy()
+    free = w > 0
+    rows = len(constraints)
+    max_iterations = max_iterations or 10 * len(w) + 100
+    for _ in range(max_iterations):
+        held = np.flatnonzero(free)
+        k = len(held)
+        kkt = np.zeros((k + rows, k + rows))
+        kkt[:k, :k] = cov[np.ix_(held, held)]
+        kkt[:k, k:] = constraints[:, held].T
+        kkt[k:, :k] = constraints[:, held]
+        rhs = np.concatenate([linear[held], bounds])
+        try:
+            solution = np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            # e.g. a target return that the held assets can only just reach
+            solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        step = solution[:k] - w[held]
+        
+        if np.abs(step).max(initial=0.0) <= tol:
+            # rows rather than columns of the symmetric C, a contiguous slice
+            multipliers = w[held] @ cov[held] - linear + constraints.T @ solution[k:]
+            multipliers[free] = 0.0
+            violated = np.flatnonzero(multipliers < -tol * max(1.0, np.abs(multipliers).max()))
+            if not len(violated):
+                break
+            release = violated[np.argsort(multipliers[violated])[:RELEASE_BATCH]]
+            free[release] = True
+            continue
+        
+        shrinking = step < 0
+        ratios = np.full(k, np.inf)
+        ratios[shrinking] = -w[held][shrinking] / step[shrinking]
+        blocking = int(np.argmin(ratios))
+        alpha = min(1.0, ratios[blocking])
+        w[held] += alpha * step
+        if alpha < 1.0:
+            w[held[blocking]] = 0.0
+            free[held[blocking]] = False
+        w[w < 0] = 0.0
+    return w
+
+def _vertex(assets: int, index: int) -> np.ndarray:
+    w = np.zeros(assets)
+    w[index] = 1.0
+    return w
+
+def min_variance(cov: np.ndarray, start: Optional[np.ndarray] = None) -> np.ndarray:
+    """the long-only minimum-variance weights"""
+    cov = np.asarray(cov, dtype=np.float64)
+    assets = len(cov)
+    if start is None:
+        start = _vertex(assets, int(np.argmin(np.diag(cov))))
+    return _solve_qp(cov, np.zeros(assets), np.ones((1, assets)), np.ones(1), start)
+
+def _target_start(mu: np.ndarray, target: float, start: Optional[np.ndarray] = None) -> np.ndarray:
+    """a feasible portfolio returning target: start mixed with the best or worst asset"""
+    if start is None:
+        below = np.flatnonzero(mu <= target)
+        above = np.flatnonzero(mu >= target)
+        start = _vertex(len(mu), int(below[np.argmax(mu[below])] if len(below) else np.argmin(mu)))
+        extreme = _vertex(len(mu), int(above[np.argmin(mu[above])] if len(above) else np.argmax(mu)))
+    else:
+        extreme = _vertex(len(mu), int(np.argmax(mu) if mu @ start <= target else np.argmin(mu)))
+    gap = mu @ extreme - mu @ start
+    share = (target - mu @ start) / gap if gap else 0.0
+    return (1 - share) * start + share * extreme
+
+def mean_variance(mu: np.ndarray, cov: np.ndarray, target_return: Optional[float] = None,
+                  risk_aversion: Optional[float] = None, start: Optional[np.ndarray] = None) -> np.ndarray:
+    """long-only weights of least variance for a target return, or maximizing mu'w - risk_aversion / 2 w'Cw
+    
+    targets outside the range the assets can reach are clipped to it
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    cov = np.asarray(cov, dtype=np.float64)
+    assets = len(mu)
+    if (target_return is None) == (risk_aversion is None):
+        raise ValueError("pass one of target_return and risk_aversion")
+    if risk_aversion is not None:
+        if risk_aversion <= 0:
+            raise ValueError("risk_aversion must be positive")
+        if start is None:
+            start = _vertex(assets, int(np.argmax(mu)))
+        return _solve_qp(cov, mu / risk_aversion, np.ones((1, assets)), np.ones(1), start)
+    
+    target = float(np.clip(target_return, mu.min(), mu.max()))
+    constraints = np.vstack([np.ones(assets), mu])
+    return _solve_qp(cov, np.zeros(assets), constraints, np.array([1.0, target]),
+                     _target_start(mu, target, start))
+
+def efficient_frontier(mu: np.ndarray, cov: np.ndarray, points: int = 50,
+                       risk_free: float = 0.0) -> Dict[str, np.ndarray]:
+    """the long-only frontier at evenly spaced target returns, from minimum variance to the best asset
+    
+    each target starts from the portfolio of the one below it, so most solves
+    are a couple of active-set steps. returns 'returns', 'volatility', 'sharpe_ratio'
+    (against risk_free, in the units of mu) and the points x N 'weights'
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    cov = np.asarray(cov, dtype=np.float64)
+    assets = len(mu)
+    lowest = min_variance(cov)
+    targets = np.linspace(mu @ lowest, mu.max(), points)
+    constraints = np.vstack([np.ones(assets), mu])
+    
+    weights = np.empty((points, assets))
+    weights[0] = lowest
+    for i, target in enumerate(targets[1:], start=1):
+        start = _target_start(mu, target, weights[i - 1])
+        weights[i] = _solve_qp(cov, np.zeros(assets), constraints, np.array([1.0, target]), start)
+    
+    returns = weights @ mu
+    volatility = np.sqrt(np.maximum(((weights @ cov) * weights).sum(axis=1), 0.0))
+    sharpe = np.divide(returns - risk_free, volatility, out=np.zeros(points), where=volatility > 0)
+    return {'returns': returns, 'volatility': volatility, 'sharpe_ratio': sharpe, 'weights': weights}
+
+def _pcg(matvec, rhs: np.ndarray, diagonal: np.ndarray, tol: float, max_iterations: int) -> np.ndarray:
+    """conjugate gradients with a jacobi preconditioner"""
+    x = np.zeros_like(rhs)
+    residual = rhs.copy()
+    z = residual / diagonal
+    direction = z.copy()
+    rz = residual @ z
+    threshold = tol * np.linalg.norm(rhs)
+    for _ in range(max_iterations):
+        product = matvec(direction)
+        alpha = rz / (direction @ product)
+        x += alpha * direction
+        residual -= alpha * product
+        if np.linalg.norm(residual) <= threshold:
+            break
+        z = residual / diagonal
+        rz, previous = residual @ z, rz
+        direction = z + (rz / previous) * direction
+    return x
+
+def risk_parity(cov: np.ndarray, budget: Optional[np.ndarray] = None, tol: float = 1e-10,
+                max_iterations: int = 100) -> np.ndarray:
+    """long-only weights whose risk contributions w_i (Cw)_i are proportional to budget (equal by default)
+    
+    newton's method on the convex 1/2 y'Cy - budget'log(y) (spinu 2013), whose
+    minimizer normalized to sum one is the answer; each newton system is solved
+    by preconditioned conjugate gradients, so a step costs a few products with C
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    assets = len(cov)
+    budget = np.full(assets, 1.0 / assets) if budget is None else np.asarray(budget, dtype=np.float64)
+    budget = budget / budget.sum()
+    
+    def objective(y):
+        return 0.5 * y @ cov @ y - budget @ np.log(y)
+    
+    y = budget / np.sqrt(np.diag(cov))
+    y /= np.sqrt(y @ cov @ y)
+    value = objective(y)
+    for _ in range(max_iterations):
+        gradient = cov @ y - budget / y
+        if np.abs(gradient * y).max() <= tol:
+            break
+        curvature = budget / y ** 2
+        step = _pcg(lambda v: cov @ v + curvature * v, -gradient, np.diag(cov) + curvature, 1e-8, assets)
+        # stay inside y > 0 and backtrack until the objective falls
+        negative = step < 0
+        alpha = min(1.0, 0.95 * (-y[negative] / step[negative]).min()) if negative.any() else 1.0
+        while alpha > 1e-12:
+            candidate = y + alpha * step
+            candidate_value = objective(candidate)
+            if candidate_value <= value + 1e-4 * alpha * (gradient @ step):
+                break
+            alpha /= 2
+        y, value = candidate, candidate_value
+    return y / y.sum()
+
+def risk_contributions(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """each asset's share of the portfolio variance"""
+    weights = np.asarray(weights, dtype=np.float64)
+    contributions = weights * (np.asarray(cov, dtype=np.float64) @ weights)
+    return contributions / contributions.sum()
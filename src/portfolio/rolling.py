@@ -0,0 +1,155 @@
+"""rolling-window metrics of every column of a returns matrix, for several windows at once
+
+each column block gets its cumulative sums (of the returns, their squares, their
+products with the benchmark and their log growth) computed once; every window
+then reads its sums off as differences of two rows, and its trailing peak with a
+blocked prefix/suffix maximum, so a window costs a few array passes whatever its
+length. windows holding a missing return, or a missing benchmark return for
+beta and correlation, are nan, as are the first window - 1 rows
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .metrics import TRADING_DAYS, CHUNK_BYTES
+
+ROLLING_METRICS = ['volatility', 'sharpe_ratio', 'beta', 'correlation', 'drawdown']
+
+# T x chunk float64 arrays alive at once while a block is processed
+_BLOCK_ARRAYS = 12
+
+def _cumsum(values: np.ndarray) -> np.ndarray:
+    """cumulative sums along axis 0 with a leading zero row, so sums over rows i..j are c[j + 1] - c[i]"""
+    out = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.float64)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+def _window_sums(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """sums over each trailing window, one row per window end from row window - 1 on"""
+    return cumulative[window:] - cumulative[:-window]
+
+def _masked(values: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+    """values with nan where mask is set"""
+    if mask is not None:
+        values[mask] = np.nan
+    return values
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """maximum over each run of window rows, len(values) - window + 1 rows (van herk / gil-werman)
+    
+    rows are split into blocks of window; a run covers the tail of one block and
+    the head of the next, so it is the larger of a suffix and a prefix maximum
+    """
+    length = len(values)
+    blocks = -(-length // window)
+    padded = np.full((blocks * window,) + values.shape[1:], -np.inf)
+    padded[:length] = values
+    shaped = padded.reshape((blocks, window) + values.shape[1:])
+    prefix = np.maximum.accumulate(shaped, axis=1).reshape(padded.shape)
+    suffix = np.maximum.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    return np.maximum(suffix[:length - window + 1], prefix[window - 1:length])
+
+def rolling_metrics(returns: np.ndarray, windows: Sequence[int], benchmark: Optional[np.ndarray] = None,
+                    periods_per_year: int = TRADING_DAYS, risk_free: float = 0.0,
+                    metrics: Optional[Sequence[str]] = None, dtype=np.float64,
+                    chunk_size: Optional[int] = None) -> Dict[int, Dict[str, np.ndarray]]:
+    """{window: {metric: T x N array}} of ROLLING_METRICS for a T x N returns matrix
+    
+    volatility is the annualized sample standard deviation over the window and
+    sharpe the annualized mean return less risk_free (an annual rate) over it;
+    beta and correlation are against the length-T benchmark returns, and need
+    one; drawdown is the fall of the compounded value from its peak within the
+    window. metrics picks a subset, dtype the precision of the outputs
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    periods, assets = returns.shape
+    windows = sorted({int(w) for w in windows})
+    if not windows or windows[0] < 2:
+        raise ValueError("windows need at least two periods")
+    metrics = list(metrics or ROLLING_METRICS)
+    unknown = set(metrics) - set(ROLLING_METRICS)
+    if unknown:
+        raise ValueError(f"unknown rolling metrics {sorted(unknown)}, expected some of {ROLLING_METRICS}")
+    needs_benchmark = bool({'beta', 'correlation'} & set(metrics))
+    if needs_benchmark and benchmark is None:
+        raise ValueError("beta and correlation need benchmark returns")
+    
+    results = {w: {name: np.full((periods, assets), np.nan, dtype=dtype) for name in metrics} for w in windows}
+    windows = [w for w in windows if w <= periods]
+    if not windows:
+        return results
+    
+    if needs_benchmark:
+        bench = np.asarray(benchmark, dtype=np.float64).reshape(-1)
+        if len(bench) != periods:
+            raise ValueError(f"benchmark has {len(bench)} periods for {periods} rows of returns")
+        bench_missing = ~np.isfinite(bench)
+        # demeaned first, so the window sums stay small and their differences exact
+        center = np.where(bench_missing, 0.0, bench).sum() / max(periods - bench_missing.sum(), 1)
+        bench = np.where(bench_missing, 0.0, bench - center)
+        bench_sums = _cumsum(bench)
+        bench_squares = _cumsum(bench ** 2)
+        bench_gaps = _cumsum(bench_missing)
+    
+    scale = np.sqrt(periods_per_year)
+    chunk_size = chunk_size or max(1, CHUNK_BYTES // (_BLOCK_ARRAYS * 8 * (periods + 1)))
+    for lo in range(0, assets, chunk_size):
+        hi = min(lo + chunk_size, assets)
+        block = returns[:, lo:hi]
+        missing = ~np.isfinite(block)
+        gaps = _cumsum(missing)
+        present = periods - gaps[-1]
+        center = np.where(missing, 0.0, block).sum(axis=0) / np.maximum(present, 1)
+        demeaned = np.where(missing, 0.0, block - center)
+        sums = _cumsum(demeaned)
+        squares = _cumsum(demeaned ** 2)
+        if needs_benchmark:
+            products = _cumsum(demeaned * bench[:, None])
+        if 'drawdown' in metrics:
+            growth = _cumsum(np.log1p(np.where(missing, 0.0, block)))
+        
+        for window in windows:
+            rows = slice(window - 1, periods)
+            # most blocks have no gaps, and then nothing needs masking
+            incomplete = _window_sums(gaps, window) > 0 if gaps[-1].any() else None
+            mean = _window_sums(sums, window) / window
+            variance = (_window_sums(squares, window) / window - mean ** 2) * (window / (window - 1))
+            np.maximum(variance, 0.0, out=variance)
+            std = np.sqrt(variance)
+            out = results[window]
+            
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if 'volatility' in out:
+                    out['volatility'][rows, lo:hi] = _masked(std * scale, incomplete)
+                if 'sharpe_ratio' in out:
+                    excess = (mean + center) * periods_per_year - risk_free
+                    sharpe = np.divide(excess, std * scale, out=np.zeros_like(excess), where=std > 0)
+                    out['sharpe_ratio'][rows, lo:hi] = _masked(sharpe, incomplete)
+                if needs_benchmark:
+                    bench_mean = _window_sums(bench_sums, window)[:, None] / window
+                    bench_variance = (_window_sums(bench_squares, window)[:, None] / window - bench_mean ** 2)
+                    np.maximum(bench_variance, 0.0, out=bench_variance)
+                    covariance = _window_sums(products, window) / window - mean * bench_mean
+                    undefined = incomplete
+                    if bench_gaps[-1]:
+                        bench_incomplete = (_window_sums(bench_gaps, window) > 0)[:, None]
+                        undefined = bench_incomplete if incomplete is None else incomplete | bench_incomplete
+                    if 'beta' in out:
+                        beta = np.divide(covariance, bench_variance, out=np.zeros_like(covariance),
+                                         where=bench_variance > 0)
+                        out['beta'][rows, lo:hi] = _masked(beta, undefined)
+                    if 'correlation' in out:
+                        # population moments on both sides, the n / (n - 1) factors cancel
+                        denominator = np.sqrt(variance * (window - 1) / window * bench_variance)
+                        correlation = np.divide(covariance, denominator, out=np.zeros_like(covariance),
+                                                where=denominator > 0)
+                        out['correlation'][rows, lo:hi] = _masked(np.clip(correlation, -1.0, 1.0, out=correlation),
+                                                                  undefined)
+                if 'drawdown' in out:
+                    # the peak includes the value before the window's first return
+                    peak = rolling_max(growth, window + 1)
+                    out['drawdown'][rows, lo:hi] = _masked(np.expm1(growth[window:] - peak), incomplete)
+    return results
@@ -0,0 +1,134 @@
+"""incremental portfolio metrics, updated in O(1) per bar and portfolio
+
+keeps welford running moments of the returns and of the negative returns, the
+compounded value, its running peak and the worst drawdown, so the metrics of
+batch_metrics are available after every bar without revisiting history
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from .metrics import TRADING_DAYS
+
+class StreamingMetrics:
+    """running metrics of K portfolios fed one bar, or a block of bars, at a time
+    
+    after the same returns, metrics() agrees with batch_metrics up to rounding
+    """
+    
+    def __init__(self, portfolios: int = 1, periods_per_year: int = TRADING_DAYS, risk_free: float = 0.0):
+        self.portfolios = portfolios
+        self.periods_per_year = periods_per_year
+        self.risk_free = risk_free
+        self.count = 0
+        self.mean = np.zeros(portfolios)
+        self.m2 = np.zeros(portfolios)  # sum of squared deviations from the mean
+        self.negative_count = np.zeros(portfolios)
+        self.negative_mean = np.zeros(portfolios)
+        self.negative_m2 = np.zeros(portfolios)
+        self.equity = np.ones(portfolios)  # compounded value of 1 invested at the start
+        self.peak = np.zeros(portfolios)
+        self.drawdown = np.zeros(portfolios)
+        self.max_drawdown = np.zeros(portfolios)
+        self.last_index = None  # label of the last bar added, for callers that resume from it
+    
+    def update(self, returns, index=None) -> np.ndarray:
+        """add one bar of portfolio returns, a scalar or one per portfolio; returns the new equity"""
+        r = np.broadcast_to(np.asarray(returns, dtype=np.float64), (self.portfolios,))
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (r - self.mean)
+        
+        negative = r < 0
+        if negative.any():
+            self.negative_count += negative
+            delta = np.where(negative, r - self.negative_mean, 0.0)
+            self.negative_mean += np.divide(delta, self.negative_count, out=np.zeros_like(delta),
+                                            where=negative)
+            self.negative_m2 += delta * np.where(negative, r - self.negative_mean, 0.0)
+        
+        self.equity *= 1 + r
+        np.maximum(self.peak, self.equity, out=self.peak)
+        self.drawdown = (self.equity - self.peak) / self.peak
+        np.minimum(self.max_drawdown, self.drawdown, out=self.max_drawdown)
+        if index is not None:
+            self.last_index = index
+        return self.equity.copy()
+    
+    def update_assets(self, asset_returns, weights, index=None) -> np.ndarray:
+        """add one bar of N asset returns for a K x N weights matrix, missing returns counting as zero"""
+        asset_returns = np.nan_to_num(np.asarray(asset_returns, dtype=np.float64))
+        return self.update(np.atleast_2d(weights) @ asset_returns, index)
+    
+    def extend(self, returns, index=None) -> np.ndarray:
+        """add a T x K block of bars at once and return the T x K equity after each of them
+        
+        the block's moments are computed with array passes and merged in with
+        chan's parallel update, so catching up on history costs no python loop
+        """
+        block = np.asarray(returns, dtype=np.float64).reshape(-1, self.portfolios)
+        if not len(block):
+            return np.empty((0, self.portfolios))
+        n = len(block)
+        self.mean, self.m2 = _merge_moments(self.count, self.mean, self.m2,
+                                            n, block.mean(axis=0), block.var(axis=0) * n)
+        self.count += n
+        
+        negative = block < 0
+        counts = negative.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(negative, block, 0.0).sum(axis=0) / counts
+        means = np.nan_to_num(means)
+        m2 = (np.where(negative, block - means, 0.0) ** 2).sum(axis=0)
+        self.negative_mean, self.negative_m2 = _merge_moments(self.negative_count, self.negative_mean,
+                                                              self.negative_m2, counts, means, m2)
+        self.negative_count += counts
+        
+        equity = self.equity * np.cumprod(1 + block, axis=0)
+        peak = np.maximum(self.peak, np.maximum.accumulate(equity, axis=0))
+        drawdown = (equity - peak) / peak
+        self.equity = equity[-1].copy()
+        self.peak = peak[-1].copy()
+        self.drawdown = drawdown[-1].copy()
+        np.minimum(self.max_drawdown, drawdown.min(axis=0), out=self.max_drawdown)
+        if index is not None:
+            self.last_index = index
+        return equity
+    
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """the metrics of batch_metrics as length-K arrays, plus the current equity and drawdown"""
+        scale = np.sqrt(self.periods_per_year)
+        total = self.equity - 1
+        if self.count:
+            annualized = self.equity ** (self.periods_per_year / self.count) - 1
+        else:
+            annualized = np.zeros(self.portfolios)
+        volatility = np.sqrt(self.m2 / (self.count - 1)) * scale if self.count > 1 else np.zeros(self.portfolios)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            downside = np.sqrt(self.negative_m2 / (self.negative_count - 1)) * scale
+        downside[self.negative_count < 2] = 0.0
+        
+        excess = annualized - self.risk_free
+        return {
+            'total_return': total,
+            'annualized_return': annualized,
+            'volatility': volatility,
+            'sharpe_ratio': np.divide(excess, volatility, out=np.zeros_like(excess), where=volatility > 0),
+            'sortino_ratio': np.divide(excess, downside, out=np.zeros_like(excess), where=downside > 0),
+            'max_drawdown': self.max_drawdown.copy(),
+            'equity': self.equity.copy(),
+            'drawdown': self.drawdown.copy(),
+        }
+
+def _merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """mean and sum of squared deviations of two samples combined (chan et al.)"""
+    count_a = np.asarray(count_a, dtype=np.float64)
+    count_b = np.asarray(count_b, dtype=np.float64)
+    total = count_a + count_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(total > 0, mean_a + delta * count_b / total, 0.0)
+        m2 = m2_a + m2_b + np.where(total > 0, delta ** 2 * count_a * count_b / total, 0.0)
+    return mean, m2
@@ -0,0 +1,53 @@
+"""monte carlo risk: seeded reproducibility, the normal model's analytic tail and the bootstrap"""
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from src.portfolio.montecarlo import PATH_BLOCK, PortfolioSimulator, monte_carlo_risk, simulate_returns
+
+def _history(periods=60, assets=3, seed=5):
+    return np.random.default_rng(seed).normal(0.0005, 0.015, size=(periods, assets))
+
+@pytest.mark.parametrize('method', ['normal', 'bootstrap'])
+def test_seed_gives_same_paths_for_any_memory_budget(method):
+    weights = np.array([[0.5, 0.3, 0.2], [0.0, 0.0, 1.0]])
+    simulator = PortfolioSimulator(weights, method, _history(), block_length=4)
+    paths = 3 * PATH_BLOCK + 100
+    # one block per chunk, then every block in one chunk
+    small = simulate_returns(simulator, paths, (1, 5, 21), seed=42, memory_budget=1)
+    large = simulate_returns(simulator, paths, (1, 5, 21), seed=42, memory_budget=1 << 30)
+    np.testing.assert_array_equal(small, large)
+
+def test_normal_var_matches_analytic_quantile():
+    mean, cov = np.array([0.001, 0.0005]), np.array([[0.0004, 0.0001], [0.0001, 0.0002]])
+    weights = np.array([0.6, 0.4])
+    risk = monte_carlo_risk(weights, paths=400_000, horizons=(1,), levels=(0.95, 0.99), mean=mean, cov=cov,
+                            seed=1)
+    
+    # one period compounds to the simple return, which is normal
+    m, s = weights @ mean, np.sqrt(weights @ cov @ weights)
+    for j, level in enumerate((0.95, 0.99)):
+        z = norm.ppf(1 - level)
+        assert risk['var'][0, j, 0] == pytest.approx(-(m + s * z), abs=0.02 * s)
+        assert risk['cvar'][0, j, 0] == pytest.approx(-(m - s * norm.pdf(z) / (1 - level)), abs=0.02 * s)
+    assert risk['expected_return'][0, 0] == pytest.approx(m, abs=0.01 * s)
+
+def test_bootstrap_resamples_historical_blocks():
+    history = _history(periods=40)
+    weights = np.array([0.2, 0.5, 0.3])
+    portfolio = history @ weights
+    # blocks of three consecutive days, wrapping around the end of the history
+    windows = np.expm1(np.log1p(portfolio[(np.arange(40)[:, None] + np.arange(3)) % 40]).sum(axis=1))
+    
+    outcomes = simulate_returns(PortfolioSimulator(weights, 'bootstrap', history, block_length=3),
+                                5000, (1, 3), seed=3)
+    # each outcome is one historical day or window, up to the rounding of compounding through logs
+    def drawn_from(values, candidates):
+        return np.isclose(values[:, None], candidates[None, :], rtol=0, atol=1e-12).any(axis=1).all()
+    assert drawn_from(outcomes[:, 0, 0], portfolio)
+    assert drawn_from(outcomes[:, 1, 0], windows)
+    
+    risk = monte_carlo_risk(weights, paths=5000, horizons=(1,), levels=(0.95,), method='bootstrap',
+                            returns=history, seed=3)
+    assert -portfolio.max() <= risk['var'][0, 0, 0] <= risk['cvar'][0, 0, 0] <= -portfolio.min()
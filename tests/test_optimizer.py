@@ -0,0 +1,70 @@
+"""optimizer solutions against scipy's SLSQP, risk parity and the frontier"""
+
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from src.portfolio.optimizer import (
+    efficient_frontier, ledoit_wolf, mean_variance, min_variance, risk_contributions, risk_parity
+)
+
+@pytest.fixture
+def problem():
+    rng = np.random.default_rng(11)
+    factors = rng.normal(size=(250, 3))
+    returns = factors @ rng.normal(size=(3, 12)) * 0.01 + rng.normal(0.0, 0.01, size=(250, 12))
+    returns += np.linspace(-0.0005, 0.001, 12)
+    cov, _ = ledoit_wolf(returns)
+    return np.nanmean(returns, axis=0), cov
+
+def _slsqp(objective, assets, constraints=()):
+    fully_invested = {'type': 'eq', 'fun': lambda w: w.sum() - 1.0}
+    result = minimize(objective, np.full(assets, 1.0 / assets), method='SLSQP', bounds=[(0.0, 1.0)] * assets,
+                      constraints=[fully_invested, *constraints], options={'ftol': 1e-15, 'maxiter': 1000})
+    assert result.success, result.message
+    return result.x
+
+def _check(weights, expected, objective):
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights >= 0).all()
+    # the active set is exact, so it should never do worse than SLSQP
+    assert objective(weights) <= objective(expected) + 1e-12
+    np.testing.assert_allclose(weights, expected, atol=1e-4)
+
+def test_min_variance_matches_slsqp(problem):
+    _, cov = problem
+    variance = lambda w: w @ cov @ w
+    _check(min_variance(cov), _slsqp(variance, len(cov)), variance)
+
+def test_target_return_matches_slsqp(problem):
+    mu, cov = problem
+    target = 0.75 * mu.max() + 0.25 * mu.min()
+    variance = lambda w: w @ cov @ w
+    reaches = {'type': 'eq', 'fun': lambda w: w @ mu - target}
+    weights = mean_variance(mu, cov, target_return=target)
+    assert weights @ mu == pytest.approx(target)
+    _check(weights, _slsqp(variance, len(mu), [reaches]), variance)
+
+def test_risk_aversion_matches_slsqp(problem):
+    mu, cov = problem
+    utility = lambda w: 5.0 / 2 * w @ cov @ w - w @ mu
+    _check(mean_variance(mu, cov, risk_aversion=5.0), _slsqp(utility, len(mu)), utility)
+
+def test_risk_parity_equalizes_contributions(problem):
+    _, cov = problem
+    weights = risk_parity(cov)
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights > 0).all()
+    np.testing.assert_allclose(risk_contributions(weights, cov), 1.0 / len(cov), rtol=1e-8)
+    
+    budget = np.arange(1, len(cov) + 1, dtype=float)
+    np.testing.assert_allclose(risk_contributions(risk_parity(cov, budget), cov), budget / budget.sum(), rtol=1e-8)
+
+def test_frontier_is_monotone_and_long_only(problem):
+    mu, cov = problem
+    frontier = efficient_frontier(mu, cov, points=30)
+    assert (np.diff(frontier['returns']) > 0).all()
+    assert (np.diff(frontier['volatility']) >= -1e-12).all()
+    np.testing.assert_allclose(frontier['weights'].sum(axis=1), 1.0)
+    assert (frontier['weights'] >= 0).all()
+    np.testing.assert_allclose(frontier['weights'][0], min_variance(cov), atol=1e-10)
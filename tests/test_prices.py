@@ -0,0 +1,32 @@
+"""price bars and cubes on a database without prices"""
+
+from src.db import db_manager, create_tables
+from src.db.prices import get_price_bars, load_price_csv, price_store_version, PRICE_COLUMNS
+from src.db.price_cube import PriceCube
+
+def test_missing_and_empty_price_bars(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'db_path', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(db_manager, 'query_cache', None)
+    
+    for _ in range(2):
+        bars = get_price_bars(['AAPL', 'MSFT'])
+        assert bars.empty
+        assert list(bars.columns) == ['ticker', 'date'] + PRICE_COLUMNS
+        cube = PriceCube.from_bars(bars)
+        assert (len(cube.tickers), len(cube)) == (0, 0)
+        assert cube.to_frames() == {}
+        create_tables()
+
+def test_price_store_version_counts_loads_per_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'db_path', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(db_manager, 'query_cache', None)
+    create_tables()
+    csv = tmp_path / 'AAPL.csv'
+    csv.write_text("Date,Open,High,Low,Close,Adj Close,Volume\n2024-01-02,1,2,0.5,1.5,1.5,100\n")
+    
+    assert price_store_version() == 0
+    # back to back loads land in the same filesystem tick but still get distinct versions
+    load_price_csv([csv])
+    load_price_csv([csv])
+    assert price_store_version() == 2
+    assert price_store_version(str(tmp_path / 'other.db')) == 0
@@ -0,0 +1,43 @@
+"""query result cache: which statements are cached and how hits are logged"""
+
+import pytest
+
+from src.db import DuckDBManager
+from src.db.query_cache import is_read_query, is_volatile
+
+@pytest.mark.parametrize('query', [
+    "SELECT nextval('news_articles_id_seq')",
+    "SELECT random()",
+    "SELECT now()",
+    "SELECT * FROM price_bars WHERE date >= current_date - INTERVAL 30 DAY",
+    "select gen_random_uuid() as id",
+    "SELECT CURRENT_TIMESTAMP",
+])
+def test_volatile_reads_are_not_cacheable(query):
+    assert is_volatile(query)
+    assert not is_read_query(query)
+
+@pytest.mark.parametrize('query', [
+    "SELECT * FROM price_bars WHERE ticker IN ('AAPL', 'MSFT')",
+    "WITH t AS (SELECT 1 AS x) SELECT x FROM t",
+    "SELECT date, close FROM price_bars WHERE date >= ?",
+])
+def test_plain_reads_are_cacheable(query):
+    assert is_read_query(query)
+
+def test_volatile_query_is_run_every_time(tmp_path):
+    manager = DuckDBManager(str(tmp_path / 'test.db'), cache_max_bytes=1024 * 1024)
+    manager.execute_query("CREATE SEQUENCE ids START 1")
+    first = manager.execute_query("SELECT nextval('ids') AS id")['id'][0]
+    second = manager.execute_query("SELECT nextval('ids') AS id")['id'][0]
+    assert (first, second) == (1, 2)
+
+def test_cache_hits_are_logged(tmp_path):
+    manager = DuckDBManager(str(tmp_path / 'test.db'), cache_max_bytes=1024 * 1024)
+    manager.execute_query("CREATE TABLE t AS SELECT range AS x FROM range(10)")
+    for _ in range(3):
+        assert len(manager.execute_query("SELECT x FROM t")) == 10
+    
+    stats = next(row for row in manager.query_report() if row['sql'] == "SELECT x FROM t")
+    assert stats['calls'] == 3
+    assert stats['cached'] == 2
@@ -0,0 +1,54 @@
+"""query log totals and stream timing"""
+
+import time
+
+from src.db import DuckDBManager
+from src.db.query_log import QueryLog, load_stats, load_log, combine, _rank
+
+def test_totals_keep_the_most_recent_statements():
+    log = QueryLog(max_statements=3)
+    for i in range(10):
+        log.record('query', f"SELECT * FROM t WHERE id IN ({i})", 1.0)
+    log.record('query', "SELECT * FROM t WHERE id IN (8)", 1.0)
+    
+    statements = [row['sql'] for row in log.report()]
+    assert len(statements) == 3
+    assert "SELECT * FROM t WHERE id IN (8)" in statements
+    assert "SELECT * FROM t WHERE id IN (6)" not in statements
+
+def test_stream_time_excludes_the_consumer(tmp_path):
+    manager = DuckDBManager(str(tmp_path / 'test.db'))
+    query = "SELECT range AS x FROM range(30)"
+    for _ in manager.iter_batches(query, batch_size=10):
+        time.sleep(0.1)
+    
+    stats = next(row for row in manager.query_report() if row['sql'] == query)
+    assert stats['rows'] == 30
+    assert stats['total_ms'] < 100
+
+def test_flushed_totals_add_up_across_logs(tmp_path):
+    stats_path = tmp_path / 'query_stats.json'
+    for _ in range(2):
+        log = QueryLog(slow_ms=1000, stats_path=stats_path)
+        for _ in range(50):
+            log.record('query', "SELECT 1", 2.0)
+        log.record('query', "SELECT 2", 30.0)
+        log.flush()
+        log.flush()
+    
+    stats = load_stats(stats_path)
+    assert stats["SELECT 1"]['calls'] == 100
+    assert stats["SELECT 1"]['total_ms'] == 200.0
+    assert stats["SELECT 2"]['calls'] == 2
+
+def test_report_ranks_cheap_frequent_statements(tmp_path):
+    stats_path = tmp_path / 'query_stats.json'
+    log = QueryLog(slow_ms=100, log_path=tmp_path / 'slow.jsonl', stats_path=stats_path)
+    for _ in range(100):
+        log.record('query', "SELECT cheap", 5.0)
+    log.record('query', "SELECT slow", 150.0)
+    log.flush()
+    
+    rows = _rank(combine(load_stats(stats_path), load_log(tmp_path / 'slow.jsonl')), 10)
+    assert [row['sql'] for row in rows] == ["SELECT cheap", "SELECT slow"]
+    assert rows[1]['slow'] == 1
@@ -0,0 +1,33 @@
+"""rolling metrics against pandas' rolling moments, with a gap in the returns"""
+
+import numpy as np
+import pandas as pd
+
+from src.portfolio.rolling import rolling_metrics, rolling_max
+
+def test_rolling_metrics_match_pandas():
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.02, size=(300, 5))
+    returns[50:54, 1] = np.nan
+    benchmark = returns[:, 0] * 0.5 + rng.normal(0.0, 0.01, size=300)
+    frame, bench = pd.DataFrame(returns), pd.Series(benchmark)
+    
+    # a chunk size below the column count runs several column blocks
+    results = rolling_metrics(returns, [5, 21], benchmark, chunk_size=2)
+    for window, out in results.items():
+        rolling = frame.rolling(window)
+        std = rolling.std().to_numpy()
+        np.testing.assert_allclose(out['volatility'], std * np.sqrt(252), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(out['sharpe_ratio'], rolling.mean().to_numpy() * 252 / (std * np.sqrt(252)),
+                                   rtol=1e-9, atol=1e-12)
+        beta = (rolling.cov(bench).to_numpy().T / bench.rolling(window).var().to_numpy()).T
+        np.testing.assert_allclose(out['beta'], beta, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(out['correlation'], rolling.corr(bench).to_numpy(), rtol=1e-9, atol=1e-12)
+        # every window touching the gap is missing, as in pandas
+        assert np.isnan(out['volatility'][50:54 + window - 1, 1]).all()
+        assert np.isfinite(out['volatility'][54 + window - 1:, 1]).all()
+
+def test_rolling_max_matches_pandas():
+    values = np.random.default_rng(3).normal(size=(101, 3))
+    expected = pd.DataFrame(values).rolling(7).max().to_numpy()[6:]
+    np.testing.assert_array_equal(rolling_max(values, 7), expected)
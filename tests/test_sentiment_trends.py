@@ -0,0 +1,57 @@
+"""sentiment trend ewma over long ranges and on a fresh database"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.db import db_manager, create_tables
+from src.db.sentiment_trends import get_sentiment_trends, TREND_COLUMNS
+
+def _use_database(monkeypatch, path):
+    monkeypatch.setattr(db_manager, 'db_path', str(path))
+    monkeypatch.setattr(db_manager, 'query_cache', None)
+
+def _reference_ewma(days: pd.DataFrame, halflife: float) -> np.ndarray:
+    """the ewma of each day from every earlier day, weighted by article count and half-life"""
+    offsets = (days['date'] - days['date'].min()).dt.days.to_numpy()
+    values = days['sentiment'].to_numpy()
+    counts = days['article_count'].to_numpy()
+    ewma = []
+    for i, offset in enumerate(offsets):
+        weights = counts[:i + 1] * 0.5 ** ((offset - offsets[:i + 1]) / halflife)
+        ewma.append((weights * values[:i + 1]).sum() / weights.sum())
+    return np.array(ewma)
+
+def test_ewma_over_many_halflives(tmp_path, monkeypatch):
+    _use_database(monkeypatch, tmp_path / 'test.db')
+    create_tables()
+    start, periods = date(2020, 1, 1), 2000
+    rng = np.random.default_rng(0)
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO ticker_symbols (symbol) VALUES ('AAPL')")
+        rows = pd.DataFrame({
+            'date': [start + timedelta(days=i) for i in range(periods) if i % 3],
+            'article_count': None, 'sentiment': None,
+        })
+        rows['article_count'] = rng.integers(1, 10, len(rows))
+        rows['sentiment'] = rng.uniform(-1, 1, len(rows))
+        conn.register('rows', rows)
+        conn.execute("""
+            INSERT INTO daily_ticker_sentiment (ticker_id, date, article_count, avg_sentiment)
+            SELECT 1, date, article_count, sentiment FROM rows
+        """)
+    
+    trends = get_sentiment_trends(['AAPL'], start_date=start, end_date=start + timedelta(days=periods),
+                                  halflife=1.0, use_cache=False)
+    assert len(trends) == len(rows)
+    assert trends['ewma'].notna().all()
+    
+    stored = trends[['date', 'article_count', 'sentiment']].assign(date=lambda d: pd.to_datetime(d['date']))
+    np.testing.assert_allclose(trends['ewma'], _reference_ewma(stored, 1.0), rtol=1e-9)
+
+def test_fresh_database_has_no_trends(tmp_path, monkeypatch):
+    _use_database(monkeypatch, tmp_path / 'empty.db')
+    trends = get_sentiment_trends(use_cache=False)
+    assert trends.empty
+    assert list(trends.columns) == TREND_COLUMNS
@@ -0,0 +1,26 @@
+"""persisted symbol and association counts report only the rows actually inserted"""
+
+from src.db import db_manager, create_tables
+from src.ingest.news.ticker_tagger import TickerTagger, TickerMatch, _upsert_ticker_rows
+
+def _symbol(symbol, name=None):
+    return {'symbol': symbol, 'company_name': name, 'sector': None, 'market_cap': None}
+
+def test_repeated_persists_count_new_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'db_path', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(db_manager, 'query_cache', None)
+    create_tables()
+    
+    assert _upsert_ticker_rows([_symbol('AAPL', 'Apple Inc.'), _symbol('MSFT')]) == 2
+    assert _upsert_ticker_rows([_symbol('AAPL'), _symbol('MSFT'), _symbol('NVDA')]) == 1
+    
+    with db_manager.get_connection() as conn:
+        conn.execute("INSERT INTO news_articles (id, url) VALUES (1, 'a'), (2, 'b')")
+    tagger = TickerTagger.__new__(TickerTagger)
+    matches = {
+        1: [TickerMatch('AAPL', 'Apple Inc.', [(0, 4)], confidence=0.9, text='AAPL'),
+            TickerMatch('AAPL', 'Apple Inc.', [(0, 4)], confidence=0.5, text='AAPL')],
+        2: [TickerMatch('MSFT', '', [(0, 4)], confidence=0.8, text='MSFT')],
+    }
+    assert tagger.persist_ticker_associations_batch(matches) == 2
+    assert tagger.persist_ticker_associations_batch(matches) == 0
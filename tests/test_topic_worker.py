@@ -0,0 +1,30 @@
+"""topic runs resume from the last tagged article, whenever the articles were published"""
+
+from datetime import datetime
+
+from src.db import db_manager, create_tables
+from src.ingest.news.topic_worker import run_topics, load_detector
+
+ARTICLE_SQL = """
+    INSERT INTO news_articles (id, url, title, text, ts_published, is_processed, ts_processed)
+    VALUES (?, ?, ?, ?, ?, TRUE, ?)
+"""
+
+def test_late_article_is_added(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'db_path', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(db_manager, 'query_cache', None)
+    create_tables()
+    state = tmp_path / 'topics.pkl'
+    
+    with db_manager.get_connection() as conn:
+        for i in range(1, 4):
+            conn.execute(ARTICLE_SQL, [i, f"u{i}", "chip export rules", "", datetime(2024, 1, i), datetime(2024, 1, 5)])
+    assert run_topics(state)['articles'] == 3
+    assert run_topics(state)['articles'] == 0
+    
+    # published before everything already read, tagged after it
+    with db_manager.get_connection() as conn:
+        conn.execute(ARTICLE_SQL, [4, "u4", "late backfill", "", datetime(2023, 12, 1), datetime(2024, 1, 6)])
+    assert run_topics(state)['articles'] == 1
+    assert run_topics(state)['articles'] == 0
+    assert load_detector(state).checkpoint == (datetime(2024, 1, 6), 4)
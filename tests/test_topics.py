@@ -0,0 +1,10 @@
+"""term extraction for the trending-topic detector"""
+
+from src.ingest.news.topics import extract_terms
+
+def test_bigrams_break_at_numbers_stopwords_and_fields():
+    terms = extract_terms("Apple 2024 earnings beat", "Services growth")
+    assert {'apple', 'earnings', 'earnings beat', 'services', 'services growth'} <= terms
+    assert 'apple earnings' not in terms  # a number sat between them
+    assert 'beat services' not in terms  # title and summary are separate fields
+    assert extract_terms("chip of the year rules") == {'chip', 'rules'}